@@ -0,0 +1,41 @@
+"""add content-addressed image_blobs
+
+Revision ID: add_image_blobs
+Revises: add_package_image_variants
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_image_blobs'
+down_revision = 'add_package_image_variants'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('image_blobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('size_bytes', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_image_blobs_id', 'image_blobs', ['id'], unique=False)
+    op.create_index('ix_image_blobs_sha256', 'image_blobs', ['sha256'], unique=True)
+    
+    # Existing rows keep blob_id NULL until scripts/dedupe_package_images.py moves their files into the store
+    op.add_column('package_images', sa.Column('blob_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_package_images_blob_id', 'package_images', 'image_blobs', ['blob_id'], ['id'])
+    op.create_index('ix_package_images_blob_id', 'package_images', ['blob_id'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_package_images_blob_id', table_name='package_images')
+    op.drop_constraint('fk_package_images_blob_id', 'package_images', type_='foreignkey')
+    op.drop_column('package_images', 'blob_id')
+    op.drop_index('ix_image_blobs_sha256', table_name='image_blobs')
+    op.drop_index('ix_image_blobs_id', table_name='image_blobs')
+    op.drop_table('image_blobs')
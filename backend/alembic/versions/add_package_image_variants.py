@@ -0,0 +1,37 @@
+"""add package_image_variants
+
+Revision ID: add_package_image_variants
+Revises: add_package_search_trgm_indexes
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_package_image_variants'
+down_revision = 'add_package_search_trgm_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('package_image_variants',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('image_id', sa.Integer(), nullable=False),
+        sa.Column('variant', sa.String(), nullable=False),
+        sa.Column('format', sa.String(), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=False),
+        sa.Column('height', sa.Integer(), nullable=False),
+        sa.Column('size_bytes', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['image_id'], ['package_images.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_package_image_variants_id', 'package_image_variants', ['id'], unique=False)
+    op.create_index('ix_package_image_variants_image_id', 'package_image_variants', ['image_id'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_package_image_variants_image_id', table_name='package_image_variants')
+    op.drop_index('ix_package_image_variants_id', table_name='package_image_variants')
+    op.drop_table('package_image_variants')
@@ -0,0 +1,57 @@
+"""add composite and partial indexes for the package list
+
+Revision ID: add_package_list_indexes
+Revises: add_scan_lookup_indexes
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_package_list_indexes'
+down_revision = 'add_scan_lookup_indexes'
+branch_labels = None
+depends_on = None
+
+# Rendered per dialect, like the queries they have to match (see Package.__table_args__)
+RETURNABLE = sa.column('is_returnable').is_(True)
+OPEN_RETURNS = RETURNABLE & (sa.column('return_status').is_(None) | (sa.column('return_status') != 'returned'))
+
+# (index name, table, columns, dialect options)
+INDEXES = [
+    # Loaded for every listed package (selectinload by package_id)
+    ('ix_package_items_package_id', 'package_items', ['package_id'], {}),
+    ('ix_packages_approved_by', 'packages', ['approved_by'], {}),
+    ('ix_packages_rejected_by', 'packages', ['rejected_by'], {}),
+    # Keyset order of GET /api/packages/ alone and behind its status / manager filters
+    ('ix_packages_submitted_at_id', 'packages', [sa.text('submitted_at DESC'), sa.text('id DESC')], {}),
+    ('ix_packages_status_submitted_at', 'packages', ['status', sa.text('submitted_at DESC'), sa.text('id DESC')], {}),
+    ('ix_packages_manager_status_submitted_at', 'packages',
+     ['assigned_to_manager', 'status', sa.text('submitted_at DESC'), sa.text('id DESC')], {}),
+    # Manager delta sync: manager_id + updated_since
+    ('ix_packages_manager_updated_at', 'packages', ['assigned_to_manager', 'updated_at'], {}),
+    ('ix_packages_open_returns', 'packages', ['return_date'], {'postgresql_where': OPEN_RETURNS, 'sqlite_where': RETURNABLE}),
+]
+
+# Leading columns of the composites above, so only extra write cost
+REDUNDANT_INDEXES = [
+    ('ix_packages_status', 'packages', ['status']),
+    ('ix_packages_assigned_to_manager', 'packages', ['assigned_to_manager']),
+]
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction; outside one the table stays writable during
+    # the build. A failed concurrent build leaves an INVALID index: drop it and upgrade again.
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True, postgresql_concurrently=True, **options)
+        for name, table, _ in REDUNDANT_INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in REDUNDANT_INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True, postgresql_concurrently=True)
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
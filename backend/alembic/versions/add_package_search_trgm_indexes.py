@@ -0,0 +1,41 @@
+"""add pg_trgm indexes for package search
+
+Revision ID: add_package_search_trgm_indexes
+Revises: add_updated_at_and_tombstones
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_package_search_trgm_indexes'
+down_revision = 'add_updated_at_and_tombstones'
+branch_labels = None
+depends_on = None
+
+# (index name, table, column) searched with ILIKE '%term%' by app.search
+TRGM_INDEXES = [
+    ('ix_packages_tracking_number_trgm', 'packages', 'tracking_number'),
+    ('ix_packages_gate_pass_serial_number_trgm', 'packages', 'gate_pass_serial_number'),
+    ('ix_packages_recipient_trgm', 'packages', 'recipient'),
+    ('ix_packages_to_address_trgm', 'packages', 'to_address'),
+    ('ix_packages_remarks_trgm', 'packages', 'remarks'),
+    ('ix_packages_notes_trgm', 'packages', 'notes'),
+    ('ix_package_items_description_trgm', 'package_items', 'description'),
+    ('ix_package_items_serial_number_trgm', 'package_items', 'serial_number'),
+]
+
+def upgrade():
+    # SQLite dev databases get an FTS5 table from app.search.ensure_search_index instead
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRGM_INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)")
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, _, _ in TRGM_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
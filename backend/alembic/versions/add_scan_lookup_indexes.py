@@ -0,0 +1,24 @@
+"""add indexes for gate scan lookups
+
+Revision ID: add_scan_lookup_indexes
+Revises: add_refresh_tokens
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_scan_lookup_indexes'
+down_revision = 'add_refresh_tokens'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # /api/scan resolves a code against these two as well as tracking_number (already indexed)
+    op.create_index('ix_packages_gate_pass_serial_number', 'packages', ['gate_pass_serial_number'], unique=False)
+    op.create_index('ix_packages_courier_tracking_number', 'packages', ['courier_tracking_number'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_packages_courier_tracking_number', table_name='packages')
+    op.drop_index('ix_packages_gate_pass_serial_number', table_name='packages')
@@ -0,0 +1,43 @@
+"""add packages.updated_at and package_tombstones for delta sync
+
+Revision ID: add_updated_at_and_tombstones
+Revises: remove_tracking_number_unique
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_updated_at_and_tombstones'
+down_revision = 'remove_tracking_number_unique'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('packages', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+    
+    # Backfill with the latest lifecycle timestamp we know about
+    op.execute("""
+        UPDATE packages
+        SET updated_at = GREATEST(submitted_at, approved_at, rejected_at, dispatched_at)
+    """)
+    op.create_index('ix_packages_updated_at', 'packages', ['updated_at'], unique=False)
+    
+    op.create_table('package_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('package_id', sa.Integer(), nullable=False),
+        sa.Column('manager_id', sa.Integer(), nullable=True),
+        sa.Column('reason', sa.String(), nullable=False),
+        sa.Column('removed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_package_tombstones_id', 'package_tombstones', ['id'], unique=False)
+    op.create_index('ix_package_tombstones_removed_at', 'package_tombstones', ['removed_at'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_package_tombstones_removed_at', table_name='package_tombstones')
+    op.drop_index('ix_package_tombstones_id', table_name='package_tombstones')
+    op.drop_table('package_tombstones')
+    op.drop_index('ix_packages_updated_at', table_name='packages')
+    op.drop_column('packages', 'updated_at')
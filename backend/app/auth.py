@@ -1,24 +1,31 @@
-from datetime import datetime, timedelta
-from typing import Optional
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
 from app.database import get_db
-from app.models import User
+from app.models import RefreshToken, User
 from app.config import settings
 from app.schemas import TokenData
+from app.principals import cached_principal, remember_principal
+from app.passwords import password_hasher
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await password_hasher.verify_async(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
@@ -41,12 +48,86 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def refresh_token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def create_refresh_token(db: Session, user: User, family_id: Optional[str] = None) -> Tuple[str, RefreshToken]:
+    """New opaque refresh token for the user (a new session family unless one is given); not committed"""
+    token = secrets.token_urlsafe(48)
+    record = RefreshToken(
+        user_id=user.id,
+        family_id=family_id or uuid.uuid4().hex,
+        token_hash=refresh_token_hash(token),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days)
+    )
+    db.add(record)
+    db.flush()
+    return token, record
+
+def revoke_refresh_family(db: Session, family_id: str) -> None:
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=func.now())
+    )
+
+def revoke_user_sessions(db: Session, user_id: int) -> None:
+    """End every refresh session of a user (password reset, deletion); not committed"""
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=func.now())
+    )
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[User, str]:
+    """
+    Exchange a refresh token for its successor. Reusing an already rotated token means it
+    leaked (or a client raced itself): the whole family is revoked and the caller must log in.
+    The revoke is a conditional UPDATE, so two concurrent refreshes cannot both succeed.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    record = db.query(RefreshToken).filter(RefreshToken.token_hash == refresh_token_hash(token)).first()
+    if record is None:
+        raise invalid
+    if record.revoked_at is not None:
+        revoke_refresh_family(db, record.family_id)
+        db.commit()
+        raise invalid
+    expires_at = record.expires_at if record.expires_at.tzinfo else record.expires_at.replace(tzinfo=timezone.utc)
+    if expires_at <= datetime.now(timezone.utc):
+        raise invalid
+    
+    claimed = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == record.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=func.now())
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        raise invalid
+    
+    user = db.query(User).filter(User.id == record.user_id).first()
+    if user is None:
+        db.rollback()
+        raise invalid
+    new_token, new_record = create_refresh_token(db, user, record.family_id)
+    db.execute(update(RefreshToken).where(RefreshToken.id == record.id).values(replaced_by_id=new_record.id))
+    db.commit()
+    return user, new_token
+
+def get_user_from_token(db: Session, token: str):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    user = cached_principal(db, token)
+    if user is not None:
+        return user
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         email: str = payload.get("sub")
@@ -58,8 +139,12 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     user = get_user_by_email(db, email=token_data.email)
     if user is None:
         raise credentials_exception
+    remember_principal(token, user, payload.get("exp"))
     return user
 
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    return get_user_from_token(db, token)
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     return current_user
 
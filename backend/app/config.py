@@ -1,15 +1,47 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import json
 
 class Settings(BaseSettings):
     database_url: str
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30  # Seconds to wait for a free connection
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 30000  # PostgreSQL statement_timeout, 0 disables
+    threadpool_size: int = 40  # Worker threads for sync route handlers
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 14
+    password_hash_workers: int = 2  # Processes running bcrypt, 0 hashes inline
+    password_hash_max_pending: int = 16  # Logins queued for bcrypt before new ones get a 503
     cors_origins: str = "http://localhost:5173,http://localhost:5174,http://localhost:3000,http://localhost:8080"
     upload_dir: str = "uploads"
     max_file_size: int = 524288000  # 500MB
+    stats_cache_ttl_seconds: int = 30
+    auth_cache_ttl_seconds: int = 60  # How long a verified token skips the JWT decode and user query
+    auth_cache_max_entries: int = 4096
+    image_workers: int = 2  # Processes rendering image variants, 0 renders inline
+    media_signed_urls: bool = False  # Require an HMAC-signed, expiring URL for /uploads
+    media_url_ttl_seconds: int = 3600
+    gate_pass_block_size: int = 1  # Numbers each worker reserves per database round trip; 1 keeps the sequence gap-free
+    gate_pass_render_workers: int = 2  # Processes rendering gate pass PDFs, 0 renders inline
+    gate_pass_cache_dir: str = "cache/gate_passes"  # Rendered PDFs; keep outside upload_dir, which is public
+    gate_pass_logo_path: Optional[str] = None  # PNG/JPEG printed next to the company name
+    scan_cache_refresh_seconds: int = 30  # How often the gate scan cache reloads approved/dispatched passes
+    scan_cache_max_entries: int = 20000
+    sql_accounting: bool = True  # Count statements, rows and database time per request (Server-Timing header)
+    sql_log_requests: bool = False  # Print those totals for every request
+    query_budget_mode: str = "warn"  # "warn" prints requests over their query_budget, "raise" fails them (tests)
+    n_plus_one_threshold: int = 10  # Same statement this many times in one request is reported as a likely N+1
+    slow_query_threshold_ms: int = 0  # Record statements slower than this in the slow query log, 0 disables it
+    slow_query_explain_rate: float = 0.01  # Share of slow SELECTs re-run under EXPLAIN (ANALYZE, BUFFERS)
+    slow_query_buffer_size: int = 1000  # Slow executions kept per worker
+    request_profiling: bool = True  # Admins can profile a request with X-Profile: cpu|memory
+    profiler_interval_ms: float = 2.0  # Stack sampling interval of the cpu profile
+    profiler_traceback_frames: int = 10  # Frames kept per allocation by the memory profile
 
     @property
     def cors_origins_list(self) -> List[str]:
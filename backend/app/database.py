@@ -1,9 +1,60 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from app.config import settings
+from app.metrics import DB_POOL_CAPACITY, DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_SECONDS, DB_POOL_TIMEOUTS
+from app.query_stats import instrument_queries
+from app.slow_queries import slow_query_log
+
+def engine_options(database_url: str) -> dict:
+    """Pool and timeout options from Settings for the given database URL"""
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}
+    
+    options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if settings.db_statement_timeout_ms and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+    return options
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+def instrument_pool(engine) -> None:
+    """Keep the pool gauges on /metrics current from the pool's own checkout/checkin events"""
+    if isinstance(engine.pool, QueuePool):
+        DB_POOL_CAPACITY.set(engine.pool.size() + max(engine.pool._max_overflow, 0))
+    event.listen(engine, "checkout", lambda *args: DB_POOL_CHECKED_OUT.inc())
+    event.listen(engine, "checkin", lambda *args: DB_POOL_CHECKED_OUT.dec())
 
-engine = create_engine(settings.database_url)
+_sync_options = engine_options(settings.database_url)
+if make_url(settings.database_url).get_backend_name() != "sqlite":
+    _sync_options["poolclass"] = TimedQueuePool
+engine = create_engine(settings.database_url, **_sync_options)
+instrument_pool(engine)
+instrument_queries(engine)
+slow_query_log.instrument(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
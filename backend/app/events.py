@@ -0,0 +1,198 @@
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+from app.database import engine
+from app.models import Package
+from app.notify import NotificationListener
+
+# PostgreSQL NOTIFY channel carrying every published event to the other worker processes
+EVENT_CHANNEL = "package_events"
+
+PACKAGE_EVENT_TYPES = {"created", "updated", "status", "assigned", "logistics", "returned"}
+
+@dataclass(eq=False)
+class Subscription:
+    """A single stream client; events are handed over to its event loop thread-safely"""
+    user_id: int
+    role: str
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        """
+        Role based visibility: employees follow their own submissions, managers the
+        packages assigned to them (plus their own), everyone else sees all changes.
+        Batch events list every submitter and manager of their packages instead.
+        """
+        submitters = event.get("submitters") or [event["submitted_by"]]
+        managers = event.get("managers") or [event["assigned_to_manager"]]
+        if self.role == "employee":
+            return self.user_id in submitters
+        if self.role == "manager":
+            return self.user_id in managers or self.user_id in submitters
+        return True
+
+class PackageEventBroker:
+    """
+    Fan-out of committed package changes. Each worker process keeps its own subscribers,
+    listeners and bounded history (so reconnecting clients can resume from the last event id
+    they saw); on PostgreSQL every event is also sent to the other workers via NOTIFY.
+    Event ids are "<epoch>-<seq>" and local to the worker; the epoch changes on restart (and
+    when cross-worker events may have been lost) so stale ids force a reload.
+    """
+
+    def __init__(self, engine: Optional[Engine] = None, history_size: int = 1000):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self._subscribers: Set[Subscription] = set()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._epoch = uuid.uuid4().hex[:8]
+        self._last_seq = 0
+        # Tells this worker's own notifications apart from the other workers'
+        self._origin = uuid.uuid4().hex
+
+    @property
+    def last_event_id(self) -> str:
+        return f"{self._epoch}-{self._last_seq}"
+
+    def _parse_event_id(self, event_id: str) -> Optional[int]:
+        """Return the sequence number of an event id from this epoch, None otherwise"""
+        epoch, _, seq = event_id.partition("-")
+        if epoch != self._epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Call listener(event) synchronously for every event, published by this worker or
+        received from another one, e.g. to drop caches
+        """
+        self._listeners.append(listener)
+
+    def publish(self, event_type: str, package: Package) -> Dict[str, Any]:
+        """
+        Record a change to a package. Call only after the change is committed.
+        Safe to call from sync route handlers running in the threadpool.
+        """
+        if event_type not in PACKAGE_EVENT_TYPES:
+            raise ValueError(f"Unknown package event type: {event_type}")
+        change = {
+            "type": event_type,
+            "package_id": package.id,
+            "status": package.status,
+            "return_status": package.return_status,
+            "submitted_by": package.submitted_by,
+            "assigned_to_manager": package.assigned_to_manager,
+            "at": datetime.utcnow().isoformat(),
+        }
+        return self._publish(change)
+
+    def publish_batch(self, event_type: str, packages: Iterable[Package]) -> Dict[str, Any]:
+        """
+        Record a change to many packages (a bulk import chunk) as one event without a package id,
+        so clients do one delta sync and other workers get one NOTIFY. The packages must not be
+        cached anywhere yet: listeners cannot evict them one by one.
+        """
+        if event_type not in PACKAGE_EVENT_TYPES:
+            raise ValueError(f"Unknown package event type: {event_type}")
+        packages = list(packages)
+        change = {
+            "type": event_type,
+            "package_id": None,
+            "package_count": len(packages),
+            "status": None,
+            "return_status": None,
+            "submitted_by": None,
+            "assigned_to_manager": None,
+            "submitters": sorted({p.submitted_by for p in packages if p.submitted_by is not None}),
+            "managers": sorted({p.assigned_to_manager for p in packages if p.assigned_to_manager is not None}),
+            "at": datetime.utcnow().isoformat(),
+        }
+        return self._publish(change)
+
+    def _publish(self, change: Dict[str, Any]) -> Dict[str, Any]:
+        event = self._deliver(change)
+        if self.engine is not None and self.engine.dialect.name == "postgresql":
+            try:
+                with self.engine.connect() as conn:
+                    conn.execute(select(func.pg_notify(EVENT_CHANNEL, json.dumps({**change, "origin": self._origin}))))
+                    conn.commit()
+            except Exception as e:
+                # The change is committed either way; other workers' caches catch up on their TTLs
+                print(f"Package event notify failed: {e}")
+        return event
+
+    def receive(self, payload: str) -> None:
+        """Deliver an event NOTIFYed by another worker (this worker's own were delivered on publish)"""
+        change = json.loads(payload)
+        if change.pop("origin", None) == self._origin:
+            return
+        self._deliver(change)
+
+    def resync(self) -> None:
+        """
+        Events from other workers may have been missed (the LISTEN connection was down):
+        start a new epoch and tell every connected client to reload.
+        """
+        with self._lock:
+            self._epoch = uuid.uuid4().hex[:8]
+            self._history.clear()
+            event = {"id": f"{self._epoch}-{self._last_seq}", "type": "reset"}
+            subscribers = list(self._subscribers)
+        self._notify(subscribers, event)
+
+    def _deliver(self, change: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._last_seq += 1
+            event = {"id": f"{self._epoch}-{self._last_seq}", "seq": self._last_seq, **change}
+            self._history.append(event)
+            subscribers = [sub for sub in self._subscribers if sub.wants(event)]
+        for listener in self._listeners:
+            listener(event)
+        self._notify(subscribers, event)
+        return event
+
+    def _notify(self, subscribers: List[Subscription], event: Dict[str, Any]) -> None:
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.queue.put_nowait, event)
+            except RuntimeError:
+                # The client's loop is already closed; it will be dropped on unsubscribe
+                pass
+
+    def subscribe(self, user_id: int, role: str, last_event_id: Optional[str] = None):
+        """
+        Register a subscriber and return it together with the events it missed.
+        The backlog is None when the resume point is unknown or has fallen out of
+        the history, meaning the client must do a full reload.
+        """
+        sub = Subscription(user_id=user_id, role=role, loop=asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(sub)
+            if last_event_id is None:
+                return sub, []
+            last_seq = self._parse_event_id(last_event_id)
+            oldest = self._history[0]["seq"] if self._history else self._last_seq + 1
+            if last_seq is None or last_seq > self._last_seq or last_seq < oldest - 1:
+                return sub, None
+            backlog = [e for e in self._history if e["seq"] > last_seq and sub.wants(e)]
+        return sub, backlog
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+broker = PackageEventBroker(engine)
+
+# Receives the other workers' events (PostgreSQL only); the first connect finds no clients to reset
+event_listener = NotificationListener(engine, EVENT_CHANNEL, on_notify=broker.receive, on_connect=broker.resync, name="package-events")
@@ -0,0 +1,220 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import zlib
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session, aliased
+
+from app.database import SessionLocal
+from app.models import Package, PackageItem, User
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 2000
+# Encoded output is handed to the response in pieces of about this size
+FLUSH_BYTES = 64 * 1024
+XLSX_MAX_ROWS = 1_048_576
+
+Submitter = aliased(User)
+Manager = aliased(User)
+Approver = aliased(User)
+Rejecter = aliased(User)
+
+PACKAGE_COLUMNS = [
+    Package.id.label("package_id"),
+    Package.tracking_number,
+    Package.gate_pass_serial_number,
+    Package.status,
+    Package.priority,
+    Package.recipient,
+    Package.to_address,
+    Package.project_code,
+    Package.po_number,
+    Package.po_date,
+    Package.transportation_type,
+    Package.vehicle_details,
+    Package.carrier_name,
+    Package.courier_name,
+    Package.courier_tracking_number,
+    Package.number_of_packages,
+    Package.is_returnable,
+    Package.return_date,
+    Package.return_status,
+    Package.return_reason,
+    Package.remarks,
+    Package.notes,
+    Submitter.email.label("submitted_by"),
+    Manager.full_name.label("assigned_manager"),
+    Approver.full_name.label("approved_by"),
+    Rejecter.full_name.label("rejected_by"),
+    Package.submitted_at,
+    Package.approved_at,
+    Package.rejected_at,
+    Package.dispatched_at,
+    Package.updated_at,
+]
+ITEM_COLUMNS = [
+    PackageItem.id.label("item_id"),
+    PackageItem.description.label("item_description"),
+    PackageItem.quantity.label("item_quantity"),
+    PackageItem.serial_number.label("item_serial_number"),
+    PackageItem.hsn_code.label("item_hsn_code"),
+    PackageItem.unit_price.label("item_unit_price"),
+    PackageItem.value.label("item_value"),
+]
+
+def export_query(query: Query, flatten_items: bool) -> Query:
+    """
+    Turn a filtered Package query into a column-only query (no ORM objects, so nothing
+    accumulates in the session). With flatten_items there is one row per item, and package_ref
+    makes the rows of one package import back as one package; otherwise one row per package
+    with its item totals, named apart from the item_* columns the import reads.
+    """
+    query = (
+        query.outerjoin(Submitter, Submitter.id == Package.submitted_by)
+        .outerjoin(Manager, Manager.id == Package.assigned_to_manager)
+        .outerjoin(Approver, Approver.id == Package.approved_by)
+        .outerjoin(Rejecter, Rejecter.id == Package.rejected_by)
+    )
+    if flatten_items:
+        return (
+            query.outerjoin(PackageItem, PackageItem.package_id == Package.id)
+            .with_entities(*PACKAGE_COLUMNS, Package.id.label("package_ref"), *ITEM_COLUMNS)
+            .order_by(Package.submitted_at.desc(), Package.id.desc(), PackageItem.id)
+        )
+    item_totals = (
+        query.session.query(
+            PackageItem.package_id.label("package_id"),
+            func.count().label("total_items"),
+            func.sum(PackageItem.quantity).label("total_quantity"),
+            func.sum(PackageItem.value).label("total_value")
+        )
+        .group_by(PackageItem.package_id)
+        .subquery()
+    )
+    return (
+        query.outerjoin(item_totals, item_totals.c.package_id == Package.id)
+        .with_entities(
+            *PACKAGE_COLUMNS,
+            func.coalesce(item_totals.c.total_items, 0).label("total_items"),
+            func.coalesce(item_totals.c.total_quantity, 0).label("total_quantity"),
+            item_totals.c.total_value.label("total_value")
+        )
+        .order_by(Package.submitted_at.desc(), Package.id.desc())
+    )
+
+def _naive_utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+def _text(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def encode_csv(header: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the file as UTF-8; the import endpoint reads it back as utf-8-sig
+    buffer.write("\ufeff")
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([_text(value) for value in row])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+def encode_ndjson(header: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    lines: List[str] = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(header, row)), default=_json_default)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= FLUSH_BYTES:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines, size = [], 0
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def encode_xlsx(header: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """
+    openpyxl's write-only mode keeps memory flat by spooling each sheet to a temp file; the
+    workbook (a zip) can only be sent once it is complete, so the download starts after the
+    last row. Sheets roll over at Excel's row limit.
+    """
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, sheets = None, XLSX_MAX_ROWS, 0
+    for row in rows:
+        if sheet_rows >= XLSX_MAX_ROWS:
+            sheets += 1
+            sheet = workbook.create_sheet(title="Packages" if sheets == 1 else f"Packages {sheets}")
+            sheet.append(list(header))
+            sheet_rows = 1
+        sheet.append([_naive_utc(value) if isinstance(value, datetime) else value for value in row])
+        sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet(title="Packages").append(list(header))
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook.save(path)
+        with open(path, "rb") as source:
+            for chunk in iter(lambda: source.read(FLUSH_BYTES), b""):
+                yield chunk
+    finally:
+        os.remove(path)
+
+def check_export_format(fmt: str) -> None:
+    """Fail before the response starts; errors raised mid-stream cannot change the status code"""
+    if fmt not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{fmt}'. Use one of: {', '.join(EXPORT_MEDIA_TYPES)}")
+    if fmt == "xlsx":
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="XLSX export requires the openpyxl package")
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "xlsx": encode_xlsx}
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def stream_export(build_query: Callable[[Session], Query], fmt: str, flatten_items: bool, compress: bool = False) -> Iterator[bytes]:
+    """
+    Encode the export as it is read. Runs with its own session (the request's session is closed
+    before a streamed body is sent) and a server-side cursor fetching EXPORT_BATCH_SIZE rows at a
+    time, so memory stays flat however many rows match.
+    """
+    db = SessionLocal()
+    try:
+        query = export_query(build_query(db), flatten_items)
+        header = [column["name"] for column in query.column_descriptions]
+        chunks = ENCODERS[fmt](header, query.yield_per(EXPORT_BATCH_SIZE))
+        yield from gzip_stream(chunks) if compress else chunks
+    finally:
+        db.close()
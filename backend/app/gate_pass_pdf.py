@@ -0,0 +1,295 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from PIL import Image as PILImage
+from reportlab.graphics.barcode.code128 import Code128
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from app.config import settings
+from app.events import broker
+from app.models import Package
+
+# Bump when the layout changes so cached PDFs are rendered again
+TEMPLATE_VERSION = 1
+COMPANY_NAME = "Rangsons Aerospace Pvt Ltd"
+COMPANY_ADDRESS = "# 142, 3rd floor KMK Towers, KH Road Bangalore, Karnataka."
+LOGO_PIXELS = 240  # About 400 dpi at the printed 14mm
+SECURITY_NOTICE = (
+    "This gate pass must be presented at the security checkpoint for verification. "
+    "Please ensure all items are properly packed and sealed before dispatch."
+)
+
+@lru_cache(maxsize=1)
+def _logo_bytes(path: str) -> Optional[bytes]:
+    """The logo re-encoded once per process at print size, instead of embedding the source file in every pass"""
+    if not os.path.exists(path):
+        return None
+    with PILImage.open(path) as source:
+        logo = source.convert("RGB")
+        logo.thumbnail((LOGO_PIXELS, LOGO_PIXELS))
+        encoded = io.BytesIO()
+        logo.save(encoded, format="JPEG", quality=85)
+    return encoded.getvalue()
+
+def _text(value) -> str:
+    return "" if value is None else str(value)
+
+def _money(value) -> str:
+    return "" if value is None else f"{value:.2f}"
+
+def gate_pass_context(package: Package) -> Dict:
+    """
+    Everything printed on the pass, as plain data: it is what gets sent to the worker
+    processes and hashed into the cache key, so any change to it renders a new PDF.
+    """
+    dimensions = package.dimensions or []
+    return {
+        "template": TEMPLATE_VERSION,
+        "package_id": package.id,
+        "gate_pass_serial_number": package.gate_pass_serial_number,
+        "tracking_number": package.tracking_number,
+        "is_returnable": bool(package.is_returnable),
+        "date": (package.submitted_at or datetime.utcnow()).strftime("%b %d, %Y"),
+        "requested_by": package.submitted_by_user.full_name if package.submitted_by_user else None,
+        "recipient": package.recipient,
+        "to_address": package.to_address,
+        "manager": package.assigned_manager.full_name if package.assigned_manager else None,
+        "number_of_packages": package.number_of_packages or 1,
+        "weights": [f"{d.weight}{d.weight_unit or 'kg'}" for d in dimensions if d.weight],
+        "dimensions": [d.dimension for d in dimensions if d.dimension],
+        "purpose": next((d.purpose for d in dimensions if d.purpose), None),
+        "project_code": package.project_code,
+        "remarks": package.remarks,
+        "transportation_type": package.transportation_type,
+        "carrier": " ".join(filter(None, [package.courier_name, package.carrier_name])),
+        "carrier_reference": " ".join(filter(None, [package.courier_tracking_number, package.vehicle_details])),
+        "po_number": package.po_number,
+        "po_date": package.po_date.strftime("%b %d, %Y") if package.po_date else None,
+        "return_date": package.return_date.strftime("%b %d, %Y") if package.return_date else None,
+        "return_reason": package.return_reason,
+        "items": [
+            {
+                "serial_number": item.serial_number,
+                "hsn_code": item.hsn_code,
+                "description": item.description,
+                "quantity": item.quantity,
+                "unit_price": item.unit_price,
+                "value": item.value,
+            }
+            for item in sorted(package.items or [], key=lambda item: item.id)
+        ],
+    }
+
+def context_digest(context: Dict) -> str:
+    return hashlib.sha256(json.dumps(context, sort_keys=True, default=str).encode()).hexdigest()
+
+def render_gate_pass(context: Dict) -> bytes:
+    """Render one A4 gate pass. Runs in a worker process, so it only takes and returns plain data."""
+    styles = getSampleStyleSheet()
+    body = ParagraphStyle("body", parent=styles["Normal"], fontSize=9, leading=11)
+    label = ParagraphStyle("label", parent=body, fontName="Helvetica-Bold")
+    small = ParagraphStyle("small", parent=body, fontSize=8, leading=10, textColor=colors.grey, alignment=TA_CENTER)
+    title = ParagraphStyle("title", parent=styles["Title"], fontSize=16, leading=19, alignment=0, spaceAfter=0)
+    number = ParagraphStyle("number", parent=title, fontSize=13, alignment=TA_RIGHT)
+
+    def p(value, style=body):
+        return Paragraph(_text(value).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;") or "N/A", style)
+
+    def rows(pairs):
+        return [[p(name, label), p(value)] for name, value in pairs]
+
+    grid = TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
+    ])
+    boxed = TableStyle([("BOX", (0, 0), (-1, -1), 0.5, colors.black), ("VALIGN", (0, 0), (-1, -1), "TOP")])
+    pass_type = "RGP" if context["is_returnable"] else "N-RGP"
+    width = A4[0] - 30 * mm
+
+    brand = [Paragraph(COMPANY_NAME, title), p(COMPANY_ADDRESS)]
+    logo = _logo_bytes(settings.gate_pass_logo_path) if settings.gate_pass_logo_path else None
+    if logo:
+        brand = [[Image(io.BytesIO(logo), width=14 * mm, height=14 * mm), brand]]
+        brand = Table(brand, colWidths=[16 * mm, None])
+    header = Table(
+        [[brand, [Paragraph("GATE PASS #", label), Paragraph(_text(context["gate_pass_serial_number"]) or "N/A", number)]]],
+        colWidths=[width * 0.62, width * 0.38]
+    )
+    header.setStyle(TableStyle([("LINEBELOW", (0, 0), (-1, 0), 1, colors.black), ("VALIGN", (0, 0), (-1, -1), "MIDDLE")]))
+
+    barcode = Code128(context["tracking_number"] or "N/A", barHeight=12 * mm, barWidth=0.35 * mm)
+    summary = Table(
+        [[p(f"Date: {context['date']}"), [barcode, p(context["tracking_number"], small)], Paragraph(pass_type, number)]],
+        colWidths=[width * 0.3, width * 0.5, width * 0.2]
+    )
+    summary.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "MIDDLE"), ("ALIGN", (1, 0), (1, 0), "CENTER")]))
+
+    details = Table(rows([
+        ("Requested By", context["requested_by"]),
+        ("Consignee Name", context["recipient"]),
+        ("To Address", context["to_address"]),
+        ("Manager Name", context["manager"]),
+        ("Number of Packages", context["number_of_packages"]),
+        ("Weight", ", ".join(context["weights"])),
+        ("Dimensions", ", ".join(context["dimensions"])),
+        ("Project Code", context["project_code"]),
+        ("Remarks", context["remarks"]),
+    ]), colWidths=[width * 0.16, width * 0.42])
+    details.setStyle(boxed)
+    transport = Table(rows([
+        ("Transportation", context["transportation_type"]),
+        ("Courier / Carrier", context["carrier"]),
+        ("Docket / Vehicle", context["carrier_reference"]),
+        ("PO Number", context["po_number"]),
+        ("PO Date", context["po_date"]),
+        ("Return Date", context["return_date"] if context["is_returnable"] else "Not returnable"),
+        ("Return Reason", context["return_reason"] if context["is_returnable"] else "-"),
+    ]), colWidths=[width * 0.16, width * 0.26])
+    transport.setStyle(boxed)
+    columns = Table([[details, transport]], colWidths=[width * 0.58, width * 0.42])
+    columns.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "TOP"), ("LEFTPADDING", (0, 0), (-1, -1), 0)]))
+
+    item_rows = [[p(h, label) for h in ("Serial No.", "HSN Code", "Description", "Qty", "Unit Price", "Value")]]
+    for item in context["items"]:
+        item_rows.append([
+            p(item["serial_number"]), p(item["hsn_code"]), p(item["description"]),
+            p(item["quantity"]), p(_money(item["unit_price"])), p(_money(item["value"])),
+        ])
+    if not context["items"]:
+        item_rows.append([p("No items specified"), "", "", "", "", ""])
+    else:
+        total_quantity = sum(item["quantity"] or 0 for item in context["items"])
+        total_value = sum(item["value"] or 0 for item in context["items"])
+        item_rows.append([p("Total", label), "", "", p(total_quantity, label), "", p(f"{total_value:.2f}", label)])
+    items = Table(item_rows, colWidths=[width * w for w in (0.15, 0.12, 0.39, 0.08, 0.13, 0.13)], repeatRows=1)
+    items.setStyle(grid)
+
+    signatures = Table(
+        [["", "", ""], [p(name, small) for name in ("Requested By", "Manager / Authorized", "Carrier / Received By")]],
+        colWidths=[width / 3] * 3,
+        rowHeights=[14 * mm, None]
+    )
+    signatures.setStyle(TableStyle([("LINEBELOW", (0, 0), (-1, 0), 0.5, colors.black), ("LEFTPADDING", (0, 0), (-1, -1), 8 * mm), ("RIGHTPADDING", (0, 0), (-1, -1), 8 * mm)]))
+
+    buffer = io.BytesIO()
+    document = SimpleDocTemplate(
+        buffer, pagesize=A4, leftMargin=15 * mm, rightMargin=15 * mm, topMargin=12 * mm, bottomMargin=12 * mm,
+        title=f"Gate Pass {_text(context['gate_pass_serial_number'])}", creator=COMPANY_NAME
+    )
+    document.build([
+        header, Spacer(1, 3 * mm), summary, Spacer(1, 3 * mm), columns, Spacer(1, 4 * mm),
+        Paragraph("Item Details", label), Spacer(1, 1 * mm), items, Spacer(1, 3 * mm),
+        p(f"Purpose: {_text(context['purpose']) or 'N/A'}"), Spacer(1, 6 * mm),
+        signatures, Spacer(1, 6 * mm), p(SECURITY_NOTICE, small),
+    ])
+    return buffer.getvalue()
+
+class GatePassCache:
+    """
+    Rendered passes on disk under <directory>/<package_id>/<digest>.pdf, keyed by the digest of
+    the pass context. A changed package simply misses and its old file is replaced; package
+    events drop this process's copies early.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, package_id: int, digest: str) -> str:
+        return os.path.join(self.directory, str(package_id), f"{digest[:32]}.pdf")
+
+    def get(self, package_id: int, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._path(package_id, digest), "rb") as cached:
+                return cached.read()
+        except OSError:
+            return None
+
+    def set(self, package_id: int, digest: str, pdf: bytes) -> None:
+        path = self._path(package_id, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(partial, "wb") as out:
+            out.write(pdf)
+        os.replace(partial, path)
+        self.discard(package_id, keep=path)
+
+    def discard(self, package_id: int, keep: Optional[str] = None) -> None:
+        package_dir = os.path.join(self.directory, str(package_id))
+        try:
+            names = os.listdir(package_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(package_dir, name)
+            if path != keep and name.endswith(".pdf"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+class GatePassRenderer:
+    """
+    Renders passes in a process pool (reportlab is pure Python and CPU bound) and serves
+    repeats from GatePassCache. workers=0 renders inline.
+    """
+
+    def __init__(self, workers: int, cache: GatePassCache):
+        self.workers = workers
+        self.cache = cache
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def render_many(self, contexts: List[Dict]) -> List[bytes]:
+        """PDF bytes per context, in order; only cache misses are rendered"""
+        digests = [context_digest(context) for context in contexts]
+        pdfs = [self.cache.get(context["package_id"], digest) for context, digest in zip(contexts, digests)]
+        missing = [index for index, pdf in enumerate(pdfs) if pdf is None]
+        if missing:
+            to_render = [contexts[index] for index in missing]
+            if self.workers <= 0:
+                rendered = [render_gate_pass(context) for context in to_render]
+            else:
+                rendered = list(self._get_executor().map(render_gate_pass, to_render))
+            for index, pdf in zip(missing, rendered):
+                pdfs[index] = pdf
+                self.cache.set(contexts[index]["package_id"], digests[index], pdf)
+        return pdfs
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+def merge_pdfs(pdfs: List[bytes]) -> bytes:
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    for pdf in pdfs:
+        writer.append(io.BytesIO(pdf))
+    merged = io.BytesIO()
+    writer.write(merged)
+    return merged.getvalue()
+
+gate_pass_cache = GatePassCache(settings.gate_pass_cache_dir)
+gate_pass_renderer = GatePassRenderer(settings.gate_pass_render_workers, gate_pass_cache)
+
+broker.add_listener(lambda event: event["package_id"] is not None and gate_pass_cache.discard(event["package_id"]))
@@ -0,0 +1,102 @@
+import glob
+import os
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+
+from fastapi import UploadFile
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.images import VARIANT_DIR
+from app.models import ImageBlob
+from app.storage import stage_upload
+
+BLOB_DIR = os.path.join(settings.upload_dir, "package_images", "blobs")
+# Files younger than this may belong to an upload whose transaction has not committed yet
+GC_GRACE_PERIOD = timedelta(hours=1)
+
+def blob_path(sha256: str, extension: str = "") -> str:
+    """uploads/package_images/blobs/ab/ab12...ef.png - fanned out so no directory grows unbounded"""
+    return os.path.join(BLOB_DIR, sha256[:2], f"{sha256}{extension}")
+
+def file_extension(filename: Optional[str]) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if extension[1:].isalnum() else ""
+
+def find_or_create_blob(db: Session, sha256: str, source_path: str, size: int, extension: str = "") -> ImageBlob:
+    """
+    Return the blob for this content, moving source_path into the store only when the
+    content is new. A duplicate costs no disk write: the source file is simply removed.
+    The caller's PackageImage insert takes the reference (see the PackageImage listeners).
+    """
+    blob = db.query(ImageBlob).filter(ImageBlob.sha256 == sha256).first()
+    if blob is not None:
+        os.remove(source_path)
+        return blob
+    
+    path = blob_path(sha256, extension)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(source_path, path)
+    blob = ImageBlob(sha256=sha256, path=path, size_bytes=size)
+    try:
+        with db.begin_nested():
+            db.add(blob)
+    except IntegrityError:
+        # The same content was stored by a concurrent upload; reuse its row
+        blob = db.query(ImageBlob).filter(ImageBlob.sha256 == sha256).one()
+    return blob
+
+def store_image(db: Session, upload: UploadFile, label: str = "File") -> ImageBlob:
+    """Stream an upload into the content-addressed store (size-checked and hashed while copying)"""
+    staged = stage_upload(upload, BLOB_DIR, label)
+    try:
+        return find_or_create_blob(db, staged.sha256, staged.path, staged.size, file_extension(upload.filename))
+    except BaseException:
+        if os.path.exists(staged.path):
+            os.remove(staged.path)
+        raise
+
+def _remove(path: str) -> int:
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+    except OSError:
+        return 0
+
+def collect_garbage(db: Session, grace_period: timedelta = GC_GRACE_PERIOD) -> Dict[str, int]:
+    """
+    Delete blobs no PackageImage references any more, with their renditions, then sweep
+    files in the store that have no blob row (uploads whose request failed or lost a race).
+    Files are only removed after the row deletions commit.
+    """
+    unreferenced = db.query(ImageBlob).filter(ImageBlob.ref_count <= 0).all()
+    doomed = []
+    for blob in unreferenced:
+        # Re-check in the DELETE itself so a blob picked up again meanwhile survives
+        deleted = db.query(ImageBlob)\
+            .filter(ImageBlob.id == blob.id, ImageBlob.ref_count <= 0)\
+            .delete(synchronize_session=False)
+        if deleted:
+            doomed.append((blob.path, blob.sha256))
+    db.commit()
+    
+    result = {"blobs": len(doomed), "files": 0, "bytes": 0}
+    for blob_file, sha256 in doomed:
+        for path in [blob_file] + glob.glob(os.path.join(VARIANT_DIR, f"{sha256}_*")):
+            if os.path.exists(path):
+                result["bytes"] += _remove(path)
+                result["files"] += 1
+    
+    known = {os.path.normpath(path) for (path,) in db.query(ImageBlob.path).all()}
+    cutoff = time.time() - grace_period.total_seconds()
+    for root, _dirs, files in os.walk(BLOB_DIR):
+        for name in files:
+            path = os.path.normpath(os.path.join(root, name))
+            if path in known or os.path.getmtime(path) > cutoff:
+                continue
+            result["bytes"] += _remove(path)
+            result["files"] += 1
+    return result
@@ -0,0 +1,150 @@
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageOps, features
+
+from app.config import settings
+from app.database import SessionLocal
+from app.metrics import IMAGE_QUEUE_DEPTH
+from app.models import PackageImageVariant
+from app.storage import media_path
+
+# Longest edge in pixels for each rendition
+VARIANT_SIZES = {"thumb": 320, "medium": 960, "large": 1920}
+VARIANT_DIR = os.path.join(settings.upload_dir, "package_images", "variants")
+FORMAT_PRIORITY = ["avif", "webp", "jpeg"]
+SAVE_OPTIONS = {
+    "avif": {"quality": 60},
+    "webp": {"quality": 80, "method": 4},
+    "jpeg": {"quality": 82, "optimize": True, "progressive": True},
+}
+
+def output_formats() -> List[str]:
+    """WebP always (plus a JPEG fallback); AVIF when Pillow was built with libavif"""
+    formats = ["webp", "jpeg"]
+    if features.check("avif"):
+        formats.insert(0, "avif")
+    return formats
+
+def render_variants(key: str, source_path: str, dest_dir: str) -> List[Dict]:
+    """
+    Render every size/format of one image, named after key. Runs in a worker process,
+    so it only takes and returns plain data. EXIF orientation is applied to the pixels and
+    the metadata (GPS, camera details) is dropped because it is never copied to the output.
+    Files that already exist (same content uploaded before) are not encoded again.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    rendered = []
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        longest = max(image.size)
+        for variant, size in VARIANT_SIZES.items():
+            # Skip upscales, but always keep the smallest rendition
+            if size > longest and variant != "thumb":
+                continue
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            for fmt in output_formats():
+                frame = resized.convert("RGB") if fmt == "jpeg" and resized.mode != "RGB" else resized
+                path = os.path.join(dest_dir, f"{key}_{variant}.{fmt}")
+                if not os.path.exists(path):
+                    # Write aside and rename so a concurrent render of the same key never sees a partial file
+                    partial = f"{path}.{os.getpid()}.part"
+                    frame.save(partial, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+                    os.replace(partial, path)
+                rendered.append({
+                    "variant": variant,
+                    "format": fmt,
+                    "width": frame.width,
+                    "height": frame.height,
+                    "size_bytes": os.path.getsize(path),
+                    "path": path,
+                })
+    return rendered
+
+def record_variants(image_id: int, rendered: List[Dict]) -> None:
+    db = SessionLocal()
+    try:
+        db.query(PackageImageVariant).filter(PackageImageVariant.image_id == image_id).delete()
+        db.add_all([PackageImageVariant(image_id=image_id, **variant) for variant in rendered])
+        db.commit()
+    finally:
+        db.close()
+
+class ImageProcessor:
+    """
+    Local background queue for image renditions backed by a process pool (no external broker).
+    Requests enqueue after their commit and return immediately; results are written to
+    package_image_variants when each job finishes.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def enqueue(self, image_id: int, image_path: str, content_key: Optional[str] = None) -> Optional[Future]:
+        """content_key (the blob sha256) lets images sharing a blob share one set of renditions"""
+        source_path = media_path(image_path)
+        key = content_key or str(image_id)
+        if self.workers <= 0:
+            try:
+                record_variants(image_id, render_variants(key, source_path, VARIANT_DIR))
+            except Exception as e:
+                print(f"Error creating variants for image {image_id}: {e}")
+            return None
+        with self._lock:
+            self._pending += 1
+        IMAGE_QUEUE_DEPTH.inc()
+        future = self._get_executor().submit(render_variants, key, source_path, VARIANT_DIR)
+        future.add_done_callback(lambda done: self._finished(image_id, done))
+        return future
+
+    def _finished(self, image_id: int, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+        IMAGE_QUEUE_DEPTH.dec()
+        try:
+            record_variants(image_id, future.result())
+        except Exception as e:
+            print(f"Error creating variants for image {image_id}: {e}")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+image_processor = ImageProcessor(settings.image_workers)
+
+def pick_variant(variants: List[PackageImageVariant], width: Optional[int], accept: str = "") -> Optional[PackageImageVariant]:
+    """
+    Smallest rendition at least `width` pixels wide (the largest one if none is or no
+    width is given), in the most compact format the client accepts.
+    """
+    accepted = [fmt for fmt in FORMAT_PRIORITY if fmt == "jpeg" or f"image/{fmt}" in accept]
+    candidates = [v for v in variants if v.format in accepted]
+    if not candidates:
+        return None
+    fmt = next(fmt for fmt in accepted if any(v.format == fmt for v in candidates))
+    candidates = sorted((v for v in candidates if v.format == fmt), key=lambda v: v.width)
+    if width:
+        for variant in candidates:
+            if variant.width >= width:
+                return variant
+    return candidates[-1]
@@ -0,0 +1,253 @@
+import codecs
+import csv
+import json
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.events import broker
+from app.models import Package, PackageDimension, PackageItem, User, generate_tracking_number
+from app.schemas import PackageImportCreated, PackageImportError, PackageImportReport, PackageImportRow
+from app.sequences import allocate_sequence, format_gate_pass_number, get_financial_year, pass_type_for
+
+IMPORT_FORMATS = ("csv", "xlsx", "ndjson")
+# Packages validated, inserted and committed together; also the size of each gate pass number block
+IMPORT_CHUNK_SIZE = 500
+
+# Flat spreadsheet columns folded into one item / one dimension per row
+ITEM_COLUMNS = {
+    "item_description": "description",
+    "item_quantity": "quantity",
+    "item_serial_number": "serial_number",
+    "item_hsn_code": "hsn_code",
+    "item_unit_price": "unit_price",
+    "item_value": "value",
+}
+DIMENSION_COLUMNS = {"weight": "weight", "weight_unit": "weight_unit", "dimension": "dimension", "purpose": "purpose"}
+PACKAGE_FIELDS = [name for name in PackageImportRow.model_fields if name not in ("items", "dimensions")]
+ITEM_FIELDS = ["description", "quantity", "serial_number", "hsn_code", "unit_price", "value"]
+DIMENSION_FIELDS = ["weight", "weight_unit", "dimension", "purpose"]
+
+def detect_format(filename: Optional[str], requested: Optional[str]) -> str:
+    fmt = (requested or os.path.splitext(filename or "")[1].lstrip(".")).lower()
+    fmt = {"jsonl": "ndjson", "json": "ndjson"}.get(fmt, fmt)
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format '{fmt}'. Use one of: {', '.join(IMPORT_FORMATS)}")
+    return fmt
+
+def _text_lines(upload: UploadFile) -> Iterator[str]:
+    upload.file.seek(0)
+    return codecs.iterdecode(upload.file, "utf-8-sig")
+
+def iter_records(upload: UploadFile, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    (row number, record dict) pairs read incrementally from the upload; a record that cannot
+    be parsed is yielded as an Exception so it ends up in the error report.
+    Row numbers match what the user sees: spreadsheet rows (header = 1) or NDJSON lines.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(_text_lines(upload))
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == "ndjson":
+        for line_number, line in enumerate(_text_lines(upload), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                yield line_number, record if isinstance(record, dict) else ValueError("Each line must be a JSON object")
+            except json.JSONDecodeError as e:
+                yield line_number, ValueError(f"Invalid JSON: {e.msg}")
+    else:
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise HTTPException(status_code=400, detail="XLSX import requires the openpyxl package")
+        upload.file.seek(0)
+        workbook = load_workbook(upload.file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(cell).strip() if cell is not None else "" for cell in next(rows, [])]
+            for row_number, values in enumerate(rows, start=2):
+                if all(value is None for value in values):
+                    continue
+                yield row_number, dict(zip(header, values))
+        finally:
+            workbook.close()
+
+def _clean(value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+def normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Blank cells are dropped, so the field's default applies (an empty transportation_type cell
+    means courier, not an invalid None); flat item_* and weight/dimension columns become one
+    item/dimension
+    """
+    record = {
+        str(key).strip().lower(): _clean(value)
+        for key, value in record.items()
+        if key is not None and _clean(value) is not None
+    }
+    item = {field: record.pop(column) for column, field in ITEM_COLUMNS.items() if column in record}
+    dimension = {field: record.pop(column) for column, field in DIMENSION_COLUMNS.items() if column in record}
+    items = record.get("items") or []
+    dimensions = record.get("dimensions") or []
+    if item:
+        items = list(items) + [item]
+    if any(key != "weight_unit" for key in dimension):
+        dimensions = list(dimensions) + [dimension]
+    record["items"] = items
+    record["dimensions"] = dimensions
+    return record
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()
+        )
+    return str(error)
+
+def iter_packages(records: Iterator[Tuple[int, Any]]) -> Iterator[Tuple[int, Any]]:
+    """
+    Validate records into PackageImportRow objects. Adjacent rows sharing a package_ref are
+    one package: the first row carries the package fields, later rows only add items/dimensions.
+    """
+    pending: Optional[Tuple[int, str, Dict[str, Any]]] = None
+    
+    def finish(row_number: int, record: Dict[str, Any]):
+        try:
+            return row_number, PackageImportRow.model_validate(record)
+        except ValidationError as e:
+            return row_number, e
+    
+    for row_number, record in records:
+        if isinstance(record, Exception):
+            if pending:
+                yield finish(pending[0], pending[2])
+                pending = None
+            yield row_number, record
+            continue
+        record = normalize_record(record)
+        ref = record.pop("package_ref", None)
+        if pending and ref is not None and str(ref) == pending[1]:
+            pending[2]["items"].extend(record["items"])
+            pending[2]["dimensions"].extend(record["dimensions"])
+            continue
+        if pending:
+            yield finish(pending[0], pending[2])
+            pending = None
+        if ref is not None:
+            pending = (row_number, str(ref), record)
+        else:
+            yield finish(row_number, record)
+    if pending:
+        yield finish(pending[0], pending[2])
+
+def _insert_chunk(db: Session, chunk: List[Tuple[int, PackageImportRow]], user: User) -> List[PackageImportCreated]:
+    """One transaction: a gate pass number block per pass type, then one executemany per table"""
+    financial_year = get_financial_year()
+    needing_numbers = defaultdict(list)
+    for index, (_, row) in enumerate(chunk):
+        if not row.gate_pass_serial_number:
+            needing_numbers[pass_type_for(row.is_returnable)].append(index)
+    numbers: Dict[int, str] = {}
+    for pass_type, indexes in needing_numbers.items():
+        last = allocate_sequence(db, financial_year, pass_type, len(indexes))
+        for offset, index in enumerate(indexes):
+            numbers[index] = format_gate_pass_number(pass_type, financial_year, last - len(indexes) + 1 + offset)
+    
+    package_rows = []
+    for index, (_, row) in enumerate(chunk):
+        values = {field: getattr(row, field) for field in PACKAGE_FIELDS}
+        values["gate_pass_serial_number"] = row.gate_pass_serial_number or numbers[index]
+        values["tracking_number"] = generate_tracking_number()
+        values["status"] = "logistics_pending" if row.transportation_type == "courier" else "submitted"
+        values["submitted_by"] = user.id
+        package_rows.append(values)
+    inserted = db.execute(
+        insert(Package).returning(
+            Package.id,
+            Package.status,
+            Package.return_status,
+            Package.submitted_by,
+            Package.assigned_to_manager,
+            Package.gate_pass_serial_number,
+            sort_by_parameter_order=True
+        ),
+        package_rows
+    ).all()
+    
+    item_rows, dimension_rows = [], []
+    for package, (_, row) in zip(inserted, chunk):
+        item_rows.extend({"package_id": package.id, **item.model_dump(include=set(ITEM_FIELDS))} for item in row.items)
+        dimension_rows.extend({"package_id": package.id, **dim.model_dump(include=set(DIMENSION_FIELDS))} for dim in row.dimensions)
+    if item_rows:
+        db.execute(insert(PackageItem), item_rows)
+    if dimension_rows:
+        db.execute(insert(PackageDimension), dimension_rows)
+    db.commit()
+    
+    # One event per chunk: a per-package event would cost a NOTIFY each and flood every stream
+    broker.publish_batch("created", inserted)
+    return [
+        PackageImportCreated(row=row_number, package_id=package.id, gate_pass_serial_number=package.gate_pass_serial_number)
+        for package, (row_number, _) in zip(inserted, chunk)
+    ]
+
+def import_packages(
+    db: Session,
+    upload: UploadFile,
+    fmt: str,
+    user: User,
+    dry_run: bool = False,
+    chunk_size: int = IMPORT_CHUNK_SIZE
+) -> PackageImportReport:
+    """
+    Stream, validate and insert an import file chunk by chunk. Invalid rows are reported and
+    skipped; each chunk of valid rows commits on its own, so a database error only fails that chunk.
+    """
+    started = time.perf_counter()
+    report = PackageImportReport(dry_run=dry_run)
+    chunk: List[Tuple[int, PackageImportRow]] = []
+    
+    def flush():
+        if not chunk:
+            return
+        if dry_run:
+            report.created += len(chunk)
+        else:
+            try:
+                created = _insert_chunk(db, chunk, user)
+                report.packages.extend(created)
+                report.created += len(created)
+            except SQLAlchemyError as e:
+                db.rollback()
+                message = f"Database error, chunk not imported: {getattr(e, 'orig', e)}"
+                report.errors.extend(PackageImportError(row=row_number, message=message) for row_number, _ in chunk)
+                report.failed += len(chunk)
+        chunk.clear()
+    
+    for row_number, result in iter_packages(iter_records(upload, fmt)):
+        report.rows += 1
+        if isinstance(result, Exception):
+            report.errors.append(PackageImportError(row=row_number, message=_error_message(result)))
+            report.failed += 1
+            continue
+        chunk.append((row_number, result))
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+    
+    report.elapsed_seconds = round(time.perf_counter() - started, 3)
+    return report
@@ -0,0 +1,104 @@
+import base64
+import hashlib
+import hmac
+import mimetypes
+import os
+import re
+import time
+from typing import Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.config import settings
+from app.storage import media_url
+
+# Blob and rendition file names start with the sha256 of their content, so their URLs never change meaning
+CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{64}(?:_[a-z]+)?\.[0-9a-z]+$")
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Precompressed siblings (file.svg.br, file.svg.gz) are served when the client accepts them
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+def _signature(relative_path: str, expires: int) -> str:
+    message = f"{relative_path}:{expires}".encode()
+    digest = hmac.new(settings.secret_key.encode(), message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:18]).decode()
+
+def media_link(path: str) -> str:
+    """
+    URL to hand to clients for a stored file. With media_signed_urls enabled the URL carries
+    an expiry and HMAC signature; the expiry is rounded to a whole window so the URL, and
+    the browser's cached copy, stay the same for that window.
+    """
+    url = media_url(path)
+    if not settings.media_signed_urls:
+        return url
+    window = settings.media_url_ttl_seconds
+    expires = (int(time.time()) // window + 2) * window
+    relative_path = url[len("/uploads/"):]
+    return f"{url}?expires={expires}&signature={_signature(relative_path, expires)}"
+
+class MediaFiles(StaticFiles):
+    """
+    StaticFiles for uploaded media: strong ETags and year-long immutable caching for
+    content-addressed files, revalidation for everything else, precompressed siblings,
+    and signature checks when media_signed_urls is enabled. Range requests and
+    304 responses come from Starlette's FileResponse and is_not_modified.
+    """
+
+    def _expires(self, path: str, scope: Scope) -> Optional[int]:
+        if not settings.media_signed_urls:
+            return None
+        query = parse_qs(scope.get("query_string", b"").decode())
+        try:
+            expires = int(query["expires"][0])
+            signature = query["signature"][0]
+        except (KeyError, ValueError):
+            raise HTTPException(status_code=403, detail="Signed URL required")
+        relative_path = path.replace(os.sep, "/")
+        if expires < time.time() or not hmac.compare_digest(signature, _signature(relative_path, expires)):
+            raise HTTPException(status_code=403, detail="Invalid or expired signature")
+        return expires
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        scope["media_expires"] = self._expires(path, scope)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        name = os.path.basename(full_path)
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        
+        serve_path, encoding = full_path, None
+        accepted = request_headers.get("accept-encoding", "")
+        for candidate, suffix in PRECOMPRESSED:
+            if candidate in accepted and os.path.isfile(full_path + suffix):
+                serve_path, encoding = full_path + suffix, candidate
+                stat_result = os.stat(serve_path)
+                break
+        
+        response = FileResponse(serve_path, status_code=status_code, stat_result=stat_result, media_type=media_type)
+        if encoding:
+            response.headers["content-encoding"] = encoding
+        response.headers["vary"] = "Accept-Encoding"
+        
+        expires = scope.get("media_expires")
+        if CONTENT_ADDRESSED.match(name):
+            # The name is the content hash: a strong validator that never changes
+            stem = name.rsplit(".", 1)[0]
+            response.headers["etag"] = f'"{stem}-{encoding}"' if encoding else f'"{stem}"'
+            if expires is None:
+                response.headers["cache-control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+            else:
+                response.headers["cache-control"] = f"private, max-age={max(int(expires - time.time()), 0)}, immutable"
+        else:
+            response.headers["cache-control"] = "private, no-cache" if expires is not None else "no-cache"
+        
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,134 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from fastapi import APIRouter
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# With PROMETHEUS_MULTIPROC_DIR set (an empty directory, wiped before the server starts) every
+# worker writes its samples there and /metrics on any worker reports the sum over all of them
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status code",
+    ["method", "route", "status"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time from request start to the last byte of the response body",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests currently being handled (the route is only known once routed)",
+    ["method"], multiprocess_mode="livesum"
+)
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+)
+DB_POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts_total", "Checkouts that gave up after db_pool_timeout")
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out", "Pooled connections currently in use", multiprocess_mode="livesum"
+)
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_connections_capacity", "pool_size + max_overflow; checked_out / capacity is the pool saturation",
+    multiprocess_mode="livesum"
+)
+
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes of uploaded files written to disk")
+UPLOAD_FILES = Counter("upload_files_total", "Uploaded files stored")
+
+IMAGE_QUEUE_DEPTH = Gauge(
+    "image_processing_queue_depth", "Image rendition jobs queued or running", multiprocess_mode="livesum"
+)
+
+GATE_PASS_ALLOCATION_SECONDS = Histogram(
+    "gate_pass_allocation_seconds", "Time to reserve the next gate pass number",
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition text for /metrics and its content type"""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges (in-flight requests, pool and queue gauges) on shutdown"""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(os.getpid())
+
+# id(route) -> full path template for routes of included routers, whose own path omits the prefix
+ROUTE_TEMPLATES: Dict[int, str] = {}
+
+def label_routes(router: APIRouter, prefix: str) -> None:
+    for route in router.routes:
+        ROUTE_TEMPLATES[id(route)] = prefix + getattr(route, "path", "")
+
+def route_label(scope: Scope, root_path: str) -> str:
+    """
+    The path template the request was routed to ("/api/packages/{package_id}") rather than the
+    path itself, so labels stay bounded however many ids are requested. Read after the request
+    is handled, once routing has filled in the scope.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return ROUTE_TEMPLATES.get(id(route)) or getattr(route, "path", "unmatched")
+    # Mounted apps (/uploads) only leave their prefix behind in root_path
+    mounted = scope.get("root_path", "")[len(root_path):]
+    return mounted or "unmatched"
+
+# (scope, root_path) of the request being handled, for code that runs without the Request
+_request_scope: ContextVar[Optional[Tuple[Scope, str]]] = ContextVar("request_scope", default=None)
+
+def current_route() -> Optional[str]:
+    """Method and route template of the current request ("GET /api/packages/"), None outside one"""
+    current = _request_scope.get()
+    if current is None:
+        return None
+    scope, root_path = current
+    return f"{scope['method']} {route_label(scope, root_path)}"
+
+class MetricsMiddleware:
+    """
+    Per-route request count and latency, and requests in flight. Plain ASGI rather than
+    BaseHTTPMiddleware so streamed responses (exports, PDFs) are timed until the body ends.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        root_path = scope.get("root_path", "")
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        token = _request_scope.set((scope, root_path))
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_scope.reset(token)
+            route = route_label(scope, root_path)
+            HTTP_REQUEST_SECONDS.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            in_progress.dec()
@@ -4,6 +4,7 @@ from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, Foreign
 from sqlalchemy.orm import relationship, Session
 from sqlalchemy.sql import func
 from app.database import Base
+from app.media import media_link
 
 def generate_tracking_number():
     """Generate a random tracking number in the format TRK + 8 mixed letters/numbers (11 total)"""
@@ -56,18 +57,20 @@ class Package(Base):
     notes = Column(Text, nullable=True)
     priority = Column(String, default="medium")
     status = Column(String, default="submitted")
-    gate_pass_serial_number = Column(String, nullable=True)
+    gate_pass_serial_number = Column(String, nullable=True, index=True)
     
     submitted_by = Column(Integer, ForeignKey("users.id"))
     assigned_to_manager = Column(Integer, ForeignKey("users.id"), nullable=True)
-    approved_by = Column(Integer, ForeignKey("users.id"), nullable=True)
-    rejected_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    approved_by = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    rejected_by = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     # Manager name is now derived from the assigned_to_manager relationship
     
     submitted_at = Column(DateTime(timezone=True), server_default=func.now())
     approved_at = Column(DateTime(timezone=True), nullable=True)
     rejected_at = Column(DateTime(timezone=True), nullable=True)
     dispatched_at = Column(DateTime(timezone=True), nullable=True)
+    # Maintained on every ORM update; drives the updated_since delta sync of the package list
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
     
     return_status = Column(String, nullable=True)
     is_returnable = Column(Boolean, default=False, nullable=True)
@@ -76,10 +79,25 @@ class Package(Base):
     vehicle_details = Column(Text, nullable=True)
     carrier_name = Column(String, nullable=True)
     courier_name = Column(String, nullable=True)
-    courier_tracking_number = Column(String, nullable=True)
+    courier_tracking_number = Column(String, nullable=True, index=True)
     transportation_type = Column(String, nullable=True)
     number_of_packages = Column(Integer, default=1, nullable=False)
     
+    # Matched to the package list: keyset order (submitted_at DESC, id DESC) behind its filters
+    __table_args__ = (
+        Index('ix_packages_submitted_at_id', submitted_at.desc(), id.desc()),
+        Index('ix_packages_status_submitted_at', status, submitted_at.desc(), id.desc()),
+        Index('ix_packages_manager_status_submitted_at', assigned_to_manager, status, submitted_at.desc(), id.desc()),
+        Index('ix_packages_manager_updated_at', assigned_to_manager, updated_at),
+        # Returnables still out, by due date; same predicate as the overdue count in app.stats.
+        # SQLite only matches predicate terms a query repeats verbatim, and it binds "returned"
+        Index(
+            'ix_packages_open_returns', return_date,
+            postgresql_where=is_returnable.is_(True) & (return_status.is_(None) | (return_status != "returned")),
+            sqlite_where=is_returnable.is_(True)
+        ),
+    )
+    
     submitted_by_user = relationship("User", foreign_keys=[submitted_by], back_populates="packages")
     assigned_manager = relationship("User", foreign_keys=[assigned_to_manager], back_populates="assigned_packages")
     approved_by_user = relationship("User", foreign_keys=[approved_by])
@@ -96,6 +114,46 @@ def generate_tracking_number_before_insert(mapper, connection, target):
     if not target.tracking_number:
         target.tracking_number = generate_tracking_number()
 
+@event.listens_for(Package, 'after_delete')
+def record_tombstone_after_delete(mapper, connection, target):
+    """Leave a tombstone so delta-syncing clients can drop the deleted package"""
+    connection.execute(
+        PackageTombstone.__table__.insert().values(
+            package_id=target.id,
+            manager_id=target.assigned_to_manager,
+            reason="deleted"
+        )
+    )
+
+class RefreshToken(Base):
+    """
+    Server-side refresh session. Only the sha256 of the token is stored. Each refresh replaces
+    the token with a new one in the same family; presenting a replaced token again revokes the family.
+    """
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id = Column(String(32), nullable=False, index=True)  # Shared by every rotation of one login
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    replaced_by_id = Column(Integer, nullable=True)
+
+class PackageTombstone(Base):
+    """
+    Record of a package leaving a client's view: deleted outright, or reassigned
+    away from manager_id. Delta-syncing clients remove these ids locally.
+    """
+    __tablename__ = "package_tombstones"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    package_id = Column(Integer, nullable=False)
+    manager_id = Column(Integer, nullable=True)  # Manager the package was removed from, if any
+    reason = Column(String, nullable=False)  # "deleted" or "reassigned"
+    removed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
 class PackageDimension(Base):
     __tablename__ = "package_dimensions"
     
@@ -118,7 +176,65 @@ class PackageImage(Base):
     image_type = Column(String, default="package")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    blob_id = Column(Integer, ForeignKey("image_blobs.id"), nullable=True, index=True)  # None for files stored before deduplication
+    
     package = relationship("Package", back_populates="images")
+    blob = relationship("ImageBlob", back_populates="images")
+    variants = relationship("PackageImageVariant", back_populates="image", cascade="all, delete-orphan")
+
+def _adjust_blob_refs(connection, blob_id, delta):
+    if blob_id is not None:
+        connection.execute(
+            ImageBlob.__table__.update()
+            .where(ImageBlob.__table__.c.id == blob_id)
+            .values(ref_count=ImageBlob.__table__.c.ref_count + delta)
+        )
+
+@event.listens_for(PackageImage, 'after_insert')
+def increment_blob_refs_after_insert(mapper, connection, target):
+    """Count the new reference in the same transaction that inserts the image"""
+    _adjust_blob_refs(connection, target.blob_id, 1)
+
+@event.listens_for(PackageImage, 'after_delete')
+def decrement_blob_refs_after_delete(mapper, connection, target):
+    """Blobs that drop to zero references are removed by the image garbage collector"""
+    _adjust_blob_refs(connection, target.blob_id, -1)
+
+class ImageBlob(Base):
+    """
+    Image file stored once per distinct content (sha256) and shared by every
+    PackageImage that uploaded the same bytes; ref_count tracks those rows.
+    """
+    __tablename__ = "image_blobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), unique=True, nullable=False, index=True)
+    path = Column(String, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    images = relationship("PackageImage", back_populates="blob")
+
+class PackageImageVariant(Base):
+    """Resized, EXIF-stripped rendition of a PackageImage produced by the background image worker"""
+    __tablename__ = "package_image_variants"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    image_id = Column(Integer, ForeignKey("package_images.id", ondelete="CASCADE"), nullable=False, index=True)
+    variant = Column(String, nullable=False)  # "thumb", "medium" or "large"
+    format = Column(String, nullable=False)  # "webp", "avif" or "jpeg"
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    path = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    image = relationship("PackageImage", back_populates="variants")
+
+    @property
+    def url(self):
+        return media_link(self.path)
 
 class ReturnInfo(Base):
     __tablename__ = "return_info"
@@ -136,7 +252,7 @@ class PackageItem(Base):
     __tablename__ = "package_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    package_id = Column(Integer, ForeignKey("packages.id"), nullable=False)
+    package_id = Column(Integer, ForeignKey("packages.id"), nullable=False, index=True)
     description = Column(String, nullable=False)
     quantity = Column(Integer, default=1, nullable=False)
     serial_number = Column(String, nullable=True)
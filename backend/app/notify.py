@@ -0,0 +1,66 @@
+import select
+import threading
+from typing import Callable, Optional
+
+from sqlalchemy.engine import Engine
+
+class NotificationListener:
+    """
+    Background thread LISTENing on a PostgreSQL channel with its own connection (psycopg2).
+    on_notify(payload) runs for every notification; on_connect() after every (re)connect,
+    since notifications sent while the connection was down are lost.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        channel: str,
+        on_notify: Callable[[str], None],
+        on_connect: Optional[Callable[[], None]] = None,
+        name: Optional[str] = None,
+    ):
+        self.engine = engine
+        self.channel = channel
+        self.on_notify = on_notify
+        self.on_connect = on_connect
+        self.name = name or channel
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine.dialect.name == "postgresql" and self.engine.dialect.driver == "psycopg2"
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                connection = self.engine.raw_connection()
+                try:
+                    dbapi_connection = connection.dbapi_connection
+                    dbapi_connection.autocommit = True
+                    with dbapi_connection.cursor() as cursor:
+                        cursor.execute(f"LISTEN {self.channel}")
+                    if self.on_connect is not None:
+                        self.on_connect()
+                    while not self._stop.is_set():
+                        if select.select([dbapi_connection], [], [], 5)[0]:
+                            dbapi_connection.poll()
+                            while dbapi_connection.notifies:
+                                notification = dbapi_connection.notifies.pop(0)
+                                self.on_notify(notification.payload)
+                finally:
+                    connection.invalidate()
+            except Exception as e:
+                print(f"{self.name} listener error: {e}")
+                self._stop.wait(5)
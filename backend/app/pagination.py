@@ -0,0 +1,98 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Query, joinedload, noload, selectinload
+
+from app.models import Package
+
+# Relationships of Package that the list endpoint can expand on request.
+# Collections are loaded with a separate SELECT ... IN so LIMIT applies to packages, not joined rows.
+PACKAGE_RELATIONS = {
+    "items": (Package.items, selectinload),
+    "dimensions": (Package.dimensions, selectinload),
+    "submitted_by_user": (Package.submitted_by_user, joinedload),
+    "assigned_manager": (Package.assigned_manager, joinedload),
+    "approved_by_user": (Package.approved_by_user, joinedload),
+    "rejected_by_user": (Package.rejected_by_user, joinedload),
+}
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """
+    Parse a comma separated `fields=` value into relationship names.
+    No value means every relationship, matching the unprojected response.
+    """
+    if fields is None:
+        return list(PACKAGE_RELATIONS)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in PACKAGE_RELATIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(PACKAGE_RELATIONS)}"
+        )
+    return requested
+
+def apply_projection(query: Query, fields: List[str]) -> Query:
+    """
+    Eager load the requested relationships and explicitly skip the rest,
+    so serialization never falls back to a lazy load per row.
+    """
+    options = []
+    for name, (relationship, loader) in PACKAGE_RELATIONS.items():
+        options.append(loader(relationship) if name in fields else noload(relationship))
+    return query.options(*options)
+
+def package_detail_options(*collections) -> list:
+    """
+    Loader options for a single package response: the four users are joined into the package
+    query, while every collection the Package schema serializes (plus any extra collections
+    the caller reads, e.g. return_records) gets its own SELECT ... IN. Joining the collections
+    too would return items x dimensions x ... rows for the one package. Costs one statement
+    for the package plus one per collection.
+    """
+    return [loader(relationship) for relationship, loader in PACKAGE_RELATIONS.values()] + \
+        [selectinload(collection) for collection in collections]
+
+def encode_cursor(package: Package) -> str:
+    """Encode the (submitted_at, id) keyset position of a package as an opaque token"""
+    payload = json.dumps({"s": package.submitted_at.isoformat(), "i": package.id})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["s"]), int(payload["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def apply_keyset(query: Query, cursor: Optional[str]) -> Query:
+    """
+    Order by (submitted_at DESC, id DESC) and continue after the cursor position.
+    The predicate only touches the sort key, so every page costs the same regardless of depth.
+    """
+    if cursor:
+        submitted_at, package_id = decode_cursor(cursor)
+        # Compare against the stored anchor row when it still exists so the timestamp is
+        # matched in the database's own representation; fall back to the cursor value.
+        anchor = select(Package.submitted_at).where(Package.id == package_id).scalar_subquery()
+        anchor_at = func.coalesce(anchor, submitted_at)
+        query = query.filter(
+            or_(
+                Package.submitted_at < anchor_at,
+                and_(Package.submitted_at == anchor_at, Package.id < package_id)
+            )
+        )
+    return query.order_by(Package.submitted_at.desc(), Package.id.desc())
+
+def fetch_page(query: Query, limit: int) -> Tuple[List[Package], Optional[str]]:
+    """Fetch one page plus a look-ahead row to decide whether a next cursor exists"""
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
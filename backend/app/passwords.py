@@ -0,0 +1,78 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a small process pool so the deliberately slow hashing neither holds the GIL
+    against request threads nor occupies more than `workers` cores. At most `max_pending`
+    hashes may be queued or running; beyond that callers get a 503 at once instead of piling
+    up behind a login storm. The async methods hold no thread at all while the hash runs.
+    workers=0 hashes inline.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(status_code=503, detail="Too many logins in progress, please retry", headers={"Retry-After": "2"})
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Released when the hash finishes, even if the request waiting for it was cancelled
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        return self._submit(fn, *args).result()
+
+    async def _run_async(self, fn, *args):
+        if self.workers <= 0:
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(_verify, plain_password, hashed_password)
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run_async(_verify, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+password_hasher = PasswordHasher(settings.password_hash_workers, max_pending=settings.password_hash_max_pending)
@@ -0,0 +1,73 @@
+import hashlib
+import time
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy import select as sql_select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.cache import TTLCache
+from app.config import settings
+from app.models import User
+from app.notify import NotificationListener
+
+# PostgreSQL NOTIFY channel carrying the id of a user whose cached principals must be dropped
+INVALIDATION_CHANNEL = "auth_principal_invalidate"
+
+principal_cache = TTLCache(ttl_seconds=settings.auth_cache_ttl_seconds, max_entries=settings.auth_cache_max_entries)
+
+def token_key(token: str) -> str:
+    """Cache key for a bearer token; the raw token is never kept in memory longer than the request"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def cached_principal(db: Session, token: str) -> Optional[User]:
+    """
+    The user a previously verified token resolved to, attached to this request's session
+    without a query (merge with load=False), or None on a miss or once the token expired.
+    """
+    key = token_key(token)
+    entry = principal_cache.get(key)
+    if entry is None:
+        return None
+    user, expires_at = entry
+    if expires_at is not None and expires_at <= time.time():
+        principal_cache.delete(key)
+        return None
+    return db.merge(user, load=False)
+
+def remember_principal(token: str, user: User, expires_at: Optional[float]) -> None:
+    """Cache a detached copy of the user's columns; the request's own instance stays in its session"""
+    snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(snapshot)
+    principal_cache.set(token_key(token), (snapshot, expires_at))
+
+def _discard_user(user_id: int) -> int:
+    return principal_cache.discard_where(lambda entry: entry[0].id == user_id)
+
+def invalidate_principal(engine: Engine, user_id: int) -> None:
+    """
+    Drop cached principals of a user after their role, email or password changed or they were
+    deleted. Call after the change commits. On PostgreSQL every other worker is told via NOTIFY;
+    elsewhere (SQLite, single process) the local cache is all there is.
+    """
+    _discard_user(user_id)
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(sql_select(func.pg_notify(INVALIDATION_CHANNEL, str(user_id))))
+            conn.commit()
+
+class InvalidationListener(NotificationListener):
+    """
+    LISTENs on INVALIDATION_CHANNEL in a background thread (PostgreSQL with psycopg2).
+    After a reconnect the whole cache is cleared, since notifications may have been missed.
+    """
+
+    def __init__(self, engine: Engine):
+        super().__init__(
+            engine,
+            INVALIDATION_CHANNEL,
+            on_notify=lambda payload: _discard_user(int(payload)),
+            on_connect=principal_cache.clear,
+            name="principal-invalidation",
+        )
@@ -0,0 +1,278 @@
+import asyncio
+import sys
+import threading
+import time
+import tracemalloc
+from contextvars import Context, ContextVar
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth import get_user_from_token
+from app.config import settings
+from app.database import SessionLocal
+from app.metrics import route_label
+
+PROFILE_MODES = ("cpu", "memory")
+
+# Where a sample's time went, by the innermost frame from one of these libraries
+CATEGORIES = (
+    ("sql", ("/sqlalchemy/engine/", "/sqlalchemy/pool/", "/sqlalchemy/dialects/", "/sqlite3/", "/psycopg2/")),
+    ("orm", ("/sqlalchemy/orm/", "/sqlalchemy/sql/", "/sqlalchemy/util/")),
+    ("validation", ("/pydantic/", "/pydantic_core/", "/fastapi/_compat")),
+    ("json", ("/json/", "/fastapi/encoders.py", "/starlette/responses.py")),
+    ("app", ("/app/",)),
+)
+
+# Frames that switch into a request's context: anyio's worker thread loop (context.run(func))
+# and asyncio's Handle._run (self._context.run(callback)) for the event loop thread
+CONTEXT_SWITCH_FRAMES = ("run", "_run")
+
+_active_profile: ContextVar[Optional["RequestSampler"]] = ContextVar("active_profile", default=None)
+_profile_lock = threading.Lock()
+
+def frame_category(filename: str) -> Optional[str]:
+    path = filename.replace("\\", "/")
+    for category, markers in CATEGORIES:
+        if any(marker in path for marker in markers):
+            return category
+    return None
+
+class RequestSampler(threading.Thread):
+    """
+    Samples the stacks of every thread currently working for one request: the event loop while
+    it runs the request's task and the threadpool workers running its sync dependencies, handler
+    and response validation. A thread is attributed by the contextvars.Context it is running,
+    so other requests handled by the same worker at the same time stay out of the profile.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.samples: Dict[Tuple, float] = {}
+        self.sampled_seconds = 0.0
+        self._stop_event = threading.Event()
+        self._loop_thread = threading.get_ident()
+        self._switch_interval = sys.getswitchinterval()
+
+    def start(self) -> None:
+        # The sampler needs the GIL to take a sample; by default another thread holds it for up to 5ms
+        sys.setswitchinterval(min(self._switch_interval, self.interval / 2))
+        super().start()
+
+    def run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                stack = self._request_stack(frame)
+                if stack:
+                    label = "event loop" if thread_id == self._loop_thread else "threadpool"
+                    key = (label,) + stack
+                    self.samples[key] = self.samples.get(key, 0.0) + elapsed
+                    self.sampled_seconds += elapsed
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def _request_stack(self, frame) -> Optional[Tuple]:
+        """Frames below the context switch into this request, root first; None for other work"""
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        for depth in range(len(frames) - 1, -1, -1):
+            current = frames[depth]
+            if current.f_code.co_name not in CONTEXT_SWITCH_FRAMES:
+                continue
+            context = self._context_of(current)
+            if context is None:
+                continue
+            if context.get(_active_profile) is not self:
+                return None
+            return tuple(
+                (f.f_code.co_name, f.f_code.co_filename, f.f_code.co_firstlineno)
+                for f in reversed(frames[:depth])
+            )
+        return None
+
+    @staticmethod
+    def _context_of(frame) -> Optional[Context]:
+        for value in frame.f_locals.values():
+            if isinstance(value, Context):
+                return value
+            if isinstance(value, asyncio.Handle):
+                return value._context
+        return None
+
+    def breakdown(self) -> Dict[str, float]:
+        """Share of sampled time per category, attributed to the innermost categorized frame"""
+        totals: Dict[str, float] = {}
+        for stack, seconds in self.samples.items():
+            category = "other"
+            for name, filename, _ in reversed(stack[1:]):
+                found = frame_category(filename)
+                if found:
+                    category = found
+                    break
+            totals[category] = totals.get(category, 0.0) + seconds
+        total = self.sampled_seconds or 1
+        return {category: round(100 * seconds / total, 1) for category, seconds in sorted(totals.items(), key=lambda item: -item[1])}
+
+    def speedscope(self, name: str) -> dict:
+        """Sampled profile in speedscope's file format (https://www.speedscope.app), times in ms"""
+        frame_index: Dict[Tuple, int] = {}
+        frames: List[dict] = []
+        samples, weights = [], []
+        for stack, seconds in self.samples.items():
+            indices = []
+            for frame in (("thread: " + stack[0], "", 0),) + stack[1:]:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    function, filename, line = frame
+                    frames.append({"name": function, "file": filename, "line": line} if filename else {"name": function})
+                indices.append(frame_index[frame])
+            samples.append(indices)
+            weights.append(round(seconds * 1000, 3))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "package-management-api",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+def _memory_report(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, peak: int, limit: int = 25) -> dict:
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    differences = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "traceback")
+    return {
+        "allocated_bytes": sum(stat.size_diff for stat in differences if stat.size_diff > 0),
+        "retained_bytes": sum(stat.size_diff for stat in differences),
+        "peak_bytes": peak,
+        "top": [
+            {
+                "size_bytes": stat.size_diff,
+                "count": stat.count_diff,
+                "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            }
+            for stat in differences[:limit]
+        ],
+    }
+
+def _authorize(authorization: str) -> None:
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Profiling requires an admin bearer token")
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(db, token)
+    finally:
+        db.close()
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can profile requests")
+
+def requested_mode(scope: Scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value.decode("latin-1").strip().lower()
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query["_profile"][0].lower() if "_profile" in query else None
+
+class ProfilerMiddleware:
+    """
+    Profile one request on demand: send `X-Profile: cpu` (or `?_profile=cpu`) with an admin
+    token and the response is replaced by a speedscope JSON profile of the request, with the
+    share of time spent in SQL, ORM, validation, JSON encoding and app code in X-Profile-Breakdown.
+    `memory` returns the allocations made while the request ran (tracemalloc snapshots taken
+    before and after; tracing is process wide, so concurrent requests add to it). One profile at
+    a time per worker; the original status is in X-Profiled-Status.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        mode = requested_mode(scope) if scope["type"] == "http" and settings.request_profiling else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        error = await self._check(scope, mode)
+        if error is not None:
+            await error(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send, mode)
+        finally:
+            _profile_lock.release()
+
+    async def _check(self, scope: Scope, mode: str) -> Optional[JSONResponse]:
+        if mode not in PROFILE_MODES:
+            return JSONResponse({"detail": f"Unknown profile mode '{mode}'. Use one of: {', '.join(PROFILE_MODES)}"}, status_code=400)
+        authorization = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"authorization"), "")
+        try:
+            await run_in_threadpool(_authorize, authorization)
+        except HTTPException as e:
+            return JSONResponse({"detail": e.detail}, status_code=e.status_code)
+        if not _profile_lock.acquire(blocking=False):
+            return JSONResponse({"detail": "Another request is being profiled on this worker"}, status_code=409)
+        return None
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send, mode: str) -> None:
+        root_path = scope.get("root_path", "")
+        status = 500
+
+        async def capture(message: Message) -> None:
+            nonlocal status
+            # The response itself is dropped; only its status is reported
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        sampler = RequestSampler(settings.profiler_interval_ms / 1000) if mode == "cpu" else None
+        started_tracing = False
+        if mode == "memory":
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(settings.profiler_traceback_frames)
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+        token = _active_profile.set(sampler)
+        started = time.perf_counter()
+        if sampler is not None:
+            sampler.start()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            wall_ms = (time.perf_counter() - started) * 1000
+            if sampler is not None:
+                sampler.stop()
+            _active_profile.reset(token)
+
+        name = f"{scope['method']} {route_label(scope, root_path)}"
+        headers = {"X-Profiled-Status": str(status), "X-Profile-Wall-Ms": f"{wall_ms:.1f}"}
+        if sampler is not None:
+            body = sampler.speedscope(name)
+            headers["X-Profile-Breakdown"] = ", ".join(f"{category}={share}%" for category, share in sampler.breakdown().items())
+        else:
+            after = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+            body = {"name": name, "status": status, "wall_ms": round(wall_ms, 1), **_memory_report(before, after, peak)}
+        await JSONResponse(body, headers=headers)(scope, receive, send)
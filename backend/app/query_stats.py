@@ -0,0 +1,116 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.metrics import route_label
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised with QUERY_BUDGET_MODE=raise, so a test client call fails on a query regression"""
+
+@dataclass
+class RequestQueries:
+    statements: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+    budget: Optional[int] = None
+    repeated: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, seconds: float, rowcount: int) -> None:
+        self.statements += 1
+        self.seconds += seconds
+        # Rows returned or affected; drivers that cannot tell (SQLite SELECTs, server-side cursors) report -1
+        if rowcount > 0:
+            self.rows += rowcount
+        self.repeated[statement] += 1
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.statements} queries, {self.rows} rows"'
+
+    def most_repeated(self):
+        """(statement, count) of the statement run most often, e.g. one lazy load per row"""
+        return self.repeated.most_common(1)[0] if self.repeated else (None, 0)
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+def current_queries() -> Optional[RequestQueries]:
+    return _current.get()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    queries = _current.get()
+    if queries is not None:
+        queries.record(statement, time.perf_counter() - started, cursor.rowcount)
+
+def instrument_queries(engine) -> None:
+    """Attribute every statement the engine runs to the request it runs for"""
+    if not settings.sql_accounting:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def query_budget(max_statements: int):
+    """
+    Route dependency declaring how many statements a request may run, including auth:
+        @router.get("/{package_id}", dependencies=[Depends(query_budget(4))])
+    """
+    async def declare_budget():
+        queries = _current.get()
+        if queries is not None:
+            queries.budget = max_statements
+    return declare_budget
+
+class QueryStatsMiddleware:
+    """
+    Counts statements, rows and database time per request. The totals go out in a Server-Timing
+    header (statements run while a streamed body is sent are only in the log) and are logged
+    with SQL_LOG_REQUESTS, when a request exceeds its query_budget or repeats one statement
+    N_PLUS_ONE_THRESHOLD times.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.sql_accounting:
+            await self.app(scope, receive, send)
+            return
+        queries = RequestQueries()
+        token = _current.set(queries)
+        root_path = scope.get("root_path", "")
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", queries.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+        self._report(queries, f"{scope['method']} {route_label(scope, root_path)} {status}")
+
+    def _report(self, queries: RequestQueries, request: str) -> None:
+        summary = f"{request}: {queries.statements} queries, {queries.rows} rows, {queries.seconds * 1000:.1f}ms in the database"
+        if settings.sql_log_requests:
+            print(f"SQL {summary}")
+        statement, count = queries.most_repeated()
+        if count >= settings.n_plus_one_threshold:
+            print(f"Possible N+1 in {request}: ran {count} times: {' '.join(statement.split())[:300]}")
+        if queries.budget is not None and queries.statements > queries.budget:
+            message = f"Query budget exceeded by {summary} (budget {queries.budget})"
+            if settings.query_budget_mode == "raise":
+                raise QueryBudgetExceeded(message)
+            print(message)
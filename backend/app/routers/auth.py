@@ -1,21 +1,40 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import User
-from app.schemas import UserCreate, User, UserLogin, Token
+from app.models import User, RefreshToken as RefreshTokenModel
+from app.schemas import UserCreate, User, UserLogin, Token, RefreshTokenRequest
 from app.auth import (
-    authenticate_user, 
     create_access_token, 
+    create_refresh_token,
+    revoke_refresh_family,
+    rotate_refresh_token,
     get_password_hash,
     get_current_user,
-    get_user_by_email
+    get_user_by_email,
+    refresh_token_hash,
+    require_role,
+    verify_password_async
 )
 from app.config import settings
+from app.principals import principal_cache
 
 router = APIRouter()
 
+def issue_tokens(user, refresh_token: str) -> dict:
+    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+    access_token = create_access_token(
+        data={"sub": user.email}, expires_delta=access_token_expires
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds())
+    }
+
 @router.post("/register", response_model=User)
 def register(user: UserCreate, db: Session = Depends(get_db)):
     # Check if user already exists
@@ -40,21 +59,59 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     db.refresh(db_user)
     return db_user
 
+def start_session(db: Session, user) -> str:
+    refresh_token, _ = create_refresh_token(db, user)
+    db.commit()
+    return refresh_token
+
 @router.post("/login", response_model=Token)
-def login(form_data: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.email, form_data.password)
-    if not user:
+async def login(form_data: UserLogin, db: Session = Depends(get_db)):
+    """
+    Async so no request thread waits while bcrypt runs in the hasher's process pool;
+    the two database steps run in the threadpool
+    """
+    user = await run_in_threadpool(get_user_by_email, db, form_data.email)
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token = await run_in_threadpool(start_session, db, user)
+    return issue_tokens(user, refresh_token)
+
+@router.post("/refresh", response_model=Token)
+def refresh(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    New access token (and a new refresh token; the presented one stops working) without
+    re-entering the password, so bcrypt only runs at real logins.
+    """
+    user, refresh_token = rotate_refresh_token(db, request.refresh_token)
+    return issue_tokens(user, refresh_token)
+
+@router.post("/logout")
+def logout(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """End the session the refresh token belongs to; unknown tokens are ignored"""
+    record = db.query(RefreshTokenModel).filter(
+        RefreshTokenModel.token_hash == refresh_token_hash(request.refresh_token)
+    ).first()
+    if record:
+        revoke_refresh_family(db, record.family_id)
+        db.commit()
+    return {"message": "Logged out"}
 
 @router.get("/me", response_model=User)
 def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
+
+@router.get("/cache-stats")
+def get_principal_cache_stats(current_user: User = Depends(require_role(["admin"]))):
+    """Hit/miss counters of the in-process token -> user cache (this worker only)"""
+    lookups = principal_cache.hits + principal_cache.misses
+    return {
+        "entries": len(principal_cache),
+        "hits": principal_cache.hits,
+        "misses": principal_cache.misses,
+        "hit_ratio": round(principal_cache.hits / lookups, 4) if lookups else None,
+        "ttl_seconds": principal_cache.ttl_seconds
+    }
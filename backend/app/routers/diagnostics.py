@@ -0,0 +1,27 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+
+from app.auth import require_role
+from app.models import User
+from app.schemas import SlowQueryReport
+from app.slow_queries import slow_query_log
+
+router = APIRouter()
+
+@router.get("/slow-queries", response_model=SlowQueryReport)
+def get_slow_queries(
+    limit: int = Query(20, ge=1, le=200),
+    sort: Literal["total", "max", "count"] = Query("total", description="Rank by total time, slowest execution or count"),
+    current_user: User = Depends(require_role(["admin"]))
+):
+    """
+    Top slow statements of the worker that answers, grouped by normalized SQL, with the routes
+    that ran them and the latest sampled plan. Empty unless SLOW_QUERY_THRESHOLD_MS is set.
+    """
+    return slow_query_log.report(limit, sort)
+
+@router.delete("/slow-queries")
+def clear_slow_queries(current_user: User = Depends(require_role(["admin"]))):
+    slow_query_log.clear()
+    return {"message": "Slow query log cleared"}
@@ -1,12 +1,12 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session, joinedload, selectinload
 
+from app.config import settings
 from app.database import get_db
-from app.models import GatePassSequence as GatePassSequenceModel, User
+from app.models import GatePassSequence as GatePassSequenceModel, Package as PackageModel, User
 from app.schemas import (
+    GatePassPrintRequest,
     GatePassSequence,
     GatePassSequenceCreate,
     GatePassSequenceUpdate,
@@ -14,55 +14,30 @@ from app.schemas import (
     GatePassGenerateResponse
 )
 from app.auth import get_current_user, require_role
+from app.sequences import (
+    allocate_sequence,
+    block_allocator,
+    format_gate_pass_number,
+    get_financial_year,
+    pass_type_for,
+    peek_gate_pass_number
+)
+from app.gate_pass_pdf import context_digest, gate_pass_context, gate_pass_renderer, merge_pdfs
 
 router = APIRouter()
 
-def get_financial_year() -> str:
-    """
-    Gets the current financial year in YYYY format (e.g., 2526 for April 2025 - March 2026)
-    """
-    now = datetime.now()
-    year = now.year
-    month = now.month
-    
-    # Financial year starts in April (month 4)
-    financial_year_start = year if month >= 4 else year - 1
-    financial_year_end = financial_year_start + 1
-    
-    # Return last two digits of start and end years (e.g., 2526 for 2025-26)
-    return f"{str(financial_year_start)[-2:]}{str(financial_year_end)[-2:]}"
-
 def get_next_sequence_number(db: Session, financial_year: str, is_returnable: bool) -> int:
     """
-    Gets and increments the next sequence number for the given financial year and pass type
+    Gets and increments the next sequence number for the given financial year and pass type.
+    With GATE_PASS_BLOCK_SIZE > 1 numbers come from this worker's reserved block instead.
     """
-    pass_type = "RGP" if is_returnable else "NRGP"
-    
-    # Try to get existing sequence record
-    sequence_record = db.query(GatePassSequenceModel).filter(
-        and_(
-            GatePassSequenceModel.financial_year == financial_year,
-            GatePassSequenceModel.pass_type == pass_type
-        )
-    ).first()
+    pass_type = pass_type_for(is_returnable)
+    if settings.gate_pass_block_size > 1:
+        return block_allocator.next(financial_year, pass_type)
     
-    if sequence_record:
-        # Increment existing sequence
-        sequence_record.current_sequence += 1
-        db.commit()
-        db.refresh(sequence_record)
-        return sequence_record.current_sequence
-    else:
-        # Create new sequence record starting from 1
-        new_sequence = GatePassSequenceModel(
-            financial_year=financial_year,
-            pass_type=pass_type,
-            current_sequence=1
-        )
-        db.add(new_sequence)
-        db.commit()
-        db.refresh(new_sequence)
-        return new_sequence.current_sequence
+    sequence_number = allocate_sequence(db, financial_year, pass_type)
+    db.commit()
+    return sequence_number
 
 @router.post("/generate", response_model=GatePassGenerateResponse)
 def generate_gate_pass_number(
@@ -76,10 +51,8 @@ def generate_gate_pass_number(
     try:
         financial_year = get_financial_year()
         sequence_number = get_next_sequence_number(db, financial_year, request.is_returnable)
-        pass_type = "RGP" if request.is_returnable else "NRGP"
-        
-        # Format: RAPL-[RGP|NRGP]-[FY]/[SEQ]
-        gate_pass_number = f"RAPL-{pass_type}-{financial_year}/{sequence_number:03d}"
+        pass_type = pass_type_for(request.is_returnable)
+        gate_pass_number = format_gate_pass_number(pass_type, financial_year, sequence_number)
         
         return GatePassGenerateResponse(
             gate_pass_number=gate_pass_number,
@@ -93,6 +66,91 @@ def generate_gate_pass_number(
             detail=f"Failed to generate gate pass number: {str(e)}"
         )
 
+@router.get("/preview", response_model=GatePassGenerateResponse)
+def preview_gate_pass_number(
+    is_returnable: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Show the gate pass number the next submission is expected to get, without consuming it.
+    The number itself is allocated when the package is created, so a concurrent submission
+    can still take this one first.
+    """
+    gate_pass_number, financial_year, pass_type, sequence_number = peek_gate_pass_number(db, is_returnable)
+    return GatePassGenerateResponse(
+        gate_pass_number=gate_pass_number,
+        financial_year=financial_year,
+        pass_type=pass_type,
+        sequence_number=sequence_number
+    )
+
+def load_gate_pass_contexts(db: Session, package_ids: List[int]) -> List[dict]:
+    """Pass contexts in the requested order, loading every package with one query per relation"""
+    packages = (
+        db.query(PackageModel)
+        .options(
+            selectinload(PackageModel.items),
+            selectinload(PackageModel.dimensions),
+            joinedload(PackageModel.submitted_by_user),
+            joinedload(PackageModel.assigned_manager)
+        )
+        .filter(PackageModel.id.in_(package_ids))
+        .all()
+    )
+    by_id = {package.id: package for package in packages}
+    missing = [package_id for package_id in package_ids if package_id not in by_id]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Packages not found: {', '.join(map(str, missing))}")
+    return [gate_pass_context(by_id[package_id]) for package_id in package_ids]
+
+def pdf_response(pdf: bytes, filename: str, etag: str) -> Response:
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'inline; filename="{filename}"',
+            "ETag": etag,
+            "Cache-Control": "private, no-cache"
+        }
+    )
+
+@router.get("/{package_id}/pdf")
+def get_gate_pass_pdf(
+    package_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Printable gate pass (A4 PDF with the tracking number barcode). Rendered once per version of
+    the package and served from the cache afterwards; If-None-Match gets a 304 while it is unchanged.
+    """
+    context = load_gate_pass_contexts(db, [package_id])[0]
+    etag = f'"{context_digest(context)[:32]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    pdf = gate_pass_renderer.render_many([context])[0]
+    number = (context["gate_pass_serial_number"] or context["tracking_number"] or str(package_id)).replace("/", "-")
+    return pdf_response(pdf, f"gate-pass-{number}.pdf", etag)
+
+@router.post("/pdf")
+def print_gate_passes(
+    print_request: GatePassPrintRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Many gate passes merged into one PDF, in the order given, for printing at the gate in one go.
+    Passes not in the cache are rendered in parallel by the worker pool.
+    """
+    package_ids = list(dict.fromkeys(print_request.package_ids))
+    contexts = load_gate_pass_contexts(db, package_ids)
+    pdf = merge_pdfs(gate_pass_renderer.render_many(contexts))
+    etag = f'"{context_digest({"passes": [context_digest(context) for context in contexts]})[:32]}"'
+    print(f"Printed {len(contexts)} gate passes for {current_user.email}")
+    return pdf_response(pdf, f"gate-passes-{len(contexts)}.pdf", etag)
+
 @router.get("/sequences", response_model=List[GatePassSequence])
 def get_all_sequences(
     db: Session = Depends(get_db),
@@ -1,13 +1,16 @@
+import asyncio
 import json
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Form, File, UploadFile, Query, Body
-from sqlalchemy.orm import Session, joinedload, selectinload
-from sqlalchemy import and_
-from datetime import datetime, date, time
+from fastapi import APIRouter, Depends, HTTPException, status, Form, File, UploadFile, Query, Body, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, func
+from datetime import datetime, date, time, timedelta, timezone
 import os
 from dateutil import parser
 
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models import (
     Package as PackageModel, 
     User, 
@@ -15,7 +18,8 @@ from app.models import (
     PackageImage as PackageImageModel, 
     ReturnInfo as ReturnInfoModel, 
     PackageItem as PackageItemModel,
-    PackageImage
+    PackageImage,
+    PackageTombstone as PackageTombstoneModel
 )
 from app.schemas import (
     PackageCreate, 
@@ -26,34 +30,49 @@ from app.schemas import (
     ReturnInfo as ReturnInfoSchema,
     PackageWithReturnInfo,
     PackageWithWeights,
-    PackageImagesResponse
+    PackageImagesResponse,
+    PackageTombstone as PackageTombstoneSchema,
+    PackageImageVariant as PackageImageVariantSchema,
+    PackageStats,
+    PackageImportReport,
+    PackageBatchStatusUpdate,
+    PackageBatchAssign,
+    PackageBatchResult
 )
-from app.auth import get_current_user, require_role
+from app.auth import get_current_user, get_user_from_token, require_role
+from app.events import broker
+from app.pagination import apply_keyset, apply_projection, fetch_page, package_detail_options, parse_fields
+from app.search import apply_search
+from app.stats import get_package_stats
+from app.image_store import store_image
+from app.images import image_processor
+from app.media import media_link
+from app.sequences import allocate_gate_pass_number
+from app.imports import detect_format, import_packages
+from app.transitions import batch_assign, batch_update_status
+from app.exports import EXPORT_MEDIA_TYPES, check_export_format, stream_export
+from app.query_stats import query_budget
 
 router = APIRouter()
 
-@router.get("/", response_model=List[PackageSchema])
-def get_packages(
-    manager_id: Optional[int] = Query(None, description="Filter by assigned manager"),
-    status: Optional[str] = Query(None, description="Filter by package status"),
-    search: Optional[str] = Query(None, description="Search in tracking number, description, recipient, to_address"),
-    start_date: Optional[date] = Query(None, description="Filter by start date"),
-    end_date: Optional[date] = Query(None, description="Filter by end date"),
-    priority: Optional[str] = Query(None, description="Filter by priority"),
-    sort_by: Optional[str] = Query(None, description="Sort by date, priority, or recipient"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+DEFAULT_PAGE_SIZE = 50
+STREAM_HEARTBEAT_SECONDS = 15
+# Watermarks handed to delta-sync clients are moved back by this much so rows
+# committed by transactions still in flight during the query are picked up next time
+DELTA_SYNC_OVERLAP = timedelta(seconds=5)
+
+def apply_package_filters(
+    query,
+    current_user: User,
+    manager_id: Optional[int] = None,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    priority: Optional[str] = None,
+    updated_since: Optional[datetime] = None
 ):
-    query = db.query(PackageModel).options(
-        joinedload(PackageModel.items),
-        joinedload(PackageModel.dimensions),
-        joinedload(PackageModel.submitted_by_user),
-        joinedload(PackageModel.assigned_manager),
-        joinedload(PackageModel.approved_by_user),
-        joinedload(PackageModel.rejected_by_user)
-    )
-    
-    # Apply filters
+    """Filters shared by the package list and the export; returns the query and the search ranking (or None)"""
     if manager_id:
         query = query.filter(PackageModel.assigned_to_manager == manager_id)
     
@@ -64,15 +83,9 @@ def get_packages(
         else:
             query = query.filter(PackageModel.status == status)
     
+    search_order = None
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (PackageModel.tracking_number.ilike(search_filter)) |
-            (PackageModel.remarks.ilike(search_filter)) |
-            (PackageModel.recipient.ilike(search_filter)) |
-            (PackageModel.to_address.ilike(search_filter)) |
-            (PackageModel.notes.ilike(search_filter))
-        )
+        query, search_order = apply_search(query, search)
     
     if start_date:
         query = query.filter(PackageModel.submitted_at >= datetime.combine(start_date, datetime.min.time()))
@@ -83,36 +96,232 @@ def get_packages(
     if priority:
         query = query.filter(PackageModel.priority == priority)
     
+    if updated_since:
+        query = query.filter(PackageModel.updated_at > updated_since)
+    
+    return query, search_order
+
+# Statement budgets count authentication too (one user query when the principal cache misses)
+@router.get("/", response_model=List[PackageSchema], dependencies=[Depends(query_budget(5))])
+def get_packages(
+    response: Response,
+    manager_id: Optional[int] = Query(None, description="Filter by assigned manager"),
+    status: Optional[str] = Query(None, description="Filter by package status"),
+    search: Optional[str] = Query(None, description="Search in tracking/gate pass number, recipient, to_address, remarks, notes and item description/serial number"),
+    start_date: Optional[date] = Query(None, description="Filter by start date"),
+    end_date: Optional[date] = Query(None, description="Filter by end date"),
+    priority: Optional[str] = Query(None, description="Filter by priority"),
+    sort_by: Optional[str] = Query(None, description="Sort by date, priority, or recipient"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; enables keyset pagination on (submitted_at, id)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated relationships to include, e.g. items,assigned_manager"),
+    updated_since: Optional[datetime] = Query(None, description="Only packages changed after this watermark (from X-Sync-Watermark)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    paginate = limit is not None or cursor is not None
+    if paginate and sort_by not in (None, "date"):
+        raise HTTPException(status_code=400, detail="Cursor pagination only supports sorting by date")
+    
+    query = apply_projection(db.query(PackageModel), parse_fields(fields))
+    query, search_order = apply_package_filters(
+        query, current_user, manager_id, status, search, start_date, end_date, priority, updated_since
+    )
+    # Also sent on full loads, so a client can follow one with delta syncs
+    response.headers["X-Sync-Watermark"] = sync_watermark()
+    
+    if paginate:
+        packages, next_cursor = fetch_page(apply_keyset(query, cursor), limit or DEFAULT_PAGE_SIZE)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return packages
+    
     # Apply sorting
     if sort_by == "date":
-        query = query.order_by(Package.submitted_at.desc())
+        query = query.order_by(PackageModel.submitted_at.desc())
     elif sort_by == "priority":
         priority_order = {"high": 3, "medium": 2, "low": 1}
         query = query.order_by(PackageModel.priority.desc())
     elif sort_by == "recipient":
         query = query.order_by(PackageModel.recipient.asc())
+    elif search_order is not None:
+        query = query.order_by(search_order, PackageModel.submitted_at.desc())
     else:
         query = query.order_by(PackageModel.submitted_at.desc())
     
     packages = query.all()
     return packages
 
-@router.get("/{package_id}", response_model=PackageSchema)
+@router.get("/stats", response_model=PackageStats)
+def get_packages_stats(
+    start_date: Optional[date] = Query(None, description="Only packages submitted on or after this date"),
+    end_date: Optional[date] = Query(None, description="Only packages submitted on or before this date"),
+    days: int = Query(30, ge=1, le=366, description="Number of days covered by the per-day counts"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Dashboard aggregates: counts by status, priority, manager and day, per-project totals,
+    approval/dispatch turnaround percentiles and overdue returnables
+    """
+    return get_package_stats(db, current_user, start_date=start_date, end_date=end_date, days=days)
+
+@router.get("/export")
+def export_packages(
+    request: Request,
+    format: str = Query("csv", description="csv, ndjson or xlsx"),
+    flatten_items: bool = Query(False, description="One row per package item instead of one row per package"),
+    manager_id: Optional[int] = Query(None, description="Filter by assigned manager"),
+    status: Optional[str] = Query(None, description="Filter by package status"),
+    search: Optional[str] = Query(None, description="Same search as the package list"),
+    start_date: Optional[date] = Query(None, description="Filter by start date"),
+    end_date: Optional[date] = Query(None, description="Filter by end date"),
+    priority: Optional[str] = Query(None, description="Filter by priority"),
+    updated_since: Optional[datetime] = Query(None, description="Only packages changed after this time"),
+    current_user: User = Depends(require_role(["admin", "manager", "logistics", "security"]))
+):
+    """
+    Download every package matching the list filters, newest first. Rows are read with a
+    server-side cursor and encoded as they arrive, so memory use does not depend on the row count.
+    CSV and NDJSON are gzip-compressed on the fly when the client accepts it.
+    """
+    fmt = format.lower()
+    check_export_format(fmt)
+    compress = fmt != "xlsx" and "gzip" in request.headers.get("accept-encoding", "")
+    
+    def build_query(db: Session):
+        query, _ = apply_package_filters(
+            db.query(PackageModel), current_user, manager_id, status, search, start_date, end_date, priority, updated_since
+        )
+        return query
+    
+    filename = f"packages-{datetime.utcnow():%Y%m%d-%H%M%S}{'-items' if flatten_items else ''}.{fmt}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store", "Vary": "Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    print(f"Package export ({fmt}, flatten_items={flatten_items}) started by {current_user.email}")
+    return StreamingResponse(
+        stream_export(build_query, fmt, flatten_items, compress),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers=headers
+    )
+
+def sync_watermark() -> str:
+    return (datetime.now(timezone.utc) - DELTA_SYNC_OVERLAP).isoformat()
+
+@router.get("/tombstones", response_model=List[PackageTombstoneSchema])
+def get_package_tombstones(
+    response: Response,
+    since: datetime = Query(..., description="Watermark from the previous sync"),
+    manager_id: Optional[int] = Query(None, description="Include packages reassigned away from this manager"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Packages that left the caller's view since the watermark: deleted packages,
+    plus packages reassigned away from manager_id when given.
+    """
+    response.headers["X-Sync-Watermark"] = sync_watermark()
+    query = db.query(PackageTombstoneModel).filter(PackageTombstoneModel.removed_at > since)
+    if manager_id:
+        query = query.filter(
+            (PackageTombstoneModel.reason == "deleted") |
+            (PackageTombstoneModel.manager_id == manager_id)
+        )
+    else:
+        query = query.filter(PackageTombstoneModel.reason == "deleted")
+    return query.order_by(PackageTombstoneModel.removed_at.asc()).all()
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def authenticate_stream_user(token: str):
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(db, token)
+        return user.id, user.role
+    finally:
+        db.close()
+
+@router.get("/stream")
+async def stream_package_events(
+    request: Request,
+    token: Optional[str] = Query(None, description="Access token, for EventSource clients that cannot send headers"),
+    last_event_id: Optional[str] = Query(None, description="Resume after this event id (the Last-Event-ID header takes precedence)")
+):
+    """
+    Server-Sent Events feed of committed package changes visible to the current user.
+    Events carry the package id and new state; clients refetch only the packages that changed.
+    A `reset` event means the resume point is unknown and the client should reload its list.
+    """
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    # Authenticate with a short-lived session so the connection does not hold a DB session open
+    user_id, role = await run_in_threadpool(authenticate_stream_user, token)
+    
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    subscription, backlog = broker.subscribe(user_id, role, resume_from)
+    
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            if backlog is None:
+                yield f"id: {broker.last_event_id}\nevent: reset\ndata: {{}}\n\n"
+            else:
+                for event in backlog:
+                    yield format_sse(event)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.patch("/batch/status", response_model=PackageBatchResult)
+def update_packages_status(
+    update_data: PackageBatchStatusUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["manager", "security", "logistics", "admin"]))
+):
+    """
+    Approve, reject or dispatch many packages in one request. Only packages still in the
+    expected status change; every id gets an outcome, in request order.
+    """
+    result = batch_update_status(db, update_data.package_ids, update_data.status, current_user, update_data.notes)
+    print(f"Batch status '{update_data.status}' by {current_user.email}: {result.updated} updated, {result.failed} failed")
+    return result
+
+@router.patch("/batch/assign", response_model=PackageBatchResult)
+def assign_packages_to_manager(
+    assign_data: PackageBatchAssign,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["admin", "manager"]))
+):
+    return batch_assign(db, assign_data.package_ids, assign_data.manager_id)
+
+@router.get("/{package_id}", response_model=PackageSchema, dependencies=[Depends(query_budget(4))])
 def get_package(package_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     package = db.query(PackageModel)\
-        .options(
-            joinedload(PackageModel.items),
-            joinedload(PackageModel.dimensions),
-            joinedload(PackageModel.assigned_manager),
-            joinedload(PackageModel.submitted_by_user)
-        )\
+        .options(*package_detail_options())\
         .filter(PackageModel.id == package_id)\
         .first()
     if not package:
         raise HTTPException(status_code=404, detail="Package not found")
     return package
 
-@router.get("/tracking/{tracking_number}", response_model=PackageSchema)
+@router.get("/tracking/{tracking_number}", response_model=PackageSchema, dependencies=[Depends(query_budget(4))])
 def get_package_by_tracking(
     tracking_number: str,
     db: Session = Depends(get_db),
@@ -123,12 +332,7 @@ def get_package_by_tracking(
     """
     package = (
         db.query(PackageModel)
-        .options(
-            joinedload(PackageModel.assigned_manager),
-            joinedload(PackageModel.items),
-            joinedload(PackageModel.dimensions),
-            joinedload(PackageModel.return_records)
-        )
+        .options(*package_detail_options())
         .filter(PackageModel.tracking_number == tracking_number.upper())
         .first()
     )
@@ -236,6 +440,7 @@ def update_package_return_status(
         db.add(db_package)
         db.commit()
         db.refresh(db_package)
+        broker.publish("returned", db_package)
         
         print("[DEBUG] Successfully updated package return status")
         print(f"[DEBUG] Updated package: {db_package}")
@@ -257,12 +462,13 @@ def create_package(
     current_user: User = Depends(get_current_user)
 ):
     db_package = PackageModel(
-        **package.dict(),
+        **package.dict(exclude={"updated_at"}),
         submitted_by=current_user.id
     )
     db.add(db_package)
     db.commit()
     db.refresh(db_package)
+    broker.publish("created", db_package)
     return db_package
 
 @router.put("/{package_id}", response_model=PackageSchema)
@@ -287,6 +493,7 @@ def update_package(
     
     db.commit()
     db.refresh(db_package)
+    broker.publish("updated", db_package)
     return db_package
 
 from pydantic import BaseModel
@@ -296,7 +503,7 @@ class PackageStatusUpdate(BaseModel):
     notes: Optional[str] = None
 
 @router.patch("/{package_id}/status")
-async def update_package_status(
+def update_package_status(
     package_id: int,
     update_data: PackageStatusUpdate,
     db: Session = Depends(get_db),
@@ -332,6 +539,7 @@ async def update_package_status(
     # Commit changes to database
     db.commit()
     db.refresh(db_package)
+    broker.publish("status", db_package)
     
     return {"message": f"Package status updated to {update_data.status}", "package": db_package}
 
@@ -350,9 +558,13 @@ def assign_package_to_manager(
     if not manager:
         raise HTTPException(status_code=404, detail="Manager not found")
     
+    previous_manager = db_package.assigned_to_manager
     db_package.assigned_to_manager = manager_id
+    if previous_manager and previous_manager != manager_id:
+        db.add(PackageTombstoneModel(package_id=package_id, manager_id=previous_manager, reason="reassigned"))
     # Manager name is now derived from the assigned_to_manager relationship
     db.commit()
+    broker.publish("assigned", db_package)
     return {"message": "Package assigned successfully"}
 
 @router.post("/{package_id}/dimensions")
@@ -368,13 +580,15 @@ def add_package_dimension(
     
     db_dimension = PackageDimensionModel(**dimension.dict())
     db.add(db_dimension)
+    # Dimensions are part of the package payload, so the package counts as changed
+    package.updated_at = func.now()
     db.commit()
     db.refresh(db_dimension)
     return db_dimension
 
 @router.post("/create-with-files", response_model=PackageSchema)
-async def create_package_with_files(
-    gate_pass_serial_number: str = Form(..., description="Gate pass serial number"),
+def create_package_with_files(
+    gate_pass_serial_number: str = Form(None, description="Gate pass serial number; allocated from the RGP/NRGP sequence when omitted"),
     tracking_number: str = Form(None, description="Optional tracking number"),
     recipient: str = Form(...),
     to_address: str = Form(..., description="Delivery address"),
@@ -403,8 +617,7 @@ async def create_package_with_files(
 ):
     print("\n=== DEBUG: Starting package creation ===")
     print(f"Raw items JSON: {items}")  # Debug: Print raw items JSON
-    import json
-    from datetime import datetime
+    new_images = []
     
     try:
         # Parse items JSON
@@ -416,7 +629,7 @@ async def create_package_with_files(
         print(f"Parsed dimensions data: {dimensions_data}")  # Debug: Print parsed dimensions data
         
         # Clean input
-        gate_pass_serial_number = gate_pass_serial_number.strip()
+        gate_pass_serial_number = (gate_pass_serial_number or "").strip() or None
             
         # Always generate a new random tracking number in the format TRKXXXXXXX
         import random
@@ -552,68 +765,60 @@ async def create_package_with_files(
                 print("Created package_dimension:", package_dimension.__dict__)  # Debug log
                 db.add(package_dimension)
         
-        # Process and save images
-        import os
-        from datetime import datetime
-        from app.config import settings
-        
-        print(f"DEBUG: image_before_packing received: {image_before_packing}")
-        
-        # Validate file sizes
-        def validate_file_size(files, file_type):
-            if files:
-                for file in files:
-                    if file.filename:
-                        # Read file content to check size
-                        content = file.file.read()
-                        file.file.seek(0)  # Reset file pointer
-                        if len(content) > settings.max_file_size:
-                            raise HTTPException(
-                                status_code=413, 
-                                detail=f"{file_type} file '{file.filename}' is too large. Maximum size allowed: {settings.max_file_size / (1024*1024):.1f}MB"
-                            )
-        
-        # Validate before packing images only
-        validate_file_size(image_before_packing, "Before packing image")
-        
-        # Use existing uploads directory
-        upload_dir = "uploads/package_images"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Process before packing images only
+        # Store before packing images by content hash; a repeat upload reuses the existing file
         if image_before_packing:
             for image_file in image_before_packing:
                 if image_file.filename:
-                    # Generate unique filename
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    file_extension = os.path.splitext(image_file.filename)[1]
-                    base_filename = os.path.splitext(image_file.filename)[0]
-                    unique_filename = f"before_{db_package.id}_{timestamp}_{base_filename}{file_extension}"
-                    file_path = os.path.join(upload_dir, unique_filename)
-                    
-                    # Save file to disk
-                    with open(file_path, "wb") as buffer:
-                        content = await image_file.read()
-                        buffer.write(content)
+                    blob = store_image(db, image_file, label="Before packing image file")
                     
                     # Save image record to database
                     package_image = PackageImageModel(
                         package_id=db_package.id,
-                        image_path=file_path,
-                        image_type="before_packing"
+                        image_path=blob.path,
+                        image_type="before_packing",
+                        blob=blob
                     )
                     db.add(package_image)
-                    print(f"Saved before packing image: {file_path}")
+                    new_images.append(package_image)
+        
+        # Allocate the gate pass number last, in this transaction: the sequence row is locked only
+        # for the commit, and a failed submission rolls the number back instead of burning it
+        if not db_package.gate_pass_serial_number:
+            db_package.gate_pass_serial_number = allocate_gate_pass_number(db, is_returnable)
         
         db.commit()
         db.refresh(db_package)
+        broker.publish("created", db_package)
+        for package_image in new_images:
+            image_processor.enqueue(package_image.id, package_image.image_path, package_image.blob.sha256)
         
         return db_package
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=422, detail=str(e))
 
+@router.post("/import", response_model=PackageImportReport)
+def import_packages_file(
+    file: UploadFile = File(..., description="CSV, XLSX or NDJSON file, one package (or package item) per row"),
+    format: Optional[str] = Query(None, description="csv, xlsx or ndjson; taken from the file extension when omitted"),
+    dry_run: bool = Query(False, description="Validate every row without inserting anything"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["logistics", "admin", "manager"]))
+):
+    """
+    Bulk-create packages from a file. Rows are validated and inserted in chunks; invalid rows are
+    skipped and listed in the report with their row number. Rows sharing a package_ref column
+    become one package with several items.
+    """
+    fmt = detect_format(file.filename, format)
+    report = import_packages(db, file, fmt, current_user, dry_run=dry_run)
+    print(f"Package import by {current_user.email}: {report.created} created, {report.failed} failed in {report.elapsed_seconds}s")
+    return report
+
 @router.post("/{package_id}/return", response_model=ReturnInfoSchema)
 def create_return_info(
     package_id: int,
@@ -670,6 +875,7 @@ def create_return_info(
         
         # Refresh the return_info object
         db.refresh(return_info)
+        broker.publish("returned", db_package)
         
         return return_info
         
@@ -677,7 +883,7 @@ def create_return_info(
         db.rollback()
         raise HTTPException(status_code=422, detail=str(e))
 
-@router.get("/{package_id}/with-return", response_model=PackageWithReturnInfo)
+@router.get("/{package_id}/with-return", response_model=PackageWithReturnInfo, dependencies=[Depends(query_budget(5))])
 def get_package_with_return(
     package_id: int, 
     db: Session = Depends(get_db), 
@@ -688,10 +894,7 @@ def get_package_with_return(
     """
     # Get package with relationships
     package = db.query(PackageModel).options(
-        joinedload(PackageModel.assigned_manager),
-        joinedload(PackageModel.items),
-        joinedload(PackageModel.dimensions),
-        joinedload(PackageModel.return_records)
+        *package_detail_options(PackageModel.return_records)
     ).filter(
         PackageModel.id == package_id
     ).first()
@@ -707,11 +910,8 @@ def get_package_with_return(
     if package.assigned_manager:
         result['assigned_manager_name'] = package.assigned_manager.full_name
     
-    # Get return info from return_info table
-    return_info = db.query(ReturnInfoModel)\
-        .filter(ReturnInfoModel.package_id == package_id)\
-        .order_by(ReturnInfoModel.returned_at.desc())\
-        .first()
+    # Latest return record, already loaded with the package
+    return_info = max(package.return_records, key=lambda record: record.returned_at, default=None)
     
     # Add return info if exists
     if return_info:
@@ -731,7 +931,7 @@ def get_package_with_return(
     
     return result
 
-@router.get("/{package_id}/with-weights", response_model=PackageWithWeights)
+@router.get("/{package_id}/with-weights", response_model=PackageWithWeights, dependencies=[Depends(query_budget(4))])
 def get_package_with_weights(
     package_id: int,
     db: Session = Depends(get_db),
@@ -740,14 +940,9 @@ def get_package_with_weights(
     """
     Get package details with weight information
     """
-    # Get package with dimensions and relationships
+    # Get package with dimensions and every relationship the response serializes
     package = db.query(PackageModel)\
-        .options(
-            joinedload(PackageModel.dimensions),
-            joinedload(PackageModel.submitted_by_user),
-            joinedload(PackageModel.assigned_manager),
-            joinedload(PackageModel.items)
-        )\
+        .options(*package_detail_options())\
         .filter(PackageModel.id == package_id)\
         .first()
     
@@ -771,10 +966,7 @@ def get_package_with_weights(
                 'weight_unit': dim.weight_unit or 'kg',
                 'dimension': dim.dimension,
                 'purpose': dim.purpose,
-                'remarks': dim.remarks,
-                'is_common': dim.is_common,
-                'created_at': dim.created_at,
-                'updated_at': dim.updated_at
+                'created_at': dim.created_at
             } for dim in package.dimensions
         ]
     else:
@@ -798,6 +990,7 @@ def get_package_images(
     
     # Get all images for this package
     images = db.query(PackageImage)\
+        .options(selectinload(PackageImage.variants))\
         .filter(PackageImage.package_id == package_id)\
         .all()
     
@@ -809,7 +1002,9 @@ def get_package_images(
             'id': img.id,
             'image_path': img.image_path,
             'image_type': img.image_type,
-            'created_at': img.created_at
+            'created_at': img.created_at,
+            'url': media_link(img.image_path),
+            'variants': [PackageImageVariantSchema.model_validate(v) for v in img.variants]
         }
         
         if img.image_type == 'before_packing':
@@ -820,7 +1015,7 @@ def get_package_images(
     return result
 
 @router.put("/{package_id}/logistics", response_model=PackageSchema)
-async def update_package_logistics(
+def update_package_logistics(
     package_id: int,
     courier_name: str = Form(..., description="Courier company name"),
     courier_tracking_number: str = Form(None, description="Courier tracking number"),
@@ -840,6 +1035,7 @@ async def update_package_logistics(
     if not db_package:
         raise HTTPException(status_code=404, detail="Package not found")
     
+    new_images = []
     try:
         # Update courier information
         db_package.courier_name = courier_name
@@ -895,50 +1091,21 @@ async def update_package_logistics(
                     )
                     db.add(new_dimension)
         
-        # Process and save images after packing
+        # Store images after packing by content hash; a repeat upload reuses the existing file
         if image_after_packing:
-            import os
-            from app.config import settings
-            
-            # Validate file sizes
-            for file in image_after_packing:
-                if file.filename:
-                    # Read file content to check size
-                    content = file.file.read()
-                    file.file.seek(0)  # Reset file pointer
-                    if len(content) > settings.max_file_size:
-                        raise HTTPException(
-                            status_code=413, 
-                            detail=f"Image file '{file.filename}' is too large. Maximum size allowed: {settings.max_file_size / (1024*1024):.1f}MB"
-                        )
-            
-            # Use existing uploads directory
-            upload_dir = "uploads/package_images"
-            os.makedirs(upload_dir, exist_ok=True)
-            
-            # Process after packing images
             for image_file in image_after_packing:
                 if image_file.filename:
-                    # Generate unique filename
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    file_extension = os.path.splitext(image_file.filename)[1]
-                    base_filename = os.path.splitext(image_file.filename)[0]
-                    unique_filename = f"after_{package_id}_{timestamp}_{base_filename}{file_extension}"
-                    file_path = os.path.join(upload_dir, unique_filename)
-                    
-                    # Save file to disk
-                    with open(file_path, "wb") as buffer:
-                        content = await image_file.read()
-                        buffer.write(content)
+                    blob = store_image(db, image_file, label="Image file")
                     
                     # Save image record to database
                     package_image = PackageImageModel(
                         package_id=package_id,
-                        image_path=file_path,
-                        image_type="after_packing"
+                        image_path=blob.path,
+                        image_type="after_packing",
+                        blob=blob
                     )
                     db.add(package_image)
-                    print(f"Saved after packing image: {file_path}")
+                    new_images.append(package_image)
         
         # Mark as processed by logistics
         if logistics_processed == "true":
@@ -953,9 +1120,15 @@ async def update_package_logistics(
         db.add(db_package)
         db.commit()
         db.refresh(db_package)
+        broker.publish("logistics", db_package)
+        for package_image in new_images:
+            image_processor.enqueue(package_image.id, package_image.image_path, package_image.blob.sha256)
         
         return db_package
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to update logistics information: {str(e)}")
\ No newline at end of file
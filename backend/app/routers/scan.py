@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.auth import get_current_user
+from app.database import get_db
+from app.models import User
+from app.query_stats import query_budget
+from app.scan import scan
+from app.schemas import ScanResult
+
+router = APIRouter()
+
+@router.get("/{code:path}", response_model=ScanResult, dependencies=[Depends(query_budget(3))])
+def scan_code(
+    code: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Resolve a scanned or typed tracking number, gate pass number (RAPL-RGP-2526/001, slashes
+    allowed) or courier tracking number. Approved and today's dispatched passes are answered
+    from memory (an approval is confirmed by primary key first); anything else takes one
+    indexed query.
+    """
+    result = scan(db, code)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No package found for code: {code}")
+    return result
@@ -1,14 +1,19 @@
 import os
-import uuid
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
 from fastapi.staticfiles import StaticFiles
-from PIL import Image
+from fastapi.responses import RedirectResponse
+from sqlalchemy.orm import selectinload
 
 
 from app.database import get_db
 from app.models import User, Package, PackageImage
-from app.auth import get_current_user
+from app.auth import get_current_user, get_user_from_token
 from app.config import settings
+from app.media import media_link
+from app.storage import media_url
+from app.image_store import store_image
+from app.images import image_processor, pick_variant
 
 router = APIRouter()
 
@@ -41,46 +46,27 @@ def upload_package_image(
     if not allowed_file(file.filename):
         raise HTTPException(status_code=400, detail="File type not allowed")
     
-    # Read file content
-    content = file.file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=413, 
-            detail=f"File too large. Maximum size allowed: {MAX_FILE_SIZE / (1024*1024):.1f}MB"
-        )
-    
-    # Generate unique filename
-    file_extension = file.filename.rsplit('.', 1)[1].lower()
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    
-    # Save file
-    with open(file_path, 'wb') as buffer:
-        buffer.write(content)
-    
-    # Create thumbnail
-    try:
-        with Image.open(file_path) as img:
-            img.thumbnail((300, 300))
-            thumbnail_filename = f"thumb_{unique_filename}"
-            thumbnail_path = os.path.join(UPLOAD_DIR, thumbnail_filename)
-            img.save(thumbnail_path)
-    except Exception as e:
-        print(f"Error creating thumbnail: {e}")
+    # Store by content hash; uploading the same bytes again only adds the database row
+    blob = store_image(db, file)
+    image_url = media_url(blob.path)
     
     # Save to database
     db_image = PackageImage(
         package_id=package_id,
-        image_path=f"/uploads/{unique_filename}",
-        image_type="package"
+        image_path=image_url,
+        image_type="package",
+        blob=blob
     )
     db.add(db_image)
     db.commit()
     db.refresh(db_image)
     
+    # Thumbnails and WebP/AVIF renditions are produced by the background image worker
+    image_processor.enqueue(db_image.id, db_image.image_path, blob.sha256)
+    
     return {
         "message": "Image uploaded successfully",
-        "image_path": f"/uploads/{unique_filename}",
+        "image_path": image_url,
         "image_id": db_image.id
     }
 
@@ -96,3 +82,34 @@ def get_package_images(
     
     images = db.query(PackageImage).filter(PackageImage.package_id == package_id).all()
     return images
+
+@router.get("/images/{image_id}")
+def get_image_rendition(
+    image_id: int,
+    request: Request,
+    width: Optional[int] = Query(None, ge=1, description="Display width in pixels"),
+    token: Optional[str] = Query(None, description="Access token; required when signed media URLs are enabled"),
+    db = Depends(get_db)
+):
+    """
+    Redirect to the smallest rendition of an image that covers the requested width,
+    in the best format the browser accepts; the original until renditions exist.
+    Public like the /uploads mount it points into, so it can be used directly in <img src>,
+    unless signed media URLs are enabled: then it only hands out signed links to signed-in users.
+    """
+    if settings.media_signed_urls:
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            token = authorization[7:]
+        if not token:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        get_user_from_token(db, token)
+    
+    image = db.query(PackageImage).options(selectinload(PackageImage.variants))\
+        .filter(PackageImage.id == image_id).first()
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    variant = pick_variant(image.variants, width, request.headers.get("accept", ""))
+    target = variant.url if variant else media_link(image.image_path)
+    return RedirectResponse(target, status_code=307)
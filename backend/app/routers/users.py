@@ -1,15 +1,14 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 
-from app.database import get_db
+from app.database import engine, get_db
 from app.models import User
 from app.schemas import User as UserSchema, UserCreate
-from app.auth import require_role, get_current_user
+from app.auth import require_role, get_current_user, get_password_hash, revoke_user_sessions
+from app.principals import invalidate_principal
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 @router.get("/", response_model=List[UserSchema])
 def get_users(
@@ -52,7 +51,7 @@ def create_user(
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash the password
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = get_password_hash(user.password)
     
     # Generate employee_id if not provided
     employee_id = user.employee_id
@@ -100,6 +99,7 @@ def update_user(
     
     db.commit()
     db.refresh(user)
+    invalidate_principal(engine, user_id)
     return user
 
 @router.delete("/{user_id}")
@@ -112,8 +112,10 @@ def delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    revoke_user_sessions(db, user_id)
     db.delete(user)
     db.commit()
+    invalidate_principal(engine, user_id)
     return {"message": "User deleted successfully"}
 
 @router.put("/{user_id}/password")
@@ -131,8 +133,11 @@ def reset_user_password(
         raise HTTPException(status_code=400, detail="Password is required")
     
     # Hash the new password
-    hashed_password = pwd_context.hash(password_data["password"])
+    hashed_password = get_password_hash(password_data["password"])
     user.password_hash = hashed_password
+    # Existing refresh sessions must not outlive the old password
+    revoke_user_sessions(db, user_id)
     
     db.commit()
+    invalidate_principal(engine, user_id)
     return {"message": "Password reset successfully"}
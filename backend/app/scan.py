@@ -0,0 +1,253 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from app.config import settings
+from app.database import SessionLocal
+from app.events import broker
+from app.models import Package, PackageItem, User
+from app.schemas import ScanResult
+
+# Identifiers a scanned or typed code may be, in the order matches are preferred
+SCAN_COLUMNS = (
+    ("tracking_number", Package.tracking_number),
+    ("gate_pass_serial_number", Package.gate_pass_serial_number),
+    ("courier_tracking_number", Package.courier_tracking_number),
+)
+SCAN_COLUMN_RANK = {name: rank for rank, (name, _) in enumerate(SCAN_COLUMNS)}
+
+Manager = aliased(User)
+Approver = aliased(User)
+
+def _dispatch_day_start() -> datetime:
+    # dispatched_at is stamped with datetime.utcnow()
+    return datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+def normalize_code(code: str) -> str:
+    return code.strip().upper()
+
+def _scan_select():
+    item_count = (
+        select(func.count(PackageItem.id))
+        .where(PackageItem.package_id == Package.id)
+        .correlate(Package)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            Package.id,
+            Package.tracking_number,
+            Package.gate_pass_serial_number,
+            Package.courier_tracking_number,
+            Package.status,
+            Package.return_status,
+            Package.is_returnable,
+            Package.recipient,
+            Package.to_address,
+            Package.project_code,
+            Package.number_of_packages,
+            Package.approved_at,
+            Package.dispatched_at,
+            item_count.label("item_count"),
+            Manager.full_name.label("manager_name"),
+            Approver.full_name.label("approved_by_name")
+        )
+        .outerjoin(Manager, Manager.id == Package.assigned_to_manager)
+        .outerjoin(Approver, Approver.id == Package.approved_by)
+    )
+
+def _result(row, matched_on: str) -> ScanResult:
+    return ScanResult(
+        package_id=row.id,
+        matched_on=matched_on,
+        tracking_number=row.tracking_number,
+        gate_pass_serial_number=row.gate_pass_serial_number,
+        courier_tracking_number=row.courier_tracking_number,
+        status=row.status,
+        return_status=row.return_status,
+        is_returnable=bool(row.is_returnable),
+        recipient=row.recipient,
+        to_address=row.to_address,
+        project_code=row.project_code,
+        number_of_packages=row.number_of_packages or 1,
+        item_count=row.item_count or 0,
+        manager_name=row.manager_name,
+        approved_by_name=row.approved_by_name,
+        approved_at=row.approved_at,
+        dispatched_at=row.dispatched_at,
+        cleared_for_dispatch=row.status == "approved"
+    )
+
+def _matched_on(row, code: str) -> str:
+    for name, _ in SCAN_COLUMNS:
+        value = getattr(row, name)
+        if value and normalize_code(value) == code:
+            return name
+    return SCAN_COLUMNS[0][0]
+
+def lookup_code(db: Session, code: str) -> Optional[ScanResult]:
+    """
+    One query over the three identifier indexes (OR of equality matches, so each can use its
+    own index). Codes are matched as typed and upper-cased. Several packages can share a
+    number after resubmission: tracking number matches win, then the newest package.
+    """
+    candidates = {code, normalize_code(code)}
+    preference = case(
+        *[(column.in_(candidates), rank) for rank, (_, column) in enumerate(SCAN_COLUMNS)],
+        else_=len(SCAN_COLUMNS)
+    )
+    row = db.execute(
+        _scan_select()
+        .where(or_(*[column.in_(candidates) for _, column in SCAN_COLUMNS]))
+        .order_by(preference, Package.submitted_at.desc(), Package.id.desc())
+        .limit(1)
+    ).first()
+    return _result(row, _matched_on(row, normalize_code(code))) if row else None
+
+class ScanCache:
+    """
+    In-memory index of the passes the gate is about to scan: every approved package plus those
+    dispatched today, keyed by each of their identifiers. A background thread reloads the whole
+    set with one query every scan_cache_refresh_seconds and swaps the new snapshot in, so no scan
+    waits for a reload. Package events (from every worker on PostgreSQL) evict entries at once.
+    """
+
+    def __init__(self, refresh_seconds: float, max_entries: int):
+        self.refresh_seconds = refresh_seconds
+        self.max_entries = max_entries
+        self._codes: Dict[str, Tuple[str, ScanResult]] = {}
+        self._by_package: Dict[int, List[str]] = {}
+        # Packages evicted while a reload is querying; the snapshot it builds may predate the change
+        self._evicted_during_reload: Optional[Set[int]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    @property
+    def size(self) -> int:
+        return len(self._by_package)
+
+    @staticmethod
+    def qualifies(result: ScanResult) -> bool:
+        if result.status == "approved":
+            return True
+        return result.status == "dispatched" and result.dispatched_at is not None \
+            and result.dispatched_at.replace(tzinfo=None) >= _dispatch_day_start()
+
+    def _index(self, codes: Dict[str, Tuple[str, ScanResult]], by_package: Dict[int, List[str]], result: ScanResult) -> None:
+        keys = []
+        for name, _ in SCAN_COLUMNS:
+            value = getattr(result, name)
+            if value:
+                key = normalize_code(value)
+                # A preferred identifier type keeps the key (a tracking number beats a colliding
+                # courier number); within a type the package indexed last wins
+                if key not in codes or SCAN_COLUMN_RANK[codes[key][0]] >= SCAN_COLUMN_RANK[name]:
+                    codes[key] = (name, result)
+                    keys.append(key)
+        by_package[result.package_id] = keys
+
+    def reload(self, db: Session) -> None:
+        with self._lock:
+            self._evicted_during_reload = set()
+        rows = db.execute(
+            _scan_select()
+            .where(or_(
+                Package.status == "approved",
+                and_(Package.status == "dispatched", Package.dispatched_at >= _dispatch_day_start())
+            ))
+            .order_by(Package.submitted_at.desc(), Package.id.desc())
+            .limit(self.max_entries)
+        ).all()
+        codes: Dict[str, Tuple[str, ScanResult]] = {}
+        by_package: Dict[int, List[str]] = {}
+        for row in reversed(rows):
+            # Oldest first, so a newer package sharing a number ends up owning it
+            self._index(codes, by_package, _result(row, SCAN_COLUMNS[0][0]))
+        with self._lock:
+            evicted, self._evicted_during_reload = self._evicted_during_reload, None
+            self._codes, self._by_package = codes, by_package
+            for package_id in evicted:
+                self._forget(package_id)
+            self.reloads += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="scan-cache", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                db = SessionLocal()
+                try:
+                    self.reload(db)
+                finally:
+                    db.close()
+            except Exception as e:
+                # Keep serving the previous snapshot; events still evict from it
+                print(f"Scan cache reload failed: {e}")
+                with self._lock:
+                    self._evicted_during_reload = None
+            self._stop.wait(max(self.refresh_seconds - (time.monotonic() - started), 1))
+
+    def get(self, code: str) -> Optional[ScanResult]:
+        with self._lock:
+            entry = self._codes.get(normalize_code(code))
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        name, result = entry
+        return result if result.matched_on == name else result.model_copy(update={"matched_on": name})
+
+    def remember(self, result: ScanResult) -> None:
+        if not self.qualifies(result):
+            return
+        with self._lock:
+            if len(self._by_package) < self.max_entries:
+                self._index(self._codes, self._by_package, result)
+
+    def forget(self, package_id: int) -> None:
+        with self._lock:
+            if self._evicted_during_reload is not None:
+                self._evicted_during_reload.add(package_id)
+            self._forget(package_id)
+
+    def _forget(self, package_id: int) -> None:
+        for key in self._by_package.pop(package_id, []):
+            entry = self._codes.get(key)
+            if entry and entry[1].package_id == package_id:
+                del self._codes[key]
+
+scan_cache = ScanCache(settings.scan_cache_refresh_seconds, settings.scan_cache_max_entries)
+
+# Batch events (package_id None) only announce new packages, which are not cached yet
+broker.add_listener(lambda event: event["package_id"] is not None and scan_cache.forget(event["package_id"]))
+
+def _still_cleared(db: Session, result: ScanResult) -> bool:
+    """Primary key check of a cached clearance, in case its eviction has not arrived yet"""
+    return db.execute(select(Package.status).where(Package.id == result.package_id)).scalar() == "approved"
+
+def scan(db: Session, code: str) -> Optional[ScanResult]:
+    result = scan_cache.get(code)
+    if result is not None and result.cleared_for_dispatch and not _still_cleared(db, result):
+        scan_cache.forget(result.package_id)
+        result = None
+    if result is None:
+        result = lookup_code(db, code)
+        if result is not None:
+            scan_cache.remember(result)
+    return result
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, HttpUrl
-from typing import Optional, List, Any, Dict, Union
+from typing import Optional, List, Any, Dict, Literal, Union
 from datetime import datetime, date
 
 class UserBase(BaseModel):
@@ -103,18 +103,77 @@ class PackageWithWeights(Package):
     submitted_by_name: Optional[str] = None
     assigned_manager_name: Optional[str] = None
 
+class PackageImageVariant(BaseModel):
+    """A resized rendition of a package image"""
+    variant: str
+    format: str
+    width: int
+    height: int
+    size_bytes: int
+    url: str
+    
+    class Config:
+        from_attributes = True
+
 class PackageImageResponse(BaseModel):
     """Response model for package images"""
     id: int
     image_path: str
     image_type: str
     created_at: datetime
+    url: str  # Link to the original; signed when signed media URLs are enabled
+    variants: List[PackageImageVariant] = Field(default_factory=list)
 
 class PackageImagesResponse(BaseModel):
     """Response model for package images grouped by type"""
     before_packing: List[PackageImageResponse] = Field(default_factory=list)
     after_packing: List[PackageImageResponse] = Field(default_factory=list)
 
+class PackageTombstone(BaseModel):
+    """A package that left the caller's view since the last delta sync"""
+    package_id: int
+    manager_id: Optional[int] = None
+    reason: str
+    removed_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class ManagerPackageCount(BaseModel):
+    manager_id: Optional[int] = None
+    manager_name: Optional[str] = None
+    count: int
+
+class DailyPackageCount(BaseModel):
+    day: date
+    count: int
+
+class ProjectTotals(BaseModel):
+    project_code: Optional[str] = None
+    packages: int
+    items: int = 0
+    total_value: float = 0.0
+
+class TurnaroundStats(BaseModel):
+    """Elapsed hours between two lifecycle timestamps"""
+    count: int = 0
+    p50_hours: Optional[float] = None
+    p90_hours: Optional[float] = None
+    p95_hours: Optional[float] = None
+
+class PackageStats(BaseModel):
+    """Aggregates for the dashboard widgets, computed in SQL"""
+    total: int
+    by_status: Dict[str, int] = Field(default_factory=dict)
+    by_priority: Dict[str, int] = Field(default_factory=dict)
+    by_manager: List[ManagerPackageCount] = Field(default_factory=list)
+    by_day: List[DailyPackageCount] = Field(default_factory=list)
+    by_project: List[ProjectTotals] = Field(default_factory=list)
+    approval_turnaround: TurnaroundStats = Field(default_factory=TurnaroundStats)
+    dispatch_turnaround: TurnaroundStats = Field(default_factory=TurnaroundStats)
+    overdue_returnables: int = 0
+    generated_at: datetime
+
 class PackageDimensionBase(BaseModel):
     weight: Optional[float] = None
     weight_unit: Optional[str] = 'kg'
@@ -195,6 +254,11 @@ class PackageItem(PackageItemBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None  # Exchange at /api/auth/refresh instead of logging in again
+    expires_in: Optional[int] = None  # Access token lifetime in seconds
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: Optional[str] = None
@@ -228,3 +292,110 @@ class GatePassGenerateResponse(BaseModel):
     financial_year: str
     pass_type: str
     sequence_number: int
+
+class GatePassPrintRequest(BaseModel):
+    package_ids: List[int] = Field(min_length=1, max_length=200)
+
+class ScanResult(BaseModel):
+    """Slim verification payload for a gate scan"""
+    package_id: int
+    matched_on: str  # tracking_number, gate_pass_serial_number or courier_tracking_number
+    tracking_number: Optional[str] = None
+    gate_pass_serial_number: Optional[str] = None
+    courier_tracking_number: Optional[str] = None
+    status: Optional[str] = None
+    return_status: Optional[str] = None
+    is_returnable: bool = False
+    recipient: Optional[str] = None
+    to_address: Optional[str] = None
+    project_code: Optional[str] = None
+    number_of_packages: int = 1
+    item_count: int = 0
+    manager_name: Optional[str] = None
+    approved_by_name: Optional[str] = None
+    approved_at: Optional[datetime] = None
+    dispatched_at: Optional[datetime] = None
+    cleared_for_dispatch: bool = False
+
+# Bulk Import Schemas
+class PackageImportRow(BaseModel):
+    """One package of an import file; flat item_*/weight columns are folded into items/dimensions"""
+    recipient: str
+    to_address: str
+    project_code: str
+    gate_pass_serial_number: Optional[str] = None  # Allocated from the RGP/NRGP sequence when empty
+    remarks: Optional[str] = None
+    notes: Optional[str] = None
+    priority: str = "medium"
+    assigned_to_manager: Optional[int] = None
+    is_returnable: bool = False
+    return_date: Optional[date] = None
+    return_reason: Optional[str] = None
+    transportation_type: str = "courier"
+    vehicle_details: Optional[str] = None
+    carrier_name: Optional[str] = None
+    courier_name: Optional[str] = None
+    courier_tracking_number: Optional[str] = None
+    number_of_packages: int = 1
+    po_number: Optional[str] = None
+    po_date: Optional[date] = None
+    items: List[PackageItemCreate] = Field(default_factory=list)
+    dimensions: List[PackageDimensionBase] = Field(default_factory=list)
+
+class PackageImportCreated(BaseModel):
+    row: int
+    package_id: int
+    gate_pass_serial_number: Optional[str] = None
+
+class PackageImportError(BaseModel):
+    row: int
+    message: str
+
+class PackageImportReport(BaseModel):
+    dry_run: bool = False
+    rows: int = 0
+    created: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0
+    packages: List[PackageImportCreated] = Field(default_factory=list)
+    errors: List[PackageImportError] = Field(default_factory=list)
+
+class PackageBatchStatusUpdate(BaseModel):
+    package_ids: List[int] = Field(min_length=1, max_length=1000)
+    status: Literal["approved", "rejected", "dispatched"]
+    notes: Optional[str] = None
+
+class PackageBatchAssign(BaseModel):
+    package_ids: List[int] = Field(min_length=1, max_length=1000)
+    manager_id: int
+
+class PackageBatchOutcome(BaseModel):
+    package_id: int
+    ok: bool
+    status: Optional[str] = None
+    message: Optional[str] = None
+
+class PackageBatchResult(BaseModel):
+    updated: int = 0
+    failed: int = 0
+    results: List[PackageBatchOutcome] = Field(default_factory=list)
+
+# Diagnostics Schemas
+class SlowQueryOffender(BaseModel):
+    """Slow executions of one normalized statement, from this worker's ring buffer"""
+    sql: str
+    count: int
+    total_ms: float
+    max_ms: float
+    mean_ms: float
+    routes: List[str] = Field(default_factory=list)
+    bind_shapes: List[str] = Field(default_factory=list)
+    last_seen: datetime
+    plan: Optional[str] = None  # Latest sampled EXPLAIN output, if any
+    plan_captured_at: Optional[datetime] = None
+
+class SlowQueryReport(BaseModel):
+    threshold_ms: int
+    explain_rate: float
+    captured: int  # Slow executions currently in the buffer
+    offenders: List[SlowQueryOffender] = Field(default_factory=list)
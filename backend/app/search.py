@@ -0,0 +1,117 @@
+from typing import Optional, Tuple
+
+from sqlalchemy import case, column, func, literal_column, select, table, text, union
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+
+from app.models import Package, PackageItem
+
+# Trigram matching (pg_trgm / FTS5 trigram tokenizer) needs at least three characters
+MIN_TRIGRAM_LENGTH = 3
+
+# Columns matched as substrings; tracking and gate pass numbers also rank prefix hits first
+PACKAGE_SEARCH_COLUMNS = (
+    Package.tracking_number,
+    Package.gate_pass_serial_number,
+    Package.recipient,
+    Package.to_address,
+    Package.remarks,
+    Package.notes,
+)
+PACKAGE_PREFIX_COLUMNS = (Package.tracking_number, Package.gate_pass_serial_number)
+ITEM_SEARCH_COLUMNS = (PackageItem.description, PackageItem.serial_number)
+
+# SQLite fallback: one FTS5 document per package (rowid = packages.id), kept in sync by triggers
+SQLITE_DOCUMENT_SQL = """
+    coalesce(p.tracking_number, '') || ' ' || coalesce(p.gate_pass_serial_number, '') || ' ' ||
+    coalesce(p.recipient, '') || ' ' || coalesce(p.to_address, '') || ' ' ||
+    coalesce(p.remarks, '') || ' ' || coalesce(p.notes, '') || ' ' ||
+    coalesce((SELECT group_concat(coalesce(i.description, '') || ' ' || coalesce(i.serial_number, ''), ' ')
+              FROM package_items i WHERE i.package_id = p.id), '')
+"""
+
+def _refresh_sql(package_id: str) -> str:
+    return f"""
+        DELETE FROM package_search WHERE rowid = {package_id};
+        INSERT INTO package_search(rowid, document)
+            SELECT p.id, {SQLITE_DOCUMENT_SQL} FROM packages p WHERE p.id = {package_id};
+    """
+
+SQLITE_TRIGGERS = {
+    "package_search_ai": f"AFTER INSERT ON packages BEGIN {_refresh_sql('NEW.id')} END",
+    "package_search_au": f"AFTER UPDATE ON packages BEGIN {_refresh_sql('NEW.id')} END",
+    "package_search_ad": "AFTER DELETE ON packages BEGIN DELETE FROM package_search WHERE rowid = OLD.id; END",
+    "package_item_search_ai": f"AFTER INSERT ON package_items BEGIN {_refresh_sql('NEW.package_id')} END",
+    "package_item_search_au": f"AFTER UPDATE ON package_items BEGIN {_refresh_sql('NEW.package_id')} END",
+    "package_item_search_ad": f"AFTER DELETE ON package_items BEGIN {_refresh_sql('OLD.package_id')} END",
+}
+
+def ensure_search_index(engine: Engine) -> None:
+    """
+    Create the SQLite FTS5 search table and its triggers if missing, backfilling existing rows.
+    PostgreSQL uses the pg_trgm indexes created by the Alembic migration instead.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        exists_already = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'package_search'")
+        ).first()
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS package_search USING fts5(document, tokenize='trigram')"
+        )
+        for name, body in SQLITE_TRIGGERS.items():
+            conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        if not exists_already:
+            conn.exec_driver_sql(
+                f"INSERT INTO package_search(rowid, document) SELECT p.id, {SQLITE_DOCUMENT_SQL} FROM packages p"
+            )
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _substring_filter(term: str):
+    """
+    Package.id IN (a UNION of one ILIKE per column): every branch is served by its own trigram
+    index, which an OR across columns plus an EXISTS over the items would leave to a seq scan
+    """
+    pattern = f"%{_escape_like(term)}%"
+    matches = [select(Package.id).where(col.ilike(pattern, escape="\\")) for col in PACKAGE_SEARCH_COLUMNS]
+    matches += [select(PackageItem.package_id).where(col.ilike(pattern, escape="\\")) for col in ITEM_SEARCH_COLUMNS]
+    return Package.id.in_(union(*matches))
+
+def apply_search(query: Query, term: str) -> Tuple[Query, Optional[object]]:
+    """
+    Filter packages matching the search term in package fields or item description/serial number.
+    Returns the filtered query and an ORDER BY clause ranking the best matches first
+    (None when the backend cannot rank).
+    """
+    term = term.strip()
+    if not term:
+        return query, None
+    dialect = query.session.get_bind().dialect.name
+
+    if dialect == "sqlite" and len(term) >= MIN_TRIGRAM_LENGTH:
+        package_search = table("package_search", column("rowid"), column("rank"))
+        fts_query = '"' + term.replace('"', '""') + '"'
+        matches = (
+            select(package_search.c.rowid.label("package_id"), package_search.c.rank.label("rank"))
+            .where(literal_column("package_search").op("MATCH")(fts_query))
+            .subquery()
+        )
+        query = query.join(matches, matches.c.package_id == Package.id)
+        # FTS5 rank is bm25, where lower is better
+        return query, matches.c.rank.asc()
+
+    query = query.filter(_substring_filter(term))
+    if dialect != "postgresql":
+        return query, None
+
+    # pg_trgm GIN indexes serve the ILIKE filter; rank prefix hits on identifiers, then similarity
+    prefix = f"{_escape_like(term)}%"
+    rank = func.coalesce(func.greatest(
+        *[func.similarity(col, term) for col in (Package.recipient, Package.to_address, Package.tracking_number)]
+    ), 0)
+    for col in PACKAGE_PREFIX_COLUMNS:
+        rank = rank + case((col.ilike(prefix, escape="\\"), 1), else_=0)
+    return query, rank.desc()
@@ -0,0 +1,151 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.metrics import GATE_PASS_ALLOCATION_SECONDS
+from app.models import GatePassSequence
+
+def get_financial_year() -> str:
+    """
+    Gets the current financial year in YYYY format (e.g., 2526 for April 2025 - March 2026)
+    """
+    now = datetime.now()
+    year = now.year
+    month = now.month
+    
+    # Financial year starts in April (month 4)
+    financial_year_start = year if month >= 4 else year - 1
+    financial_year_end = financial_year_start + 1
+    
+    # Return last two digits of start and end years (e.g., 2526 for 2025-26)
+    return f"{str(financial_year_start)[-2:]}{str(financial_year_end)[-2:]}"
+
+def pass_type_for(is_returnable: bool) -> str:
+    return "RGP" if is_returnable else "NRGP"
+
+def format_gate_pass_number(pass_type: str, financial_year: str, sequence_number: int) -> str:
+    # Format: RAPL-[RGP|NRGP]-[FY]/[SEQ]
+    return f"RAPL-{pass_type}-{financial_year}/{sequence_number:03d}"
+
+def allocate_sequence(db: Session, financial_year: str, pass_type: str, count: int = 1) -> int:
+    """
+    Atomically reserve `count` numbers for (financial_year, pass_type) and return the last one;
+    the block is last - count + 1 .. last. A single INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+    both creates the first-of-year row and increments existing ones, so concurrent callers never
+    see the same value and never race on idx_fy_pass_type. Does not commit: the row stays locked
+    until the caller's transaction ends, and a rollback returns the numbers.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = pg_insert if dialect == "postgresql" else sqlite_insert
+        table = GatePassSequence.__table__
+        statement = insert(table).values(
+            financial_year=financial_year,
+            pass_type=pass_type,
+            current_sequence=count
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.financial_year, table.c.pass_type],
+            set_={
+                "current_sequence": table.c.current_sequence + count,
+                "updated_at": func.now()
+            }
+        ).returning(table.c.current_sequence)
+        return db.execute(statement).scalar_one()
+    
+    # Other backends: the UPDATE itself takes the row lock before reading the value
+    incremented = db.execute(
+        update(GatePassSequence)
+        .where(GatePassSequence.financial_year == financial_year, GatePassSequence.pass_type == pass_type)
+        .values(current_sequence=GatePassSequence.current_sequence + count)
+    )
+    if incremented.rowcount == 0:
+        db.add(GatePassSequence(financial_year=financial_year, pass_type=pass_type, current_sequence=count))
+        db.flush()
+        return count
+    return db.query(GatePassSequence.current_sequence).filter(
+        GatePassSequence.financial_year == financial_year,
+        GatePassSequence.pass_type == pass_type
+    ).scalar()
+
+def peek_sequence(db: Session, financial_year: str, pass_type: str) -> int:
+    """The number the next allocation will most likely get; nothing is reserved"""
+    current = db.query(GatePassSequence.current_sequence).filter(
+        GatePassSequence.financial_year == financial_year,
+        GatePassSequence.pass_type == pass_type
+    ).scalar()
+    return (current or 0) + 1
+
+class SequenceBlockAllocator:
+    """
+    Per-process cache of reserved number blocks (settings.gate_pass_block_size at a time),
+    so most allocations never touch the database. Numbers stay unique across workers, but
+    they are no longer handed out in strict order between workers, and whatever is left of
+    a block when the process exits is skipped.
+    """
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks: Dict[Tuple[str, str], Tuple[int, int]] = {}  # (fy, type) -> (next, last)
+
+    def next(self, financial_year: str, pass_type: str) -> int:
+        key = (financial_year, pass_type)
+        with self._lock:
+            next_number, last = self._blocks.get(key, (1, 0))
+            if next_number > last:
+                # Reserve in a separate short transaction so the row lock is released immediately
+                db = SessionLocal()
+                try:
+                    last = allocate_sequence(db, financial_year, pass_type, self.block_size)
+                    db.commit()
+                finally:
+                    db.close()
+                next_number = last - self.block_size + 1
+            self._blocks[key] = (next_number + 1, last)
+            return next_number
+
+    def peek(self, db: Session, financial_year: str, pass_type: str) -> int:
+        with self._lock:
+            next_number, last = self._blocks.get((financial_year, pass_type), (1, 0))
+        return next_number if next_number <= last else peek_sequence(db, financial_year, pass_type)
+
+block_allocator = SequenceBlockAllocator(settings.gate_pass_block_size)
+
+def allocate_gate_pass_number(db: Session, is_returnable: bool) -> str:
+    """
+    Reserve and format the next gate pass number. With GATE_PASS_BLOCK_SIZE = 1 (the default)
+    it is taken inside the caller's transaction, so it commits together with the package that
+    uses it and goes back to the sequence on rollback: numbering stays gap-free. Call it as late
+    as possible before the commit, since the sequence row stays locked until then.
+    With a larger block size the number comes from this worker's block, reserved in its own
+    committed transaction: a rolled back submission leaves a gap, and numbers are not issued
+    in submission order across workers.
+    """
+    financial_year = get_financial_year()
+    pass_type = pass_type_for(is_returnable)
+    started = time.perf_counter()
+    if settings.gate_pass_block_size > 1:
+        sequence_number = block_allocator.next(financial_year, pass_type)
+    else:
+        sequence_number = allocate_sequence(db, financial_year, pass_type)
+    GATE_PASS_ALLOCATION_SECONDS.observe(time.perf_counter() - started)
+    return format_gate_pass_number(pass_type, financial_year, sequence_number)
+
+def peek_gate_pass_number(db: Session, is_returnable: bool) -> Tuple[str, str, str, int]:
+    """(gate_pass_number, financial_year, pass_type, sequence_number) the next submission will likely get"""
+    financial_year = get_financial_year()
+    pass_type = pass_type_for(is_returnable)
+    if settings.gate_pass_block_size > 1:
+        sequence_number = block_allocator.peek(db, financial_year, pass_type)
+    else:
+        sequence_number = peek_sequence(db, financial_year, pass_type)
+    return format_gate_pass_number(pass_type, financial_year, sequence_number), financial_year, pass_type, sequence_number
@@ -0,0 +1,181 @@
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.metrics import current_route
+from app.schemas import SlowQueryOffender, SlowQueryReport
+
+# DBAPI placeholders (%(name)s, %s, $1, ?) and literals collapse to ?, so one statement shape is one offender
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+# Expanded IN lists and multi-row VALUES differ only in length
+_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+def normalize_sql(statement: str) -> str:
+    sql = " ".join(statement.split())
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _LIST.sub("?, ...", sql)
+
+def bind_shape(parameters, executemany: bool = False) -> str:
+    """Parameter types and counts without the values, e.g. "int x12, str" (an IN list of 12 ids)"""
+    if executemany:
+        rows = list(parameters or [])
+        return f"{len(rows)} rows of ({bind_shape(rows[0]) if rows else ''})"
+    values = parameters.values() if isinstance(parameters, dict) else (parameters or ())
+    counts = Counter(type(value).__name__ for value in values)
+    return ", ".join(f"{name} x{count}" if count > 1 else name for name, count in sorted(counts.items())) or "none"
+
+def explainable(statement: str) -> bool:
+    """ANALYZE runs the statement, so only plain reads are explained"""
+    head = statement.lstrip().upper()
+    return head.startswith(("SELECT", "WITH")) and "FOR UPDATE" not in head
+
+@dataclass
+class SlowQuery:
+    at: datetime
+    seconds: float
+    sql: str
+    bind_shape: str
+    route: str
+    plan: Optional[str] = None
+
+class SlowQueryLog:
+    """
+    Per-worker ring buffer of statements slower than slow_query_threshold_ms, with the route
+    that issued them. A sampled share of slow SELECTs is re-run under EXPLAIN (ANALYZE, BUFFERS)
+    (EXPLAIN QUERY PLAN on SQLite) on a background thread with its own connection, one at a time,
+    so the request that was slow does not also wait for its plan.
+    """
+
+    def __init__(self, threshold_ms: int, explain_rate: float, size: int):
+        self.threshold_seconds = threshold_ms / 1000
+        self.threshold_ms = threshold_ms
+        self.explain_rate = explain_rate
+        self._entries: Deque[SlowQuery] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._explainer: Optional[ThreadPoolExecutor] = None
+        self._explaining = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def instrument(self, engine) -> None:
+        if not self.enabled:
+            return
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["slow_query_started"].pop()
+        if seconds < self.threshold_seconds:
+            return
+        entry = SlowQuery(
+            at=datetime.now(timezone.utc),
+            seconds=seconds,
+            sql=normalize_sql(statement),
+            bind_shape=bind_shape(parameters, executemany),
+            route=current_route() or "background"
+        )
+        with self._lock:
+            self._entries.append(entry)
+        if not executemany and explainable(statement) and random.random() < self.explain_rate:
+            self._submit_explain(conn.engine, entry, statement, parameters)
+
+    def _submit_explain(self, engine, entry: SlowQuery, statement: str, parameters) -> None:
+        with self._lock:
+            if self._explaining:
+                return
+            self._explaining = True
+            if self._explainer is None:
+                self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+        self._explainer.submit(self._explain, engine, entry, statement, parameters)
+
+    def _explain(self, engine, entry: SlowQuery, statement: str, parameters) -> None:
+        dialect = engine.dialect.name
+        if dialect == "postgresql":
+            prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+        elif dialect == "sqlite":
+            prefix = "EXPLAIN QUERY PLAN "
+        else:
+            prefix = None
+        try:
+            if prefix is None:
+                return
+            # Raw DBAPI connection: its statements do not pass through these events again
+            connection = engine.raw_connection()
+            try:
+                cursor = connection.cursor()
+                cursor.execute(prefix + statement, parameters)
+                rows = cursor.fetchall()
+                cursor.close()
+            finally:
+                # ANALYZE executed the SELECT; nothing of it is kept
+                connection.rollback()
+                connection.close()
+            entry.plan = "\n".join(str(row[-1]) for row in rows)
+        except Exception as e:
+            print(f"Error explaining slow query: {e}")
+        finally:
+            with self._lock:
+                self._explaining = False
+
+    def report(self, limit: int = 20, sort: str = "total") -> SlowQueryReport:
+        with self._lock:
+            entries = list(self._entries)
+        groups: Dict[str, List[SlowQuery]] = {}
+        for entry in entries:
+            groups.setdefault(entry.sql, []).append(entry)
+        offenders = []
+        for sql, group in groups.items():
+            total_ms = sum(entry.seconds for entry in group) * 1000
+            planned = [entry for entry in group if entry.plan]
+            offenders.append(SlowQueryOffender(
+                sql=sql,
+                count=len(group),
+                total_ms=round(total_ms, 2),
+                max_ms=round(max(entry.seconds for entry in group) * 1000, 2),
+                mean_ms=round(total_ms / len(group), 2),
+                routes=sorted({entry.route for entry in group}),
+                bind_shapes=sorted({entry.bind_shape for entry in group}),
+                last_seen=group[-1].at,
+                plan=planned[-1].plan if planned else None,
+                plan_captured_at=planned[-1].at if planned else None
+            ))
+        key = {"total": lambda o: o.total_ms, "max": lambda o: o.max_ms, "count": lambda o: o.count}[sort]
+        offenders.sort(key=key, reverse=True)
+        return SlowQueryReport(
+            threshold_ms=self.threshold_ms,
+            explain_rate=self.explain_rate,
+            captured=len(entries),
+            offenders=offenders[:limit]
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            explainer, self._explainer = self._explainer, None
+        if explainer is not None:
+            explainer.shutdown(wait=False)
+
+slow_query_log = SlowQueryLog(
+    settings.slow_query_threshold_ms, settings.slow_query_explain_rate, settings.slow_query_buffer_size
+)
@@ -0,0 +1,153 @@
+import math
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Query, Session
+
+from app.cache import TTLCache
+from app.config import settings
+from app.events import broker
+from app.models import Package, PackageItem, User
+from app.schemas import (
+    DailyPackageCount,
+    ManagerPackageCount,
+    PackageStats,
+    ProjectTotals,
+    TurnaroundStats
+)
+
+stats_cache = TTLCache(ttl_seconds=settings.stats_cache_ttl_seconds, max_entries=128)
+
+# Any committed package change makes every cached aggregate stale
+broker.add_listener(lambda event: stats_cache.clear())
+
+def _seconds_between(db: Session, start, end):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", end - start)
+    return (func.julianday(end) - func.julianday(start)) * 86400
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Linear interpolation between closest ranks, matching percentile_cont"""
+    position = (len(sorted_values) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def _turnaround(db: Session, base: Query, start, end) -> TurnaroundStats:
+    seconds = _seconds_between(db, start, end)
+    scoped = base.filter(start.isnot(None), end.isnot(None))
+    fractions = (0.5, 0.9, 0.95)
+
+    if db.get_bind().dialect.name == "postgresql":
+        row = scoped.with_entities(
+            func.count(),
+            *[func.percentile_cont(f).within_group(seconds) for f in fractions]
+        ).one()
+        count, values = row[0], row[1:]
+    else:
+        # No ordered-set aggregates: pull the single duration column and interpolate here
+        durations = sorted(value for (value,) in scoped.with_entities(seconds).all() if value is not None)
+        count = len(durations)
+        values = [_percentile(durations, f) for f in fractions] if durations else [None] * len(fractions)
+
+    hours = [round(v / 3600, 2) if v is not None else None for v in values]
+    return TurnaroundStats(count=count, p50_hours=hours[0], p90_hours=hours[1], p95_hours=hours[2])
+
+def compute_package_stats(
+    db: Session,
+    submitted_by: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    days: int = 30
+) -> PackageStats:
+    base = db.query(Package)
+    if submitted_by is not None:
+        base = base.filter(Package.submitted_by == submitted_by)
+    if start_date:
+        base = base.filter(Package.submitted_at >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        base = base.filter(Package.submitted_at <= datetime.combine(end_date, datetime.max.time()))
+    base = base.order_by(None)
+
+    by_status = dict(base.with_entities(Package.status, func.count()).group_by(Package.status).all())
+    by_priority = dict(base.with_entities(Package.priority, func.count()).group_by(Package.priority).all())
+
+    by_manager = [
+        ManagerPackageCount(manager_id=manager_id, manager_name=name, count=count)
+        for manager_id, name, count in base
+        .outerjoin(User, User.id == Package.assigned_to_manager)
+        .with_entities(Package.assigned_to_manager, User.full_name, func.count())
+        .group_by(Package.assigned_to_manager, User.full_name)
+        .order_by(func.count().desc())
+        .all()
+    ]
+
+    day = func.date(Package.submitted_at)
+    since = datetime.combine(date.today() - timedelta(days=days - 1), datetime.min.time())
+    by_day = [
+        DailyPackageCount(day=value if isinstance(value, date) else date.fromisoformat(value), count=count)
+        for value, count in base
+        .filter(Package.submitted_at >= since)
+        .with_entities(day, func.count())
+        .group_by(day)
+        .order_by(day)
+        .all()
+    ]
+
+    # Item totals are aggregated per package first so the package count is not multiplied by items
+    item_totals = (
+        db.query(
+            PackageItem.package_id.label("package_id"),
+            func.sum(PackageItem.quantity).label("quantity"),
+            func.sum(PackageItem.value).label("value")
+        )
+        .group_by(PackageItem.package_id)
+        .subquery()
+    )
+    by_project = [
+        ProjectTotals(project_code=code, packages=count, items=items or 0, total_value=float(value or 0))
+        for code, count, items, value in base
+        .outerjoin(item_totals, item_totals.c.package_id == Package.id)
+        .with_entities(
+            Package.project_code,
+            func.count(),
+            func.sum(item_totals.c.quantity),
+            func.sum(item_totals.c.value)
+        )
+        .group_by(Package.project_code)
+        .order_by(func.count().desc())
+        .all()
+    ]
+
+    overdue_returnables = base.filter(
+        Package.is_returnable.is_(True),
+        Package.return_date < date.today(),
+        or_(Package.return_status.is_(None), Package.return_status != "returned")
+    ).with_entities(func.count()).scalar()
+
+    return PackageStats(
+        total=sum(by_status.values()),
+        by_status={(key or "unknown"): value for key, value in by_status.items()},
+        by_priority={(key or "unknown"): value for key, value in by_priority.items()},
+        by_manager=by_manager,
+        by_day=by_day,
+        by_project=by_project,
+        approval_turnaround=_turnaround(db, base, Package.submitted_at, Package.approved_at),
+        dispatch_turnaround=_turnaround(db, base, Package.approved_at, Package.dispatched_at),
+        overdue_returnables=overdue_returnables or 0,
+        generated_at=datetime.utcnow()
+    )
+
+def get_package_stats(db: Session, user: User, **filters) -> PackageStats:
+    """
+    Cached per role (and per user for employees, who only see their own submissions).
+    Entries live for settings.stats_cache_ttl_seconds or until the next package write.
+    """
+    submitted_by = user.id if user.role == "employee" else None
+    key = (user.role, submitted_by, tuple(sorted(filters.items())))
+    stats = stats_cache.get(key)
+    if stats is None:
+        stats = compute_package_stats(db, submitted_by=submitted_by, **filters)
+        stats_cache.set(key, stats)
+    return stats
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Iterable
+
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+from app.metrics import UPLOAD_BYTES, UPLOAD_FILES
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+@dataclass
+class StoredFile:
+    path: str
+    size: int
+    sha256: str
+
+def stage_upload(upload: UploadFile, dest_dir: str, label: str = "File") -> StoredFile:
+    """
+    Stream an upload into a temp file in dest_dir in fixed-size chunks.
+    The size limit is enforced while copying and the content hashed on the way through;
+    the caller renames the returned temp file into place (or removes it).
+    Blocking I/O: call from a sync route handler (threadpool), not from the event loop.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=dest_dir, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            upload.file.seek(0)
+            while True:
+                chunk = upload.file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.max_file_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"{label} '{upload.filename}' is too large. Maximum size allowed: {settings.max_file_size / (1024*1024):.1f}MB"
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+                UPLOAD_BYTES.inc(len(chunk))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    UPLOAD_FILES.inc()
+    return StoredFile(path=temp_path, size=size, sha256=digest.hexdigest())
+
+def save_upload(upload: UploadFile, dest_dir: str, filename: str, label: str = "File") -> StoredFile:
+    """
+    Stream an upload to dest_dir/filename; data lands in a temp file in the same
+    directory and is renamed into place only when complete.
+    """
+    staged = stage_upload(upload, dest_dir, label)
+    final_path = os.path.join(dest_dir, filename)
+    os.replace(staged.path, final_path)
+    return StoredFile(path=final_path, size=staged.size, sha256=staged.sha256)
+
+def discard_files(paths: Iterable[str]) -> None:
+    """Best-effort removal of files written by a request that ended up failing"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def media_path(image_path: str) -> str:
+    """
+    Filesystem path of a stored image. Records hold either a disk path relative to the
+    backend ("uploads/package_images/...") or a public URL ("/uploads/...").
+    """
+    if image_path.startswith("/uploads/"):
+        return os.path.join(settings.upload_dir, image_path[len("/uploads/"):])
+    return image_path
+
+def media_url(path: str) -> str:
+    """Public URL under the /uploads mount for a file stored in settings.upload_dir"""
+    if path.startswith("/uploads/"):
+        return path
+    relative = os.path.relpath(path, settings.upload_dir).replace(os.sep, "/")
+    return f"/uploads/{relative}"
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.events import broker
+from app.models import Package, PackageTombstone, User
+from app.schemas import PackageBatchOutcome, PackageBatchResult
+
+@dataclass(frozen=True)
+class StatusTransition:
+    from_statuses: Tuple[str, ...]
+    roles: Tuple[str, ...]
+    timestamp_column: str
+    user_column: Optional[str] = None
+
+# Batch transitions only move packages out of the state the dashboards act on;
+# anything else is reported back per id instead of being overwritten
+STATUS_TRANSITIONS: Dict[str, StatusTransition] = {
+    "approved": StatusTransition(("submitted",), ("manager", "admin"), "approved_at", "approved_by"),
+    "rejected": StatusTransition(("submitted",), ("manager", "admin"), "rejected_at", "rejected_by"),
+    "dispatched": StatusTransition(("approved",), ("security", "logistics", "admin"), "dispatched_at"),
+}
+
+# Columns broker.publish reads, returned by the UPDATE so no reload is needed
+EVENT_COLUMNS = (Package.id, Package.status, Package.return_status, Package.submitted_by, Package.assigned_to_manager)
+
+def _unique(ids: List[int]) -> List[int]:
+    return list(dict.fromkeys(ids))
+
+def _update_returning(db: Session, ids: List[int], criteria: list, values: dict) -> list:
+    """UPDATE the packages in ids matching criteria and return the EVENT_COLUMNS of the changed rows"""
+    statement = update(Package).where(Package.id.in_(ids), *criteria).values(**values)
+    if db.get_bind().dialect.update_returning:
+        return db.execute(statement.returning(*EVENT_COLUMNS), execution_options={"synchronize_session": False}).all()
+    # No UPDATE ... RETURNING: lock the matching rows first so exactly those are changed and reported
+    locked = db.execute(select(Package.id).where(Package.id.in_(ids), *criteria).with_for_update()).scalars().all()
+    if not locked:
+        return []
+    db.execute(update(Package).where(Package.id.in_(locked)).values(**values), execution_options={"synchronize_session": False})
+    return db.execute(select(*EVENT_COLUMNS).where(Package.id.in_(locked))).all()
+
+def _outcomes(db: Session, ids: List[int], changed: list, describe) -> PackageBatchResult:
+    """Per-id outcomes in request order; unchanged ids are explained with one extra SELECT"""
+    changed_by_id = {row.id: row for row in changed}
+    missing = [package_id for package_id in ids if package_id not in changed_by_id]
+    current = dict(db.execute(select(Package.id, Package.status).where(Package.id.in_(missing))).all()) if missing else {}
+    result = PackageBatchResult()
+    for package_id in ids:
+        if package_id in changed_by_id:
+            result.results.append(PackageBatchOutcome(package_id=package_id, ok=True, status=changed_by_id[package_id].status))
+            result.updated += 1
+        elif package_id not in current:
+            result.results.append(PackageBatchOutcome(package_id=package_id, ok=False, message="Package not found"))
+            result.failed += 1
+        else:
+            result.results.append(PackageBatchOutcome(
+                package_id=package_id, ok=False, status=current[package_id], message=describe(current[package_id])
+            ))
+            result.failed += 1
+    return result
+
+def batch_update_status(db: Session, package_ids: List[int], status: str, user: User, notes: Optional[str] = None) -> PackageBatchResult:
+    """
+    Apply one status transition to many packages with a single conditional UPDATE: only rows
+    still in an allowed source status change, so a package approved or rejected by someone else
+    in the meantime is reported instead of overwritten. Stamps the same fields as the single
+    package endpoint, with one timestamp for the whole batch.
+    """
+    transition = STATUS_TRANSITIONS[status]
+    if user.role not in transition.roles:
+        raise HTTPException(status_code=403, detail=f"Role '{user.role}' cannot set packages to '{status}'")
+    ids = _unique(package_ids)
+    now = datetime.utcnow()
+    values = {"status": status, transition.timestamp_column: now, "updated_at": func.now()}
+    if transition.user_column:
+        values[transition.user_column] = user.id
+    if notes:
+        values["notes"] = notes
+    changed = _update_returning(db, ids, [Package.status.in_(transition.from_statuses)], values)
+    expected = " or ".join(transition.from_statuses)
+    result = _outcomes(db, ids, changed, lambda current: f"Package is '{current}', expected '{expected}'")
+    db.commit()
+    for row in changed:
+        broker.publish("status", row)
+    return result
+
+def batch_assign(db: Session, package_ids: List[int], manager_id: int) -> PackageBatchResult:
+    """
+    Assign many packages to one manager. Previous managers get a reassignment tombstone
+    (as with the single package endpoint) so their delta sync drops the packages.
+    """
+    manager = db.query(User.id).filter(User.id == manager_id, User.role == "manager").first()
+    if not manager:
+        raise HTTPException(status_code=404, detail="Manager not found")
+    ids = _unique(package_ids)
+    previous = db.execute(
+        select(Package.id, Package.assigned_to_manager).where(Package.id.in_(ids)).with_for_update()
+    ).all()
+    tombstones = [
+        {"package_id": package_id, "manager_id": previous_manager, "reason": "reassigned"}
+        for package_id, previous_manager in previous
+        if previous_manager and previous_manager != manager_id
+    ]
+    if tombstones:
+        db.execute(insert(PackageTombstone), tombstones)
+    found = [package_id for package_id, _ in previous]
+    changed = _update_returning(db, found, [], {"assigned_to_manager": manager_id, "updated_at": func.now()}) if found else []
+    result = _outcomes(db, ids, changed, lambda current: "Package could not be assigned")
+    db.commit()
+    for row in changed:
+        broker.publish("assigned", row)
+    return result
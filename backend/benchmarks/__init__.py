@@ -0,0 +1 @@
+# Load and benchmark tooling for the backend
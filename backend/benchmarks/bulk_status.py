@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Status transition throughput: one PATCH /api/packages/{id}/status per package against
+PATCH /api/packages/batch/status, against a running server.
+
+Usage: python -m benchmarks.bulk_status --url http://localhost:8000 --email manager@example.com --password secret
+       python -m benchmarks.bulk_status --packages 500 --concurrency 8 --batch-sizes 50,100,500
+
+Fresh 'submitted' packages are created for every run through POST /api/packages/import,
+so the account needs a role that can both import and approve (manager or admin).
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import time
+from typing import List
+
+import httpx
+
+async def create_packages(client: httpx.AsyncClient, count: int) -> List[int]:
+    lines = [
+        json.dumps({
+            "recipient": f"Benchmark {i}",
+            "to_address": "Benchmark address",
+            "project_code": "BENCH",
+            "transportation_type": "hand_carry",
+            "items": [{"description": "Benchmark item"}],
+        })
+        for i in range(count)
+    ]
+    response = await client.post(
+        "/api/packages/import",
+        files={"file": ("benchmark.ndjson", io.BytesIO("\n".join(lines).encode()))}
+    )
+    response.raise_for_status()
+    return [package["package_id"] for package in response.json()["packages"]]
+
+async def run_single(client: httpx.AsyncClient, ids: List[int], concurrency: int):
+    queue = list(ids)
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        while queue:
+            package_id = queue.pop()
+            response = await client.patch(f"/api/packages/{package_id}/status", json={"status": "approved"})
+            if response.status_code != 200:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return time.perf_counter() - started, len(ids), failures
+
+async def run_batch(client: httpx.AsyncClient, ids: List[int], batch_size: int):
+    updated = failures = 0
+    started = time.perf_counter()
+    for start in range(0, len(ids), batch_size):
+        response = await client.patch(
+            "/api/packages/batch/status",
+            json={"package_ids": ids[start:start + batch_size], "status": "approved"}
+        )
+        response.raise_for_status()
+        updated += response.json()["updated"]
+        failures += response.json()["failed"]
+    return time.perf_counter() - started, len(ids) // batch_size + (1 if len(ids) % batch_size else 0), failures
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=120) as client:
+        response = await client.post("/api/auth/login", json={"email": args.email, "password": args.password})
+        response.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+        print(f"{'path':>16} {'packages':>9} {'requests':>9} {'failed':>7} {'seconds':>9} {'pkg/s':>9}")
+        ids = await create_packages(client, args.packages)
+        elapsed, requests, failures = await run_single(client, ids, args.concurrency)
+        print(f"{'single x' + str(args.concurrency):>16} {len(ids):>9} {requests:>9} {failures:>7} {elapsed:>9.2f} {len(ids) / elapsed:>9.1f}")
+        for batch_size in args.batch_sizes:
+            ids = await create_packages(client, args.packages)
+            elapsed, requests, failures = await run_batch(client, ids, batch_size)
+            print(f"{'batch ' + str(batch_size):>16} {len(ids):>9} {requests:>9} {failures:>7} {elapsed:>9.2f} {len(ids) / elapsed:>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single vs batch status transition benchmark")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--packages", type=int, default=500, help="Packages approved per run")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel requests on the single package path")
+    parser.add_argument("--batch-sizes", default="50,100,500", help="Comma separated package ids per batch request")
+    args = parser.parse_args()
+    args.batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    asyncio.run(main(args))
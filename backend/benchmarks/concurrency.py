@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark: fire requests at a running server from many concurrent
+clients and report throughput and latency percentiles per concurrency level.
+
+Usage: python -m benchmarks.concurrency --url http://localhost:8000 --email admin@example.com --password secret
+       python -m benchmarks.concurrency --path /api/packages/?limit=50 --levels 1,8,32,64 --duration 10
+
+Run it before and after a change (e.g. DB_POOL_SIZE / THREADPOOL_SIZE, or the move of
+blocking handlers off the event loop) and compare requests/s at the higher levels.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round((len(ordered) - 1) * fraction)))
+    return ordered[index]
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/api/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def run_level(client: httpx.AsyncClient, paths: List[str], headers: dict, concurrency: int, duration: float):
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset: int):
+        nonlocal errors
+        i = offset
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(n) for n in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50) if latencies else 0.0,
+        "p95": percentile(latencies, 0.95) if latencies else 0.0,
+        "p99": percentile(latencies, 0.99) if latencies else 0.0,
+        "mean": statistics.fmean(latencies) if latencies else 0.0,
+    }
+
+async def main(args):
+    limits = httpx.Limits(max_connections=max(args.levels) * 2, max_keepalive_connections=max(args.levels) * 2)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        token = await login(client, args.email, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+        print(f"{'conc':>5} {'reqs':>7} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for level in args.levels:
+            result = await run_level(client, args.path, headers, level, args.duration)
+            print(
+                f"{result['concurrency']:>5} {result['requests']:>7} {result['errors']:>5} {result['rps']:>9.1f} "
+                f"{result['p50']:>9.1f} {result['p95']:>9.1f} {result['p99']:>9.1f}"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrency benchmark for the package API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--path", action="append", help="GET path to hit, may be repeated (default /api/packages/?limit=50)")
+    parser.add_argument("--levels", default="1,8,32", help="Comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per level")
+    args = parser.parse_args()
+    args.levels = [int(level) for level in args.levels.split(",")]
+    args.path = args.path or ["/api/packages/?limit=50"]
+    asyncio.run(main(args))
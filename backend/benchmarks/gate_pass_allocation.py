@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Stress test for gate pass number allocation: many threads, each with its own session,
+allocate numbers for one (financial year, pass type) against DATABASE_URL at the same time.
+Fails (exit 1) on any duplicate and, in direct mode, on any gap; prints throughput and latency.
+
+Usage: python -m benchmarks.gate_pass_allocation --threads 64 --per-thread 50
+       python -m benchmarks.gate_pass_allocation --block-size 20
+
+Uses a scratch financial year ("9999" by default) whose sequence row is deleted afterwards.
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List
+
+from app.database import Base, SessionLocal, engine
+from app.models import GatePassSequence
+from app.sequences import SequenceBlockAllocator, allocate_sequence
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round((len(ordered) - 1) * fraction)))
+    return ordered[index]
+
+def run(args) -> int:
+    Base.metadata.create_all(bind=engine, tables=[GatePassSequence.__table__])
+    allocator = SequenceBlockAllocator(args.block_size) if args.block_size > 1 else None
+    numbers: List[int] = []
+    latencies: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.threads)
+
+    def worker():
+        local_numbers, local_latencies = [], []
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            for _ in range(args.per_thread):
+                started = time.perf_counter()
+                if allocator:
+                    number = allocator.next(args.financial_year, args.pass_type)
+                else:
+                    number = allocate_sequence(db, args.financial_year, args.pass_type)
+                    db.commit()
+                local_latencies.append((time.perf_counter() - started) * 1000)
+                local_numbers.append(number)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+        finally:
+            db.close()
+            with lock:
+                numbers.extend(local_numbers)
+                latencies.extend(local_latencies)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if not args.keep:
+        db = SessionLocal()
+        db.query(GatePassSequence).filter(
+            GatePassSequence.financial_year == args.financial_year,
+            GatePassSequence.pass_type == args.pass_type
+        ).delete()
+        db.commit()
+        db.close()
+
+    duplicates = [number for number, seen in Counter(numbers).items() if seen > 1]
+    expected = args.threads * args.per_thread
+    print(f"dialect={engine.dialect.name} threads={args.threads} block_size={args.block_size}")
+    print(f"allocated {len(numbers)}/{expected} in {elapsed:.2f}s ({len(numbers) / elapsed:.0f}/s), errors={len(errors)}")
+    if latencies:
+        print(
+            f"latency ms: mean {statistics.fmean(latencies):.2f} p50 {percentile(latencies, 0.5):.2f} "
+            f"p95 {percentile(latencies, 0.95):.2f} p99 {percentile(latencies, 0.99):.2f}"
+        )
+    for error in errors[:5]:
+        print(f"error: {error}")
+
+    failed = bool(errors) or bool(duplicates)
+    if duplicates:
+        print(f"FAIL: {len(duplicates)} duplicate numbers, e.g. {duplicates[:10]}")
+    if allocator is None and numbers and sorted(numbers) != list(range(1, len(numbers) + 1)):
+        print("FAIL: direct allocation left gaps")
+        failed = True
+    if not failed:
+        print("OK: no duplicates" + ("" if allocator else ", no gaps"))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent gate pass allocation stress test")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--per-thread", type=int, default=25)
+    parser.add_argument("--block-size", type=int, default=1, help="Reserve numbers in blocks of this size (1 = direct)")
+    parser.add_argument("--financial-year", default="9999", help="Scratch financial year to allocate in")
+    parser.add_argument("--pass-type", default="RGP")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch sequence row")
+    sys.exit(run(parser.parse_args()))
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Index usage check: EXPLAIN the package list queries (built by the same code the endpoints use)
+against DATABASE_URL and verify each uses the index it was given. On PostgreSQL the scan
+counters of those indexes (pg_stat_user_indexes) are printed too, so a run after
+benchmarks.workload shows whether the live traffic used them.
+
+Usage: python -m benchmarks.index_usage
+       DATABASE_URL=postgresql://... python -m benchmarks.index_usage --manager-id 12
+
+Run it against a seeded database (python -m benchmarks.seed, which also runs ANALYZE): on a
+nearly empty table a sequential scan is the right plan. Exits with status 1 when a query does
+not use its index.
+"""
+
+import argparse
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func, or_, select, text
+
+from app.database import SessionLocal, engine
+from app.models import Package, PackageItem, User
+from app.pagination import apply_keyset, apply_projection, parse_fields
+from app.routers.packages import apply_package_filters
+from app.search import ITEM_SEARCH_COLUMNS, PACKAGE_SEARCH_COLUMNS
+
+PAGE_SIZE = 50
+
+def search_indexes():
+    """Every pg_trgm index (one per UNION branch of the substring filter), or the SQLite FTS5 table"""
+    if engine.dialect.name == "postgresql":
+        return tuple(f"ix_{col.table.name}_{col.name}_trgm" for col in PACKAGE_SEARCH_COLUMNS + ITEM_SEARCH_COLUMNS)
+    return ("package_search",)
+
+def list_query(db, user: User, **filters):
+    """GET /api/packages/?limit=50 with the given filters, as get_packages builds it"""
+    query = apply_projection(db.query(Package), parse_fields(None))
+    query, _ = apply_package_filters(query, user, **filters)
+    return apply_keyset(query, None).limit(PAGE_SIZE + 1).statement
+
+def checks(db, manager_id: int):
+    """(description, statement, index or indexes the plan should use)"""
+    admin = User(role="admin")
+    # A real tracking number, so the search is as selective as a typed one
+    term = db.query(Package.tracking_number).filter(Package.tracking_number.isnot(None)).order_by(Package.id.desc()).limit(1).scalar()
+    since = datetime.now(timezone.utc) - timedelta(days=1)
+    page_ids = [package_id for package_id, in db.query(Package.id).order_by(Package.id.desc()).limit(PAGE_SIZE)]
+    return [
+        ("list page", list_query(db, admin), "ix_packages_submitted_at_id"),
+        ("list page by status", list_query(db, admin, status="approved"), "ix_packages_status_submitted_at"),
+        ("manager queue", list_query(db, admin, manager_id=manager_id, status="submitted"), "ix_packages_manager_status_submitted_at"),
+        ("manager delta sync", list_query(db, admin, manager_id=manager_id, updated_since=since), "ix_packages_manager_updated_at"),
+        ("search", list_query(db, admin, search=term), search_indexes()),
+        ("items of a page", select(PackageItem).where(PackageItem.package_id.in_(page_ids)), "ix_package_items_package_id"),
+        # The overdue count of app.stats
+        ("overdue returnables", select(func.count()).select_from(Package).where(
+            Package.is_returnable.is_(True),
+            Package.return_date < date.today(),
+            or_(Package.return_status.is_(None), Package.return_status != "returned")
+        ), "ix_packages_open_returns"),
+    ]
+
+def explain(statement) -> str:
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    parameters = [compiled.params[name] for name in compiled.positiontup] if compiled.positional else compiled.params
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(prefix + str(compiled), parameters)
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return "\n".join(str(row[-1]) for row in rows)
+
+def print_scan_counts(db, names) -> None:
+    rows = db.execute(
+        text("SELECT indexrelname, idx_scan FROM pg_stat_user_indexes WHERE indexrelname = ANY(:names) ORDER BY indexrelname"),
+        {"names": list(names)}
+    ).all()
+    print(f"\n{'index':<44} {'scans':>12}")
+    for name, scans in rows:
+        print(f"{name:<44} {scans:>12}")
+
+def main(args) -> None:
+    db = SessionLocal()
+    try:
+        manager_id = args.manager_id or db.execute(
+            select(Package.assigned_to_manager)
+            .where(Package.assigned_to_manager.isnot(None))
+            .group_by(Package.assigned_to_manager)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).scalar()
+        if manager_id is None:
+            sys.exit("No packages assigned to a manager: seed the database with python -m benchmarks.seed first")
+        missing = []
+        plans = [(description, statement, (index,) if isinstance(index, str) else index)
+                 for description, statement, index in checks(db, manager_id)]
+        for description, statement, indexes in plans:
+            plan = explain(statement)
+            used = all(name in plan for name in indexes)
+            if not used:
+                missing.append(description)
+            print(f"{'ok  ' if used else 'MISS'} {description:<22} {', '.join(indexes)}")
+            if args.verbose or not used:
+                print("\n".join(f"       {line}" for line in plan.splitlines()))
+        if engine.dialect.name == "postgresql":
+            print_scan_counts(db, [name for _, _, indexes in plans for name in indexes])
+    finally:
+        db.close()
+    if missing:
+        sys.exit(f"\n{len(missing)} queries do not use their index: {', '.join(missing)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify the package list queries use their indexes")
+    parser.add_argument("--manager-id", type=int, help="Manager for the queue queries (default: the one with most packages)")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan, not only the misses")
+    main(parser.parse_args())
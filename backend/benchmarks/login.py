@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark: full password logins (bcrypt) against refresh-token renewals
+at increasing concurrency, against a running server.
+
+Usage: python -m benchmarks.login --url http://localhost:8000 --email admin@example.com --password secret
+       python -m benchmarks.login --levels 1,8,32 --duration 10 --mode login
+
+Each refresh worker keeps its own rotating token chain (every refresh returns a new token).
+503s in login mode mean the bcrypt pool's queue (PASSWORD_HASH_MAX_PENDING) was full.
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import List
+
+import httpx
+
+from benchmarks.concurrency import percentile
+
+async def run_level(client: httpx.AsyncClient, args, mode: str, concurrency: int):
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    credentials = {"email": args.email, "password": args.password}
+    deadline = time.perf_counter() + args.duration
+
+    async def worker():
+        refresh_token = None
+        if mode == "refresh":
+            response = await client.post("/api/auth/login", json=credentials)
+            response.raise_for_status()
+            refresh_token = response.json()["refresh_token"]
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if mode == "refresh":
+                    response = await client.post("/api/auth/refresh", json={"refresh_token": refresh_token})
+                    if response.status_code == 200:
+                        refresh_token = response.json()["refresh_token"]
+                else:
+                    response = await client.post("/api/auth/login", json=credentials)
+                statuses[response.status_code] += 1
+            except httpx.HTTPError:
+                statuses["error"] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "ok": statuses.get(200, 0),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50) if latencies else 0.0,
+        "p95": percentile(latencies, 0.95) if latencies else 0.0,
+        "p99": percentile(latencies, 0.99) if latencies else 0.0,
+        "statuses": dict(statuses),
+    }
+
+async def main(args):
+    limits = httpx.Limits(max_connections=max(args.levels) * 2, max_keepalive_connections=max(args.levels) * 2)
+    modes = ["login", "refresh"] if args.mode == "both" else [args.mode]
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        print(f"{'mode':>8} {'conc':>5} {'reqs':>7} {'ok':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+        for mode in modes:
+            for level in args.levels:
+                result = await run_level(client, args, mode, level)
+                print(
+                    f"{result['mode']:>8} {result['concurrency']:>5} {result['requests']:>7} {result['ok']:>7} "
+                    f"{result['rps']:>9.1f} {result['p50']:>9.1f} {result['p95']:>9.1f} {result['p99']:>9.1f}  {result['statuses']}"
+                )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login vs refresh throughput benchmark")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--mode", choices=["login", "refresh", "both"], default="both")
+    parser.add_argument("--levels", default="1,8,32", help="Comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per level")
+    args = parser.parse_args()
+    args.levels = [int(level) for level in args.levels.split(",")]
+    asyncio.run(main(args))
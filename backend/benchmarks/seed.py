@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator: bulk-load realistic volumes into DATABASE_URL for benchmarking.
+Users across every role, packages spread over --days of history in every status, with items,
+dimensions, images (rows sharing a small set of real blob files) and return records.
+
+Usage: python -m benchmarks.seed --packages 100000
+       python -m benchmarks.seed --packages 5000000 --users 2000 --chunk-size 50000 --reset
+
+PostgreSQL is loaded with COPY (psycopg2), anything else with executemany, one transaction per
+chunk. Benchmark users are <role><n>@bench.local with --password (default "benchmark").
+--reset deletes every package, image, return and tombstone row first: scratch databases only.
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Sequence, Tuple
+
+from PIL import Image
+from sqlalchemy import delete, func, select, text
+
+from app.auth import get_password_hash
+from app.database import Base, SessionLocal, engine
+from app.image_store import BLOB_DIR, find_or_create_blob
+from app.models import (
+    GatePassSequence, ImageBlob, Package, PackageDimension, PackageImage, PackageImageVariant,
+    PackageItem, PackageTombstone, ReturnInfo, User
+)
+from app.search import SQLITE_TRIGGERS, ensure_search_index
+from app.sequences import format_gate_pass_number
+from app.storage import file_sha256
+
+ROLE_SHARES = (("employee", 0.70), ("manager", 0.10), ("logistics", 0.10), ("security", 0.08), ("admin", 0.02))
+STATUS_SHARES = (("dispatched", 0.40), ("approved", 0.25), ("submitted", 0.17), ("rejected", 0.10), ("logistics_pending", 0.08))
+TRANSPORT = ("courier", "hand_carry", "vehicle")
+COURIERS = ("Blue Dart", "DTDC", "Delhivery", "Professional Couriers", "FedEx")
+PROJECTS = [f"PRJ-{n:03d}" for n in range(1, 61)]
+CITIES = ("Chennai", "Bengaluru", "Hyderabad", "Pune", "Mumbai", "Delhi", "Coimbatore", "Kochi")
+PARTS = ("Servo motor", "Control panel", "Laptop", "Calibration kit", "PLC module", "Sensor array",
+         "Power supply", "Spare gearbox", "Network switch", "Oscilloscope", "Cable harness", "Test fixture")
+RETURNABLE_SHARE = 0.3
+BLOB_COUNT = 24
+# Odd and not a multiple of 3, so i * TRACKING_MULTIPLIER mod 36**8 is a bijection: unique, random-looking codes
+TRACKING_MULTIPLIER = 2_654_435_761
+BASE36 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+def weighted(rng: random.Random, shares):
+    return rng.choices([name for name, _ in shares], weights=[share for _, share in shares])[0]
+
+def tracking_number(package_id: int) -> str:
+    value = (package_id * TRACKING_MULTIPLIER) % 36 ** 8
+    chars = []
+    for _ in range(8):
+        value, digit = divmod(value, 36)
+        chars.append(BASE36[digit])
+    return "TRK" + "".join(chars)
+
+def financial_year_of(moment: datetime) -> str:
+    start = moment.year if moment.month >= 4 else moment.year - 1
+    return f"{str(start)[-2:]}{str(start + 1)[-2:]}"
+
+class BulkWriter:
+    """COPY on PostgreSQL with psycopg2, executemany elsewhere; rows are tuples in column order"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.copy = connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2"
+
+    def write(self, table, columns: Sequence[str], rows: List[tuple]) -> None:
+        if not rows:
+            return
+        if self.copy:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(["\\N" if value is None else value for value in row])
+            buffer.seek(0)
+            cursor = self.connection.connection.cursor()
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+            )
+        else:
+            self.connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+def seed_users(db, count: int, password: str) -> Dict[str, List[int]]:
+    """Create <role><n>@bench.local users (one bcrypt hash shared by all) and return ids by role"""
+    password_hash = get_password_hash(password)
+    existing = set(db.execute(select(User.email).where(User.email.like("%@bench.local"))).scalars())
+    rows = []
+    for role, share in ROLE_SHARES:
+        for n in range(1, max(1, round(count * share)) + 1):
+            email = f"{role}{n}@bench.local"
+            if email not in existing:
+                rows.append({
+                    "email": email,
+                    "password_hash": password_hash,
+                    "full_name": f"Bench {role.title()} {n}",
+                    "role": role,
+                    "employee_id": f"BENCH-{role.upper()}-{n}",
+                })
+    if rows:
+        db.execute(User.__table__.insert(), rows)
+        db.commit()
+    by_role: Dict[str, List[int]] = {role: [] for role, _ in ROLE_SHARES}
+    for user_id, role in db.execute(select(User.id, User.role).where(User.email.like("%@bench.local"))):
+        by_role.setdefault(role, []).append(user_id)
+    return by_role
+
+def seed_blobs(db) -> List[Tuple[int, str]]:
+    """(id, path) of a few real JPEGs in the blob store for the image rows to share, as deduplicated uploads do"""
+    rng = random.Random(7)
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    blobs = []
+    for n in range(BLOB_COUNT):
+        source_path = os.path.join(BLOB_DIR, f".seed-{n}.jpg")
+        Image.new("RGB", (640, 480), tuple(rng.randrange(256) for _ in range(3))).save(source_path, "JPEG", quality=80)
+        blobs.append(find_or_create_blob(db, file_sha256(source_path), source_path, os.path.getsize(source_path), ".jpg"))
+    db.commit()
+    return [(blob.id, blob.path) for blob in blobs]
+
+def generate(args, first_id: int, users: Dict[str, List[int]], blob_paths: List[Tuple[int, str]], sequences: Dict):
+    """Yield (packages, items, dimensions, images, returns) row lists, one chunk at a time"""
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    employees = users["employee"] or users["admin"]
+    managers = users["manager"] or users["admin"]
+    # --return-share is of all packages; only dispatched returnable ones can have come back
+    return_odds = args.return_share / (RETURNABLE_SHARE * dict(STATUS_SHARES)["dispatched"])
+    package_id = first_id
+    remaining = args.packages
+    while remaining > 0:
+        size = min(args.chunk_size, remaining)
+        remaining -= size
+        packages, items, dimensions, images, returns = [], [], [], [], []
+        for _ in range(size):
+            submitted_at = now - timedelta(seconds=rng.randrange(args.days * 86400))
+            status = weighted(rng, STATUS_SHARES)
+            manager = rng.choice(managers)
+            returnable = rng.random() < RETURNABLE_SHARE
+            transport = rng.choice(TRANSPORT)
+            courier = transport == "courier" and status == "dispatched"
+            decided_at = submitted_at + timedelta(hours=rng.uniform(0.5, 72))
+            dispatched_at = decided_at + timedelta(hours=rng.uniform(0.5, 48)) if status == "dispatched" else None
+            pass_type = "RGP" if returnable else "NRGP"
+            key = (financial_year_of(submitted_at), pass_type)
+            sequences[key] = sequences.get(key, 0) + 1
+            return_status = None
+            if returnable and status == "dispatched" and rng.random() < return_odds:
+                return_status = "returned"
+                returns.append((package_id, f"Bench Returner {rng.randrange(100)}", "Returned after use",
+                                dispatched_at + timedelta(days=rng.uniform(1, 60)), "returned"))
+            packages.append((
+                package_id, tracking_number(package_id), rng.choice(PARTS) + " shipment", f"Site engineer {rng.randrange(500)}",
+                f"{rng.randrange(1, 400)} Industrial Estate, {rng.choice(CITIES)}", rng.choice(PROJECTS),
+                f"PO-{rng.randrange(10 ** 6):06d}", (submitted_at - timedelta(days=rng.randrange(30))).date(),
+                None, rng.choice(("low", "medium", "medium", "high")), status,
+                format_gate_pass_number(pass_type, key[0], sequences[key]),
+                rng.choice(employees), manager,
+                manager if status in ("approved", "dispatched") else None,
+                manager if status == "rejected" else None,
+                submitted_at, decided_at if status in ("approved", "dispatched") else None,
+                decided_at if status == "rejected" else None, dispatched_at, dispatched_at or decided_at,
+                return_status, returnable,
+                (submitted_at + timedelta(days=rng.randrange(7, 90))).date() if returnable else None,
+                "Calibration and return" if returnable else None,
+                f"TN-{rng.randrange(10, 99)}-AB-{rng.randrange(1000, 9999)}" if transport == "vehicle" else None,
+                rng.choice(COURIERS) if courier else None, rng.choice(COURIERS) if courier else None,
+                f"CR{package_id:010d}" if courier else None, transport, rng.randrange(1, 4),
+            ))
+            for n in range(rng.randint(1, 2 * args.items_per_package - 1)):
+                quantity = rng.randint(1, 5)
+                unit_price = round(rng.uniform(500, 250000), 2)
+                items.append((package_id, rng.choice(PARTS), quantity, f"SN{package_id:08d}{n:02d}",
+                              f"{rng.randrange(8400, 8599)}{rng.randrange(10, 99)}", unit_price, round(unit_price * quantity, 2)))
+            for _ in range(rng.randint(0, 2)):
+                dimensions.append((package_id, round(rng.uniform(0.5, 80), 2), "kg",
+                                   f"{rng.randrange(10, 120)}x{rng.randrange(10, 120)}x{rng.randrange(10, 120)} cm", "Shipping"))
+            for n in range(args.images_per_package if blob_paths else 0):
+                blob_id, path = rng.choice(blob_paths)
+                images.append((package_id, path, "before_packing" if n == 0 else "after_packing", blob_id, submitted_at))
+            package_id += 1
+        yield packages, items, dimensions, images, returns
+
+PACKAGE_COLUMNS = (
+    "id", "tracking_number", "remarks", "recipient", "to_address", "project_code", "po_number", "po_date",
+    "notes", "priority", "status", "gate_pass_serial_number", "submitted_by", "assigned_to_manager",
+    "approved_by", "rejected_by", "submitted_at", "approved_at", "rejected_at", "dispatched_at", "updated_at",
+    "return_status", "is_returnable", "return_date", "return_reason", "vehicle_details", "carrier_name",
+    "courier_name", "courier_tracking_number", "transportation_type", "number_of_packages",
+)
+ITEM_COLUMNS = ("package_id", "description", "quantity", "serial_number", "hsn_code", "unit_price", "value")
+DIMENSION_COLUMNS = ("package_id", "weight", "weight_unit", "dimension", "purpose")
+IMAGE_COLUMNS = ("package_id", "image_path", "image_type", "blob_id", "created_at")
+RETURN_COLUMNS = ("package_id", "returned_by", "return_notes", "returned_at", "status")
+
+def reset(db) -> None:
+    for model in (PackageImageVariant, PackageImage, ReturnInfo, PackageItem, PackageDimension, PackageTombstone, Package):
+        db.execute(delete(model))
+    db.execute(delete(GatePassSequence))
+    db.commit()
+
+def store_sequences(db, sequences: Dict) -> None:
+    """Move the gate pass sequences past the numbers used, so new submissions do not collide"""
+    for (financial_year, pass_type), last in sequences.items():
+        row = db.query(GatePassSequence).filter_by(financial_year=financial_year, pass_type=pass_type).first()
+        if row is None:
+            db.add(GatePassSequence(financial_year=financial_year, pass_type=pass_type, current_sequence=last))
+        else:
+            row.current_sequence = max(row.current_sequence, last)
+    db.commit()
+
+def finish(connection) -> None:
+    """Reference counts, id sequences, the SQLite search index and planner statistics"""
+    connection.execute(text(
+        "UPDATE image_blobs SET ref_count = (SELECT count(*) FROM package_images i WHERE i.blob_id = image_blobs.id)"
+    ))
+    if connection.dialect.name == "postgresql":
+        for table in ("packages", "package_items", "package_dimensions", "package_images", "return_info"):
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT coalesce(max(id), 1) FROM {table}))"
+            ))
+    connection.commit()
+    connection.execute(text("ANALYZE"))
+    connection.commit()
+
+def main(args) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.reset:
+            reset(db)
+        users = seed_users(db, args.users, args.password)
+        blobs = seed_blobs(db) if args.images_per_package else []
+        first_id = (db.execute(select(func.max(Package.id))).scalar() or 0) + 1
+        sequences = {
+            (row.financial_year, row.pass_type): row.current_sequence
+            for row in db.query(GatePassSequence).all()
+        }
+    finally:
+        db.close()
+
+    if engine.dialect.name == "sqlite":
+        # Per-row FTS triggers would dominate the load; the index is rebuilt in one pass afterwards
+        with engine.begin() as connection:
+            for name in SQLITE_TRIGGERS:
+                connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+            connection.exec_driver_sql("DROP TABLE IF EXISTS package_search")
+
+    started = time.perf_counter()
+    loaded = 0
+    with engine.connect() as connection:
+        writer = BulkWriter(connection)
+        for packages, items, dimensions, images, returns in generate(args, first_id, users, blobs, sequences):
+            writer.write(Package.__table__, PACKAGE_COLUMNS, packages)
+            writer.write(PackageItem.__table__, ITEM_COLUMNS, items)
+            writer.write(PackageDimension.__table__, DIMENSION_COLUMNS, dimensions)
+            writer.write(PackageImage.__table__, IMAGE_COLUMNS, images)
+            writer.write(ReturnInfo.__table__, RETURN_COLUMNS, returns)
+            connection.commit()
+            loaded += len(packages)
+            elapsed = time.perf_counter() - started
+            print(f"{loaded:>10} packages  {loaded / elapsed:>9.0f}/s")
+        finish(connection)
+
+    db = SessionLocal()
+    try:
+        store_sequences(db, sequences)
+    finally:
+        db.close()
+    ensure_search_index(engine)
+    print(f"Seeded {loaded} packages in {time.perf_counter() - started:.1f}s ({', '.join(f'{role}: {len(ids)}' for role, ids in users.items())} users)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic packages for benchmarking")
+    parser.add_argument("--packages", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=200, help="Benchmark users, split across roles")
+    parser.add_argument("--password", default="benchmark", help="Password of every benchmark user")
+    parser.add_argument("--items-per-package", type=int, default=3, help="Average items per package")
+    parser.add_argument("--images-per-package", type=int, default=1)
+    parser.add_argument("--return-share", type=float, default=0.05, help="Share of packages with a return record")
+    parser.add_argument("--days", type=int, default=730, help="History the submission dates are spread over")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="Packages per transaction")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed, for repeatable datasets")
+    parser.add_argument("--reset", action="store_true", help="Delete all packages first (scratch databases only)")
+    main(parser.parse_args())
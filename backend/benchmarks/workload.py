@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Mixed workload benchmark: concurrent virtual users run the day-to-day flows against a running
+server (seeded with benchmarks.seed) and the p50/p95/p99, throughput and errors are reported
+per endpoint. Results can be saved as a baseline and later runs compared against it.
+
+Usage: python -m benchmarks.workload --url http://localhost:8000 --duration 60 --concurrency 32
+       python -m benchmarks.workload --save-baseline benchmarks/baselines/postgres-1m.json
+       python -m benchmarks.workload --compare benchmarks/baselines/postgres-1m.json --tolerance 0.2
+
+Scenarios (weights set with --mix):
+  manager_poll     GET /api/packages/ for the manager's queue, then updated_since and tombstone polls
+  employee_create  POST /api/packages/create-with-files with items and a JPEG
+  logistics_update PUT /api/packages/{id}/logistics with dimensions (moves the package back to submitted)
+  gate_scan        GET /api/scan/{code} with tracking, gate pass and courier numbers
+  gate_pass        GET /api/gate-pass/{id}/pdf
+
+The run writes to the database: use a scratch copy. Virtual users log in as the seeded
+<role><n>@bench.local accounts. --compare exits with status 1 when an endpoint's p95 grew or its
+throughput dropped by more than --tolerance, so it can gate a CI job; baselines are only
+comparable on the same machine, database and seed.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+from PIL import Image
+
+from benchmarks.concurrency import percentile
+
+DEFAULT_MIX = "manager_poll=40,employee_create=10,logistics_update=10,gate_scan=30,gate_pass=10"
+ACCOUNTS_PER_ROLE = 4
+SAMPLE_PAGE = 500
+
+@dataclass
+class Pool:
+    """Accounts and sampled ids/codes the scenarios draw from"""
+    tokens: Dict[str, List[dict]] = field(default_factory=dict)  # role -> [{"id", "headers"}]
+    managers: List[int] = field(default_factory=list)
+    approved: List[int] = field(default_factory=list)
+    logistics_pending: List[int] = field(default_factory=list)
+    scan_codes: List[str] = field(default_factory=list)
+    watermarks: Dict[int, str] = field(default_factory=dict)  # manager id -> X-Sync-Watermark
+    image: bytes = b""
+
+    def account(self, rng: random.Random, role: str) -> dict:
+        return rng.choice(self.tokens.get(role) or self.tokens["admin"])
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, label: str, started: float, response: Optional[httpx.Response]) -> None:
+        self.latencies.setdefault(label, []).append((time.perf_counter() - started) * 1000)
+        if response is None or response.status_code >= 400:
+            self.errors[label] = self.errors.get(label, 0) + 1
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        self.record(label, started, response)
+        return response
+
+    def summary(self, elapsed: float) -> Dict[str, dict]:
+        results = {}
+        for label, latencies in sorted(self.latencies.items()):
+            results[label] = {
+                "requests": len(latencies),
+                "errors": self.errors.get(label, 0),
+                "rps": round(len(latencies) / elapsed, 2),
+                "p50": round(percentile(latencies, 0.50), 2),
+                "p95": round(percentile(latencies, 0.95), 2),
+                "p99": round(percentile(latencies, 0.99), 2),
+                "mean": round(statistics.fmean(latencies), 2),
+            }
+        return results
+
+async def manager_poll(client, pool: Pool, recorder: Recorder, rng: random.Random) -> None:
+    """Full queue page on the first poll, then what a syncing dashboard asks for: changes and tombstones"""
+    account = pool.account(rng, "manager")
+    headers = account["headers"]
+    watermark = pool.watermarks.get(account["id"])
+    if watermark is None:
+        # The full list carries no watermark; changes from the moment it was requested are picked up next time
+        pool.watermarks[account["id"]] = datetime.now(timezone.utc).isoformat()
+        params = {"manager_id": account["id"], "status": "submitted", "limit": 50}
+        await recorder.request(client, "GET /api/packages/ (full)", "GET", "/api/packages/", params=params, headers=headers)
+        return
+    params = {"manager_id": account["id"], "updated_since": watermark}
+    response = await recorder.request(client, "GET /api/packages/ (delta)", "GET", "/api/packages/", params=params, headers=headers)
+    await recorder.request(
+        client, "GET /api/packages/tombstones", "GET", "/api/packages/tombstones",
+        params={"manager_id": account["id"], "since": watermark}, headers=headers
+    )
+    if response is not None and "X-Sync-Watermark" in response.headers:
+        pool.watermarks[account["id"]] = response.headers["X-Sync-Watermark"]
+
+async def employee_create(client, pool: Pool, recorder: Recorder, rng: random.Random) -> None:
+    account = pool.account(rng, "employee")
+    items = [
+        {"description": f"Benchmark part {rng.randrange(1000)}", "quantity": rng.randint(1, 5),
+         "serial_number": f"WL{rng.randrange(10 ** 8):08d}", "unit_price": 1500.0, "value": 1500.0}
+        for _ in range(rng.randint(1, 5))
+    ]
+    data = {
+        "recipient": "Workload recipient",
+        "to_address": "Workload address",
+        "project_code": "BENCH",
+        "transportation_type": "hand_carry",
+        "items": json.dumps(items),
+    }
+    if pool.managers:
+        data["assigned_to_manager"] = str(rng.choice(pool.managers))
+    files = [("image_before_packing", ("before.jpg", pool.image, "image/jpeg"))]
+    await recorder.request(
+        client, "POST /api/packages/create-with-files", "POST", "/api/packages/create-with-files",
+        data=data, files=files, headers=account["headers"]
+    )
+
+async def logistics_update(client, pool: Pool, recorder: Recorder, rng: random.Random) -> None:
+    account = pool.account(rng, "logistics")
+    package_id = rng.choice(pool.logistics_pending or pool.approved)
+    data = {
+        "courier_name": "Blue Dart",
+        "courier_tracking_number": f"WL{rng.randrange(10 ** 10):010d}",
+        "processed_by_logistics": str(account["id"]),
+        "dimensions": json.dumps([{"weight": round(rng.uniform(1, 50), 1), "weight_unit": "kg", "dimension": "40x30x20 cm"}]),
+    }
+    await recorder.request(
+        client, "PUT /api/packages/{package_id}/logistics", "PUT", f"/api/packages/{package_id}/logistics",
+        data=data, headers=account["headers"]
+    )
+
+async def gate_scan(client, pool: Pool, recorder: Recorder, rng: random.Random) -> None:
+    account = pool.account(rng, "security")
+    code = rng.choice(pool.scan_codes)
+    await recorder.request(client, "GET /api/scan/{code}", "GET", f"/api/scan/{code}", headers=account["headers"])
+
+async def gate_pass(client, pool: Pool, recorder: Recorder, rng: random.Random) -> None:
+    account = pool.account(rng, "security")
+    package_id = rng.choice(pool.approved)
+    await recorder.request(
+        client, "GET /api/gate-pass/{package_id}/pdf", "GET", f"/api/gate-pass/{package_id}/pdf", headers=account["headers"]
+    )
+
+SCENARIOS = {
+    "manager_poll": manager_poll,
+    "employee_create": employee_create,
+    "logistics_update": logistics_update,
+    "gate_scan": gate_scan,
+    "gate_pass": gate_pass,
+}
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}'. Use: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+async def log_in(client: httpx.AsyncClient, email: str, password: str) -> Optional[dict]:
+    response = await client.post("/api/auth/login", json={"email": email, "password": password})
+    if response.status_code != 200:
+        return None
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    me = await client.get("/api/auth/me", headers=headers)
+    me.raise_for_status()
+    return {"id": me.json()["id"], "headers": headers}
+
+async def sample_packages(client: httpx.AsyncClient, headers: dict, status: str) -> List[dict]:
+    response = await client.get("/api/packages/", params={"status": status, "limit": SAMPLE_PAGE}, headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+async def prepare(client: httpx.AsyncClient, password: str) -> Pool:
+    pool = Pool()
+    for role in ("admin", "manager", "employee", "logistics", "security"):
+        accounts = await asyncio.gather(*[
+            log_in(client, f"{role}{n}@bench.local", password) for n in range(1, ACCOUNTS_PER_ROLE + 1)
+        ])
+        pool.tokens[role] = [account for account in accounts if account]
+    if not pool.tokens["admin"]:
+        sys.exit("No benchmark accounts could log in: seed the database with python -m benchmarks.seed first")
+    pool.managers = [account["id"] for account in pool.tokens["manager"]]
+
+    headers = pool.tokens["admin"][0]["headers"]
+    approved = await sample_packages(client, headers, "approved")
+    dispatched = await sample_packages(client, headers, "dispatched")
+    pool.approved = [package["id"] for package in approved + dispatched]
+    pool.logistics_pending = [package["id"] for package in await sample_packages(client, headers, "logistics_pending")]
+    for package in approved + dispatched:
+        pool.scan_codes += [
+            code for code in (package.get("tracking_number"), package.get("gate_pass_serial_number"), package.get("courier_tracking_number"))
+            if code
+        ]
+    if not pool.approved or not pool.scan_codes:
+        sys.exit("No approved or dispatched packages to scan: seed the database with python -m benchmarks.seed first")
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (1280, 960), (90, 120, 160)).save(buffer, "JPEG", quality=85)
+    pool.image = buffer.getvalue()
+    return pool
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=120) as client:
+        pool = await prepare(client, args.password)
+        recorder = Recorder()
+        names, weights = list(args.mix), list(args.mix.values())
+        deadline = time.perf_counter() + args.duration
+
+        async def virtual_user(n: int):
+            rng = random.Random(args.seed + n)
+            while time.perf_counter() < deadline:
+                await SCENARIOS[rng.choices(names, weights=weights)[0]](client, pool, recorder, rng)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[virtual_user(n) for n in range(args.concurrency)])
+        elapsed = time.perf_counter() - started
+    endpoints = recorder.summary(elapsed)
+    return {
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "duration": round(elapsed, 1),
+        "mix": args.mix,
+        "total_rps": round(sum(result["requests"] for result in endpoints.values()) / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+def print_results(results: dict) -> None:
+    print(f"{'endpoint':<44} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, result in results["endpoints"].items():
+        print(
+            f"{label:<44} {result['requests']:>7} {result['errors']:>5} {result['rps']:>8.1f} "
+            f"{result['p50']:>9.1f} {result['p95']:>9.1f} {result['p99']:>9.1f}"
+        )
+    print(f"{'total':<44} {'':>7} {'':>5} {results['total_rps']:>8.1f}")
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Endpoints whose p95 rose or throughput fell by more than tolerance, or that started failing"""
+    regressions = []
+    for label, before in baseline["endpoints"].items():
+        after = results["endpoints"].get(label)
+        if after is None:
+            continue
+        if after["p95"] > before["p95"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {before['p95']:.1f}ms -> {after['p95']:.1f}ms")
+        if after["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{label}: {before['rps']:.1f} -> {after['rps']:.1f} req/s")
+        if after["errors"] and not before["errors"]:
+            regressions.append(f"{label}: {after['errors']} errors (none in the baseline)")
+    return regressions
+
+def main(args) -> None:
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w") as out:
+            json.dump(results, out, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare) as source:
+            baseline = json.load(source)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions against {args.compare} (tolerance {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mixed workload benchmark for the package API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--password", default="benchmark", help="Password the benchmark users were seeded with")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run")
+    parser.add_argument("--concurrency", type=int, default=16, help="Virtual users")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed of the virtual users")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write the results as JSON, e.g. benchmarks/baselines/sqlite-100k.json")
+    parser.add_argument("--compare", metavar="PATH", help="Baseline JSON to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative change before a regression is reported")
+    main(parser.parse_args())
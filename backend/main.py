@@ -1,18 +1,47 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+import anyio
 import uvicorn
 
 from app.database import engine, Base
-from app.routers import auth, packages, users, uploads, gate_pass
+from app.routers import auth, packages, users, uploads, gate_pass, scan, diagnostics
 from app.config import settings
+from app.search import ensure_search_index
+from app.images import image_processor
+from app.media import MediaFiles
+from app.principals import InvalidationListener
+from app.events import event_listener
+from app.scan import scan_cache
+from app.passwords import password_hasher
+from app.gate_pass_pdf import gate_pass_renderer
+from app.metrics import MetricsMiddleware, label_routes, mark_process_dead, render_metrics
+from app.query_stats import QueryStatsMiddleware
+from app.profiler import ProfilerMiddleware
+from app.slow_queries import slow_query_log
+
+# Drops cached principals when another worker changes a user (PostgreSQL only)
+invalidation_listener = InvalidationListener(engine)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Sync route handlers (all DB access through get_db) run in this threadpool
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
     # Create tables
     Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    invalidation_listener.start()
+    event_listener.start()
+    scan_cache.start()
     yield
+    scan_cache.stop()
+    event_listener.stop()
+    invalidation_listener.stop()
+    image_processor.shutdown()
+    password_hasher.shutdown()
+    gate_pass_renderer.shutdown()
+    slow_query_log.shutdown()
+    mark_process_dead()
 
 app = FastAPI(
     title="Package Management API",
@@ -26,7 +55,7 @@ from fastapi import Request
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 
 class FileSizeMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, max_size: int = 524288000):  # 500MB default
@@ -62,17 +91,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Sync-Watermark", "Server-Timing"],
 )
+app.add_middleware(QueryStatsMiddleware)
+# Admin-only X-Profile: cpu|memory replaces the response with a profile of the request
+app.add_middleware(ProfilerMiddleware)
+# Outermost, so rejected and CORS preflight requests are counted too
+app.add_middleware(MetricsMiddleware)
 
-# Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory=settings.upload_dir), name="uploads")
+# Mount static files for uploads (cache headers, ETags, ranges and optional signed URLs)
+app.mount("/uploads", MediaFiles(directory=settings.upload_dir), name="uploads")
 
 # Include routers
-app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
-app.include_router(packages.router, prefix="/api/packages", tags=["packages"])
-app.include_router(users.router, prefix="/api/users", tags=["users"])
-app.include_router(uploads.router, prefix="/api/uploads", tags=["uploads"])
-app.include_router(gate_pass.router, prefix="/api/gate-pass", tags=["gate-pass"])
+for router, prefix, tag in [
+    (auth.router, "/api/auth", "authentication"),
+    (packages.router, "/api/packages", "packages"),
+    (users.router, "/api/users", "users"),
+    (uploads.router, "/api/uploads", "uploads"),
+    (gate_pass.router, "/api/gate-pass", "gate-pass"),
+    (scan.router, "/api/scan", "scan"),
+    (diagnostics.router, "/api/diagnostics", "diagnostics"),
+]:
+    app.include_router(router, prefix=prefix, tags=[tag])
+    # Route templates with the prefix for the http_request_* metric labels
+    label_routes(router, prefix)
 
 @app.get("/")
 async def root():
@@ -82,6 +124,12 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus text format, unauthenticated like /health; limit it to the scraper at the proxy
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
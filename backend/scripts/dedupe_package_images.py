@@ -0,0 +1,71 @@
+"""
+Move package images stored before deduplication into the content-addressed blob store.
+Every distinct file is kept once under uploads/package_images/blobs; duplicate copies are
+deleted and their PackageImage rows point at the shared blob. Safe to re-run.
+Run from the backend directory: python scripts/dedupe_package_images.py
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.image_store import file_extension, find_or_create_blob
+from app.models import ImageBlob, PackageImage
+from app.storage import file_sha256, media_path, media_url
+
+def dedupe_package_images():
+    db = SessionLocal()
+    moved = 0
+    reused = 0
+    freed = 0
+    try:
+        images = db.query(PackageImage).filter(PackageImage.blob_id.is_(None)).all()
+        print(f"Found {len(images)} images outside the blob store")
+        
+        blobs_by_path = {}
+        for image in images:
+            source_path = media_path(image.image_path)
+            blob = blobs_by_path.get(source_path)
+            if blob is None:
+                if not os.path.exists(source_path):
+                    print(f"Skipping image {image.id}: {source_path} not found")
+                    continue
+                size = os.path.getsize(source_path)
+                sha256 = file_sha256(source_path)
+                if db.query(ImageBlob.id).filter(ImageBlob.sha256 == sha256).first():
+                    reused += 1
+                    freed += size
+                else:
+                    moved += 1
+                blob = find_or_create_blob(db, sha256, source_path, size, file_extension(source_path))
+                blobs_by_path[source_path] = blob
+            
+            image.blob_id = blob.id
+            # Keep the record's path style: public URL or path relative to the backend
+            image.image_path = media_url(blob.path) if image.image_path.startswith("/uploads/") else blob.path
+            # The file has already moved, so commit each image rather than the whole batch
+            db.commit()
+        
+        # Rows were re-pointed with UPDATEs, which the insert/delete listeners do not count
+        db.query(ImageBlob).update(
+            {ImageBlob.ref_count: select(func.count(PackageImage.id))
+                .where(PackageImage.blob_id == ImageBlob.id)
+                .scalar_subquery()},
+            synchronize_session=False
+        )
+        db.commit()
+        print(f"Moved {moved} files into the store, removed {reused} duplicates ({freed / (1024*1024):.1f}MB)")
+        
+    except Exception as e:
+        print(f"Error deduplicating images: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("Starting image deduplication...")
+    dedupe_package_images()
+    print("Done!")
@@ -0,0 +1,20 @@
+"""
+Remove image blobs no package image references any more (and their renditions),
+plus files left in the blob store by uploads whose request failed.
+Run periodically from the backend directory: python scripts/gc_image_blobs.py
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.image_store import collect_garbage
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        result = collect_garbage(db)
+        print(f"Removed {result['blobs']} blobs, {result['files']} files ({result['bytes'] / (1024*1024):.1f}MB)")
+    finally:
+        db.close()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a scratch SQLite database before main is imported
+_db_dir = tempfile.mkdtemp(prefix="package-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ["QUERY_BUDGET_MODE"] = "raise"
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.auth import get_password_hash
+from app.database import SessionLocal
+from app.models import Package, PackageDimension, PackageImage, PackageImageVariant, PackageItem, ReturnInfo, User
+
+PASSWORD = "pw"
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="session")
+def users(client):
+    db = SessionLocal()
+    try:
+        password_hash = get_password_hash(PASSWORD)
+        users = {}
+        for role in ("admin", "manager", "employee", "logistics", "security"):
+            user = User(email=f"{role}@test.local", password_hash=password_hash, full_name=role.title(), role=role, employee_id=role)
+            db.add(user)
+            users[role] = user
+        db.commit()
+        return {role: user.id for role, user in users.items()}
+    finally:
+        db.close()
+
+@pytest.fixture(scope="session")
+def package(users):
+    """A fully populated package: several rows in every collection the detail routes load"""
+    db = SessionLocal()
+    try:
+        pkg = Package(
+            recipient="Recipient", to_address="Address", project_code="P1", tracking_number="TRKTEST1",
+            status="approved", submitted_by=users["employee"], assigned_to_manager=users["manager"],
+            approved_by=users["manager"], is_returnable=True
+        )
+        db.add(pkg)
+        db.flush()
+        for n in range(2):
+            db.add(PackageItem(package_id=pkg.id, description=f"item {n}", quantity=n + 1))
+            db.add(PackageDimension(package_id=pkg.id, weight=1.5 + n, weight_unit="kg", dimension="10x10x10"))
+            db.add(ReturnInfo(package_id=pkg.id, returned_by="Security", return_notes=f"return {n}"))
+        image = PackageImage(package_id=pkg.id, image_path="package_images/test.jpg", image_type="before_packing")
+        db.add(image)
+        db.flush()
+        db.add(PackageImageVariant(
+            image_id=image.id, variant="thumb", format="webp", width=10, height=10, size_bytes=1,
+            path="package_images/variants/test.webp"
+        ))
+        db.commit()
+        return pkg.id
+    finally:
+        db.close()
+
+@pytest.fixture(scope="session")
+def auth_headers(client, users):
+    def headers(role: str) -> dict:
+        response = client.post("/api/auth/login", json={"email": f"{role}@test.local", "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return headers
@@ -0,0 +1,46 @@
+"""
+Every route sharing package_detail_options or a statement budget. QUERY_BUDGET_MODE=raise
+(see conftest) turns a budget overrun into a failure, as does a lazy load or a missing name.
+"""
+import pytest
+
+DETAIL_ROUTES = [
+    "/api/packages/{id}",
+    "/api/packages/tracking/TRKTEST1",
+    "/api/packages/{id}/with-return",
+    "/api/packages/{id}/with-weights",
+]
+
+@pytest.mark.parametrize("route", DETAIL_ROUTES)
+def test_detail_routes_serialize_every_relationship(client, auth_headers, package, route):
+    response = client.get(route.format(id=package), headers=auth_headers("admin"))
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["id"] == package
+    assert len(body["items"]) == 2
+    assert len(body["dimensions"]) == 2
+    assert body["approved_by_user"]["role"] == "manager"
+    assert body["submitted_by_user"]["role"] == "employee"
+
+def test_with_return_uses_latest_return_record(client, auth_headers, package):
+    response = client.get(f"/api/packages/{package}/with-return", headers=auth_headers("admin"))
+    assert response.status_code == 200, response.text
+    assert response.json()["return_notes"] in ("return 0", "return 1")
+
+def test_package_images_with_variants(client, auth_headers, package):
+    response = client.get(f"/api/packages/{package}/images", headers=auth_headers("admin"))
+    assert response.status_code == 200, response.text
+    images = response.json()["before_packing"]
+    assert len(images) == 1
+    assert [variant["variant"] for variant in images[0]["variants"]] == ["thumb"]
+
+@pytest.mark.parametrize("params", [{}, {"limit": 10}, {"fields": "items,assigned_manager"}])
+def test_package_list(client, auth_headers, package, params):
+    response = client.get("/api/packages/", params=params, headers=auth_headers("admin"))
+    assert response.status_code == 200, response.text
+    assert package in [row["id"] for row in response.json()]
+
+@pytest.mark.parametrize("route", DETAIL_ROUTES + ["/api/packages/{id}/images"])
+def test_unknown_package_is_404(client, auth_headers, route):
+    response = client.get(route.format(id=999999).replace("TRKTEST1", "NOPE"), headers=auth_headers("admin"))
+    assert response.status_code == 404
@@ -23,7 +23,6 @@ import {
   MapPin,
   MessageSquare
 } from 'lucide-react';
-import { generateGatePassNumber } from '../../utils/gatePassGenerator';
 import { ItemFormSection } from './ItemFormSection';
 import type { PackageItemSubmission, PackageCommonInfo } from '../../types/item';
 
@@ -276,10 +275,6 @@ const PackageFormSimplified: React.FC<PackageFormProps> = ({ onSubmit, packageTo
     try {
       const payload = new FormData();
 
-      // Generate tracking number
-      const trackingNumber = await generateGatePassNumber(formData.isReturnable || false);
-      payload.append('tracking_number', trackingNumber);
-
       // Add required fields
       payload.append('recipient', formData.recipient);
       const toAddress = formData.toAddress || 'N/A';
@@ -291,7 +286,8 @@ const PackageFormSimplified: React.FC<PackageFormProps> = ({ onSubmit, packageTo
       if (formData.notes) payload.append('notes', formData.notes);
       payload.append('priority', formData.priority);
       if (formData.managerId) payload.append('assigned_to_manager', formData.managerId);
-      payload.append('gate_pass_serial_number', formData.gatePassSerialNumber || trackingNumber);
+      // New submissions get their RGP/NRGP number from the server in the same transaction
+      if (formData.gatePassSerialNumber) payload.append('gate_pass_serial_number', formData.gatePassSerialNumber);
       payload.append('is_returnable', String(formData.isReturnable));
       if (formData.returnDate) payload.append('return_date', formData.returnDate);
       if (formData.returnReason) payload.append('return_reason', formData.returnReason);
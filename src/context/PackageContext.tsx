@@ -1,4 +1,4 @@
-import { createContext, useState, useContext, ReactNode, useEffect } from 'react';
+import { createContext, useState, useContext, ReactNode, useEffect, useRef } from 'react';
 import { Package, PackageStatus, User } from '../types';
 
 interface PackageUpdateData {
@@ -40,6 +40,8 @@ export const PackageProvider = ({ children }: { children: ReactNode }) => {
   const [managers, setManagers] = useState<User[]>([]);
   const [loading, setLoading] = useState<boolean>(true);
   const [error, setError] = useState<string | null>(null);
+  // Watermark of the last full load or delta sync; change events only fetch what changed after it
+  const syncWatermark = useRef<string | null>(null);
 
   // Function to refresh data from the database
   const refreshData = async (): Promise<void> => {
@@ -50,6 +52,7 @@ export const PackageProvider = ({ children }: { children: ReactNode }) => {
       if (user && user.role === 'manager') {
         // Fetch all packages for analytics
         const allPackages = await packageService.getAllPackages();
+        syncWatermark.current = packageService.lastSyncWatermark;
         setPackages(allPackages);
         
         // Also fetch packages specifically assigned to this manager for the assigned packages list
@@ -61,6 +64,7 @@ export const PackageProvider = ({ children }: { children: ReactNode }) => {
       } else {
         // For other roles, fetch all packages
         const allPackages = await packageService.getAllPackages();
+        syncWatermark.current = packageService.lastSyncWatermark;
         setPackages(allPackages);
       }
       
@@ -85,6 +89,42 @@ export const PackageProvider = ({ children }: { children: ReactNode }) => {
     }
   };
 
+  // Merge changed packages into the lists in place and drop the ones that left the user's view
+  const applyPackageChanges = (changed: Package[], removedIds: string[] = []) => {
+    const upsert = (list: Package[], pkg: Package) => {
+      const index = list.findIndex(p => p.id === pkg.id);
+      if (index < 0) return [pkg, ...list];
+      const updated = [...list];
+      updated[index] = pkg;
+      return updated;
+    };
+    const removed = new Set(removedIds);
+    setPackages(prevPackages => changed.reduce(upsert, prevPackages).filter(p => !removed.has(p.id)));
+    
+    if (user && user.role === 'manager') {
+      setAssignedPackages(prevAssigned => changed
+        .reduce((list, pkg) => String(pkg.assignedToManager) === String(user.id)
+          ? upsert(list, pkg)
+          : list.filter(p => p.id !== pkg.id), prevAssigned)
+        .filter(p => !removed.has(p.id)));
+    }
+  };
+
+  // Fetch only the packages changed (or removed) since the last sync, instead of reloading every list
+  const syncChanges = async (): Promise<void> => {
+    const since = syncWatermark.current;
+    if (!user || !since) return refreshData();
+    try {
+      const changed = await packageService.getAllPackages(undefined, undefined, undefined, undefined, undefined, undefined, undefined, since);
+      const watermark = packageService.lastSyncWatermark;
+      const removedIds = await packageService.getRemovedPackageIds(since, user.role === 'manager' ? user.id : undefined);
+      syncWatermark.current = watermark;
+      applyPackageChanges(changed, removedIds);
+    } catch (error) {
+      console.error('Error syncing package changes:', error);
+    }
+  };
+
   // Effect to load data on mount and when user changes
   useEffect(() => {
     if (user) {
@@ -110,10 +150,15 @@ export const PackageProvider = ({ children }: { children: ReactNode }) => {
             console.log('New package assigned to current manager, updating assignedPackages');
             setAssignedPackages(prevAssigned => [data.package, ...prevAssigned]);
           }
+        } else if (data.package.id) {
+          // A single change: refetch just that package
+          packageService.getPackageById(data.package.id).then(pkg => {
+            if (pkg) applyPackageChanges([pkg]);
+          });
         } else {
-          // For other updates, refresh all data to ensure consistency
-          console.log('Other package update, refreshing all data');
-          refreshData();
+          // A burst of changes (or a stream reset): one delta sync for all of them
+          console.log('Several packages changed, syncing changes');
+          syncChanges();
         }
       });
       
@@ -167,19 +167,7 @@ const EmployeePage: React.FC = () => {
   //   };
   // }, [refreshData]);
   
-  // Auto-refresh packages every 30 seconds for real-time updates
-  useEffect(() => {
-    const refreshInterval = setInterval(() => {
-      if (refreshData) {
-        setIsRefreshing(true);
-        refreshData().finally(() => {
-          setTimeout(() => setIsRefreshing(false), 500);
-        });
-      }
-    }, 30000);
-    
-    return () => clearInterval(refreshInterval);
-  }, [refreshData]);
+  // Package changes are pushed by socketService (SSE) through PackageContext, so no polling here
   
   // Manual refresh function
   const handleRefresh = () => {
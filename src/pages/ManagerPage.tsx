@@ -130,17 +130,7 @@ const ManagerPage: React.FC = () => {
     );
   };
   
-  // Auto-refresh packages every 30 seconds for real-time updates
-  useEffect(() => {
-    const refreshInterval = setInterval(() => {
-      // The packages context is already handling persistence
-      // This will trigger a UI refresh without an explicit action
-      setIsRefreshing(true);
-      setTimeout(() => setIsRefreshing(false), 500);
-    }, 30000);
-    
-    return () => clearInterval(refreshInterval);
-  }, []);
+  // Package changes are pushed by socketService (SSE) through PackageContext, so no polling here
   
   // Manual refresh function
   const handleRefresh = async () => {
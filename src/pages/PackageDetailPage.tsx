@@ -379,11 +379,13 @@ const PackageDetailPage: React.FC = () => {
           const groupedImages = {
             before: (data.before_packing || []).map((img: any) => ({
               ...img,
-              image_path: formatImagePath(img.image_path)
+              // url is cacheable (content-addressed) and signed when the server requires it
+              image_path: img.url || formatImagePath(img.image_path)
             })),
             after: (data.after_packing || []).map((img: any) => ({
               ...img,
-              image_path: formatImagePath(img.image_path)
+              // url is cacheable (content-addressed) and signed when the server requires it
+              image_path: img.url || formatImagePath(img.image_path)
             }))
           };
           
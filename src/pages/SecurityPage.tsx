@@ -91,9 +91,9 @@ const SecurityPage: React.FC = () => {
     try {
       setScanError(null); // Clear any previous errors
       
-      // Fetch package by tracking number
+      // Resolve the code (tracking, gate pass or courier tracking number) to a package id
       const token = localStorage.getItem('token');
-      const response = await fetch(`${import.meta.env.VITE_API_BASE_URL}/api/packages/tracking/${encodeURIComponent(cleanBarcode)}`, {
+      const response = await fetch(`${import.meta.env.VITE_API_BASE_URL}/api/scan/${encodeURIComponent(cleanBarcode)}`, {
         headers: {
           'Authorization': `Bearer ${token}`,
           'Content-Type': 'application/json'
@@ -102,11 +102,11 @@ const SecurityPage: React.FC = () => {
       
       if (response.ok) {
         const data = await response.json();
-        if (data && data.id) {
-          navigate(`/package/${data.id}`, {
+        if (data && data.package_id) {
+          // The detail page loads the full package itself
+          navigate(`/package/${data.package_id}`, {
             state: {
-              fromScanner: true,
-              packageData: data
+              fromScanner: true
             }
           });
           return;
@@ -2,6 +2,41 @@ import { User } from '../types';
 
 const API_URL = 'http://localhost:8080/api';
 
+// Renew the access token this long before it expires, using the refresh token (no password, no bcrypt)
+const REFRESH_MARGIN_MS = 60 * 1000;
+// Every tab shares one refresh token and presenting an already rotated one revokes the whole
+// session, so only one tab at a time may refresh (Web Locks are shared by same-origin tabs)
+const REFRESH_LOCK = 'auth-refresh';
+let refreshTimer: ReturnType<typeof setTimeout> | null = null;
+const tokenListeners = new Set<(token: string) => void>();
+
+const storeTokens = (data: { access_token: string; refresh_token?: string; expires_in?: number }) => {
+  localStorage.setItem('token', data.access_token);
+  if (data.refresh_token) localStorage.setItem('refreshToken', data.refresh_token);
+  if (data.expires_in) {
+    const expiresAt = Date.now() + data.expires_in * 1000;
+    localStorage.setItem('tokenExpiresAt', String(expiresAt));
+    scheduleRefresh(expiresAt);
+  }
+  tokenListeners.forEach(listener => listener(data.access_token));
+};
+
+const clearTokens = () => {
+  if (refreshTimer) clearTimeout(refreshTimer);
+  refreshTimer = null;
+  localStorage.removeItem('token');
+  localStorage.removeItem('refreshToken');
+  localStorage.removeItem('tokenExpiresAt');
+};
+
+const scheduleRefresh = (expiresAt: number) => {
+  if (refreshTimer) clearTimeout(refreshTimer);
+  refreshTimer = setTimeout(() => { authService.refresh(); }, Math.max(expiresAt - Date.now() - REFRESH_MARGIN_MS, 0));
+};
+
+const withRefreshLock = <T,>(task: () => Promise<T>): Promise<T> =>
+  'locks' in navigator ? navigator.locks.request(REFRESH_LOCK, task) : task();
+
 /**
  * Authentication service for user login
  */
@@ -25,8 +60,8 @@ export const authService = {
       }
       
       const data = await response.json();
-      // Store JWT token
-      localStorage.setItem('token', data.access_token);
+      // Store JWT and refresh token; the access token is renewed in the background
+      storeTokens(data);
       
       // Get user info with token
       const userResponse = await fetch(`${API_URL}/auth/me`, {
@@ -83,7 +118,57 @@ export const authService = {
    * Logout user
    */
   logout(): void {
-    localStorage.removeItem('token');
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (refreshToken) {
+      // End the server-side session; nothing to wait for
+      fetch(`${API_URL}/auth/logout`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refresh_token: refreshToken })
+      }).catch(() => {});
+    }
+    clearTokens();
+  },
+
+  /**
+   * Exchange the refresh token for a new access token (and a new refresh token)
+   */
+  async refresh(): Promise<boolean> {
+    const presented = localStorage.getItem('refreshToken');
+    if (!presented) return false;
+    return withRefreshLock(async () => {
+      // Another tab may have rotated the token while this one waited for the lock
+      const refreshToken = localStorage.getItem('refreshToken');
+      if (!refreshToken) return false;
+      if (refreshToken !== presented) {
+        scheduleRefresh(Number(localStorage.getItem('tokenExpiresAt')));
+        return true;
+      }
+      try {
+        const response = await fetch(`${API_URL}/auth/refresh`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ refresh_token: refreshToken })
+        });
+        if (!response.ok) {
+          clearTokens();
+          return false;
+        }
+        storeTokens(await response.json());
+        return true;
+      } catch (error) {
+        console.error('Token refresh error:', error);
+        return false;
+      }
+    });
+  },
+
+  /**
+   * Called with the new access token after every refresh, in this tab or another one
+   */
+  onTokenChange(listener: (token: string) => void): () => void {
+    tokenListeners.add(listener);
+    return () => { tokenListeners.delete(listener); };
   },
 
   /**
@@ -100,3 +185,23 @@ export const authService = {
     return !!localStorage.getItem('token');
   }
 };
+
+// Resume background renewal after a page reload
+const storedExpiry = Number(localStorage.getItem('tokenExpiresAt'));
+if (storedExpiry && localStorage.getItem('refreshToken')) {
+  scheduleRefresh(storedExpiry);
+}
+
+// Follow refreshes and logouts made by other tabs (storage events only fire in the other tabs)
+window.addEventListener('storage', (event) => {
+  if (event.key === 'tokenExpiresAt' && event.newValue) {
+    scheduleRefresh(Number(event.newValue));
+  } else if (event.key === 'token') {
+    if (event.newValue) {
+      tokenListeners.forEach(listener => listener(event.newValue as string));
+    } else if (refreshTimer) {
+      clearTimeout(refreshTimer);
+      refreshTimer = null;
+    }
+  }
+});
@@ -7,6 +7,9 @@ const API_URL = 'http://localhost:8080/api';
  * Package-related API operations
  */
 export const packageService = {
+  // X-Sync-Watermark of the last list response; pass it as updatedSince to fetch only later changes
+  lastSyncWatermark: null as string | null,
+
   /**
    * Get all packages with filtering and search
    * @param managerId Optional manager ID to filter packages
@@ -16,6 +19,7 @@ export const packageService = {
    * @param endDate Optional end date filter
    * @param priority Optional priority filter
    * @param sortBy Optional sort field
+   * @param updatedSince Optional watermark, only packages changed after it are returned
    */
   async getAllPackages(
     managerId?: string,
@@ -24,7 +28,8 @@ export const packageService = {
     startDate?: string,
     endDate?: string,
     priority?: string,
-    sortBy?: string
+    sortBy?: string,
+    updatedSince?: string
   ): Promise<Package[]> {
     try {
       const url = new URL(`${API_URL}/packages`);
@@ -36,6 +41,7 @@ export const packageService = {
       if (endDate) url.searchParams.append('end_date', endDate);
       if (priority) url.searchParams.append('priority', priority);
       if (sortBy) url.searchParams.append('sort_by', sortBy);
+      if (updatedSince) url.searchParams.append('updated_since', updatedSince);
       
       const token = authService.getToken();
       // Extract dimension info from dimensions array
@@ -69,6 +75,7 @@ export const packageService = {
       
       const data = await response.json();
       console.log('Package data from FastAPI:', data);
+      this.lastSyncWatermark = response.headers.get('X-Sync-Watermark');
       
       // FastAPI returns snake_case by default
       return data.map((pkg: any) => {
@@ -391,6 +398,28 @@ export const packageService = {
     }
   },
 
+  /**
+   * Ids of packages that left the caller's view (deleted, or reassigned away from managerId) since the watermark
+   */
+  async getRemovedPackageIds(since: string, managerId?: string): Promise<string[]> {
+    const url = new URL(`${API_URL}/packages/tombstones`);
+    url.searchParams.append('since', since);
+    if (managerId) url.searchParams.append('manager_id', managerId);
+    
+    const token = authService.getToken();
+    const response = await fetch(url.toString(), {
+      headers: {
+        'Authorization': `Bearer ${token}`,
+        'Content-Type': 'application/json'
+      }
+    });
+    if (!response.ok) {
+      throw new Error(`API error: ${response.status} ${response.statusText}`);
+    }
+    const tombstones = await response.json();
+    return tombstones.map((tombstone: any) => tombstone.package_id.toString());
+  },
+
   /**
    * Get package details with all weight sections
    */
@@ -1,13 +1,91 @@
-// Socket service disabled for FastAPI migration
-// FastAPI doesn't include Socket.IO by default
-// This is a placeholder for future WebSocket implementation
+// Package change feed over Server-Sent Events (GET /api/packages/stream)
+// Replaces dashboard polling: listeners are only notified when a package they can see changes.
+import { authService } from './authService';
+import { API_CONFIG } from './config';
+
+type Listener = (data: any) => void;
+
+const PACKAGE_EVENTS = ['created', 'updated', 'status', 'assigned', 'logistics', 'returned', 'reset'];
+
+let source: EventSource | null = null;
+let lastEventId: string | null = null;
+const updateListeners = new Set<Listener>();
+
+// Bulk operations (imports) publish one event per package; a burst is delivered to listeners
+// once, as a package-less update, instead of refetching the list for every event
+const BURST_WINDOW_MS = 250;
+let pending: any[] = [];
+let flushTimer: ReturnType<typeof setTimeout> | null = null;
+
+const flush = () => {
+  flushTimer = null;
+  const batch = pending;
+  pending = [];
+  const payload = batch.length === 1 ? batch[0] : { type: 'update', package: { id: undefined, status: undefined } };
+  updateListeners.forEach(listener => listener(payload));
+};
+
+const handleEvent = (event: MessageEvent) => {
+  if (event.lastEventId) lastEventId = event.lastEventId;
+  const data = event.data ? JSON.parse(event.data) : {};
+  // Batch events (a bulk import chunk) carry no package id and are synced like a burst
+  pending.push({
+    type: 'update',
+    package: { id: data.package_id != null ? String(data.package_id) : undefined, status: data.status }
+  });
+  if (!flushTimer) flushTimer = setTimeout(flush, BURST_WINDOW_MS);
+};
+
+// The access token travels in the URL, so the stream is reopened with each refreshed token
+const RECONNECT_DELAY_MS = 5000;
+let unsubscribeToken: (() => void) | null = null;
+let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+
+const open = (token: string) => {
+  source?.close();
+  const url = new URL(`${API_CONFIG.BASE_URL}/packages/stream`);
+  url.searchParams.append('token', token);
+  // EventSource resends Last-Event-ID on its own reconnects; this covers a reopened stream
+  if (lastEventId) url.searchParams.append('last_event_id', lastEventId);
+  source = new EventSource(url.toString());
+  PACKAGE_EVENTS.forEach(name => source!.addEventListener(name, handleEvent as EventListener));
+  source.onerror = () => {
+    // A rejected reconnect (e.g. 401 after the token expired) closes the stream for good
+    if (source?.readyState !== EventSource.CLOSED || reconnectTimer) return;
+    reconnectTimer = setTimeout(() => {
+      reconnectTimer = null;
+      const current = authService.getToken();
+      if (current && source) open(current);
+    }, RECONNECT_DELAY_MS);
+  };
+};
 
 export const socketService = {
-  // No-op functions for compatibility
-  connect: (_user: any) => console.log('WebSocket disabled - FastAPI migration'),
-  disconnect: () => console.log('WebSocket disconnected'),
-  onPackageUpdate: (_callback: any) => () => {}, // Return unsubscribe function
-  onPackageAssigned: (_callback: any) => () => {}, // Return unsubscribe function
+  connect: (_user: any) => {
+    const token = authService.getToken();
+    if (!token || source) return;
+    open(token);
+    unsubscribeToken = authService.onTokenChange(newToken => { if (source) open(newToken); });
+  },
+  disconnect: () => {
+    source?.close();
+    source = null;
+    unsubscribeToken?.();
+    unsubscribeToken = null;
+    if (reconnectTimer) clearTimeout(reconnectTimer);
+    reconnectTimer = null;
+    if (flushTimer) clearTimeout(flushTimer);
+    flushTimer = null;
+    pending = [];
+  },
+  onPackageUpdate: (callback: Listener) => {
+    updateListeners.add(callback);
+    return () => { updateListeners.delete(callback); };
+  },
+  // Assignments arrive as regular update events (the feed carries ids, not full packages)
+  onPackageAssigned: (_callback: Listener) => () => {},
   emitPackageStatusChange: (_packageId: number, _status: string) => {},
-  removeAllListeners: () => {}
+  removeAllListeners: () => {
+    updateListeners.clear();
+  }
 };